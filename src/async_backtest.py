@@ -0,0 +1,231 @@
+from datetime import datetime
+from typing import Iterable, Literal, Optional, Sequence, Union
+from backtest_class import Backtest
+from async_get_price import get_price_series_many_async, get_prices_async
+from price_cache import PriceCache
+from profiler import Profiler
+from metrics import MetricsTracker
+from fill_model import FillModel
+from transaction_log import SpillLog, TransactionLog
+from trace_buffer import TraceBuffer
+from util.async_log_transaction import AsyncTransactionWriter
+
+
+class AsyncBacktest(Backtest):
+    """이벤트 루프에서 실행하는 비동기 Backtest입니다.
+
+    포트폴리오/현금 처리는 Backtest와 같고, 자산 가치 계산에 필요한 가격 중 캐시에 없는 암호화폐는
+    한 번의 비동기 조회로 함께 적재하므로 여러 암호화폐를 보유해도 db 왕복이 암호화폐 수만큼 늘지 않습니다.
+    save_db인 경우 거래 기록은 AsyncTransactionWriter의 백그라운드 태스크가 저장합니다.
+    하나의 이벤트 루프에서 여러 AsyncBacktest를 asyncio.gather 등으로 함께 실행할 수 있습니다.
+
+    Example:
+        >>> async def main():
+        ...     async with AsyncBacktest('test', datetime(2024, 1, 1), save_db=True) as backtest:
+        ...         await backtest.buy(datetime(2024, 1, 2), 'KRW-BTC', 50000000.0, 0.1)
+        ...         await backtest.sell(datetime(2024, 1, 3), 'KRW-BTC', 51000000.0, 0.1)
+        >>> asyncio.run(main())
+    """
+
+    _deferred_valuation = True
+
+    def __init__(self, backtest_id: str, start_date: datetime, market_name: str = 'upbit',
+                 initial_balance: float = 10000000.0, save_db: bool = False, debug: bool = False,
+                 price_cache: Optional[PriceCache] = None,
+                 transaction_writer: Optional[AsyncTransactionWriter] = None,
+                 valuation: Literal['eager', 'lazy'] = 'eager',
+                 log_type: Literal['list', 'columnar', 'spill'] = 'list',
+                 profile: bool = False, profiler: Optional[Profiler] = None,
+                 valuation_type: str = '1hour',
+                 track_metrics: bool = False, metrics: Optional[MetricsTracker] = None,
+                 fill_model: Optional[FillModel] = None, spill_log: Optional[SpillLog] = None,
+                 trace: Optional[TraceBuffer] = None):
+        """
+        Args:
+            transaction_writer: db 저장에 사용할 비동기 거래 기록기 (기본값: save_db가 True면 새로 생성)
+            그 외 인자는 Backtest와 같습니다.
+        """
+        super().__init__(backtest_id, start_date, market_name, initial_balance, save_db=False, debug=debug,
+                         price_cache=price_cache, valuation=valuation, log_type=log_type,
+                         profile=profile, profiler=profiler, valuation_type=valuation_type,
+                         track_metrics=track_metrics, metrics=metrics, fill_model=fill_model,
+                         spill_log=spill_log, trace=trace)
+        self.save_db = save_db
+        if self.save_db:
+            self.transaction_writer = transaction_writer if transaction_writer is not None else AsyncTransactionWriter()
+            # 초기 잔고를 deposit으로 기록 (보유 자산이 없으므로 첫 await 때 가격 조회 없이 평가됨)
+            self.cash_balance = 0
+            Backtest.deposit(self, start_date, initial_balance)
+
+    @property
+    def transaction_log(self) -> Union[list, TransactionLog, SpillLog]:
+        """거래 기록 목록. 평가 대기 중인 기록이 있으면 동기 가격 조회로 평가합니다 (await finalize_valuation() 권장)."""
+        if self._pending_valuation:
+            Backtest.finalize_valuation(self)
+        return self._transaction_log
+
+    async def buy(self, date: datetime, crypto_name: str, price: float, quantity: float,
+                  fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+                  volume: Optional[float] = None):
+        """Backtest.buy의 비동기 버전입니다."""
+        transaction_info = Backtest.buy(self, date, crypto_name, price, quantity, fee_type, fee_amount, volume)
+        await self._settle()
+        return transaction_info
+
+    async def sell(self, date: datetime, crypto_name: str, price: float, quantity: float,
+                   fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+                   volume: Optional[float] = None):
+        """Backtest.sell의 비동기 버전입니다."""
+        transaction_info = Backtest.sell(self, date, crypto_name, price, quantity, fee_type, fee_amount, volume)
+        await self._settle()
+        return transaction_info
+
+    async def deposit(self, date: datetime, amount: float):
+        """Backtest.deposit의 비동기 버전입니다."""
+        transaction_info = Backtest.deposit(self, date, amount)
+        await self._settle()
+        return transaction_info
+
+    async def withdraw(self, date: datetime, amount: float):
+        """Backtest.withdraw의 비동기 버전입니다."""
+        transaction_info = Backtest.withdraw(self, date, amount)
+        await self._settle()
+        return transaction_info
+
+    async def submit_orders(self, date: datetime, orders: Sequence[dict],
+                            fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005) -> list[dict]:
+        """Backtest.submit_orders의 비동기 버전입니다."""
+        transactions = Backtest.submit_orders(self, date, orders, fee_type, fee_amount)
+        await self._settle()
+        return transactions
+
+    async def rebalance(self, date: datetime, target_weights: dict, prices: Optional[dict] = None,
+                        price_type: Optional[str] = None, fee_type: Literal['percent', 'fixed'] = 'percent',
+                        fee_amount: float = 0.0005, min_order_value: float = 0.0,
+                        volumes: Optional[dict] = None) -> list[dict]:
+        """Backtest.rebalance의 비동기 버전입니다. 없는 가격은 한 번의 비동기 조회로 가져옵니다."""
+        price_type = price_type if price_type is not None else self.valuation_type
+        markets = list(dict.fromkeys([*self.portfolio, *target_weights]))
+        quotes = dict(prices) if prices is not None else {}
+        quotes.update(await self._prices_at_async([m for m in markets if m not in quotes], date, price_type))
+        orders = self._rebalance_orders(target_weights, quotes, fee_type, fee_amount, min_order_value, volumes)
+        transactions = self._execute_orders(date, orders, fee_type, fee_amount)
+        await self._settle()
+        return transactions
+
+    async def mark_to_market(self, timestamp: datetime):
+        """Backtest.mark_to_market의 비동기 버전입니다."""
+        Backtest.mark_to_market(self, timestamp)
+        await self._settle()
+
+    async def get_asset_value(self, timestamp: datetime, price_type: str = '1hour') -> float:
+        """특정 시점 보유 암호화폐 총 가치를 계산합니다. 캐시에 없는 가격은 동시에 조회합니다."""
+        return await self._value_holdings_async(self.portfolio, timestamp, price_type)
+
+    async def get_portfolio_value(self, timestamp: datetime, price_type: str = '1hour') -> float:
+        """특정 시점 포트폴리오 총 가치 (현금 + 자산)"""
+        return self.cash_balance + await self.get_asset_value(timestamp, price_type)
+
+    async def metrics_report(self) -> dict:
+        """Backtest.metrics_report의 비동기 버전입니다. 평가 대기 중인 기록을 먼저 비동기로 평가합니다.
+
+        Raises:
+            ValueError: track_metrics=True로 만들지 않은 경우
+        """
+        if self.metrics is None:
+            raise ValueError("Backtest was created without track_metrics=True")
+        await self.finalize_valuation()
+        return self.metrics.summary()
+
+    async def finalize_valuation(self):
+        """평가 대기 중인 거래 기록을 평가합니다.
+
+        대기 중인 기록에 등장하는 모든 암호화폐의 구간 가격을 한 번의 비동기 조회로 캐시에 적재한 뒤 평가합니다.
+        """
+        pending, self._pending_valuation = self._pending_valuation, []
+        if not pending:
+            return
+        markets = {crypto_name for _, _, holdings in pending for crypto_name in holdings}
+        if markets:
+            dates = [transaction_info['date'] for _, transaction_info, _ in pending]
+            start = min(dates) - self.price_cache.lookback
+            series = await get_price_series_many_async(markets, start, max(dates), self.valuation_type)
+            self.price_cache.put_many(series, self.valuation_type, start, max(dates))
+        await self._value_pending(pending)
+
+    async def flush(self):
+        """평가 대기 중인 기록을 평가하고 버퍼에 남아 있는 거래 기록을 db에 저장합니다."""
+        await self.finalize_valuation()
+        if self.transaction_writer is not None:
+            await self.transaction_writer.flush()
+
+    async def close(self):
+        """백테스트를 종료하고 남은 거래 기록을 평가해 db에 저장합니다."""
+        await self.finalize_valuation()
+        if self.transaction_writer is not None:
+            await self.transaction_writer.close()
+        if self.log_type == 'spill':
+            self._transaction_log.close()
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    async def _settle(self):
+        # eager: 방금 추가된 기록을 바로 평가 (lazy는 finalize_valuation에서 모아서 평가)
+        if self.valuation == 'eager' and self._pending_valuation:
+            pending, self._pending_valuation = self._pending_valuation, []
+            await self._value_pending(pending)
+
+    async def _value_pending(self, pending: list):
+        for index, transaction_info, holdings in pending:
+            asset_value = await self._value_holdings_async(holdings, transaction_info['date'], self.valuation_type)
+            self._apply_value(index, transaction_info, asset_value)
+
+    async def _value_holdings_async(self, holdings: dict, timestamp: datetime, price_type: str) -> float:
+        if self.profiler is not None:
+            with self.profiler.phase('asset_value', (timestamp, len(holdings))):
+                return await self._sum_holdings_async(holdings, timestamp, price_type)
+        return await self._sum_holdings_async(holdings, timestamp, price_type)
+
+    async def _sum_holdings_async(self, holdings: dict, timestamp: datetime, price_type: str) -> float:
+        prices = await self._prices_at_async(holdings, timestamp, price_type)
+        # Backtest와 같은 순서로 더해 결과가 같도록 함
+        return sum(amount * prices[crypto_name] for crypto_name, amount in holdings.items())
+
+    async def _prices_at_async(self, markets: Iterable[str], timestamp: datetime, price_type: str) -> dict:
+        primed = self._primed(timestamp, price_type)
+        prices = {}
+        missing = []
+        for crypto_name in markets:
+            price = primed.get(crypto_name)
+            if price is None:
+                price = self.price_cache.peek(crypto_name, timestamp, price_type)
+            if price is None:
+                missing.append(crypto_name)
+            else:
+                prices[crypto_name] = price
+        if missing:
+            # peek은 적중만 세므로 캐시 통계에 미스를 반영
+            self.price_cache.misses += len(missing)
+            # PriceCache와 같이 조회 시점 주변 구간을 적재하되, 캐시에 없는 암호화폐를 한 번의 비동기 조회로 가져옴
+            start = timestamp - self.price_cache.lookback
+            end = timestamp + self.price_cache.window
+            series = await get_price_series_many_async(missing, start, end, price_type)
+            self.price_cache.put_many(series, price_type, start, end)
+            unresolved = []
+            for crypto_name in missing:
+                price = self.price_cache.peek(crypto_name, timestamp, price_type)
+                if price is None:
+                    unresolved.append(crypto_name)
+                else:
+                    prices[crypto_name] = price
+            if unresolved:
+                # 적재 구간 이전에만 데이터가 있는 경우 단건 조회를 동시에 실행
+                prices.update(await get_prices_async(unresolved, timestamp, price_type))
+        return prices
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Iterable
+import asyncio
+import numpy as np
+from get_price import DatabasePriceSource, price_query, price_series_many_query, price_source_for, split_series
+from profiler import profile_count, profile_phase
+
+
+def _use_database(type: str) -> bool:
+    # 로컬 가격 저장소나 해상도 변환처럼 db 테이블을 바로 읽지 않는 경우는 동기 조회를 그대로 사용
+    return isinstance(price_source_for(type), DatabasePriceSource)
+
+
+def _async_engine():
+    from util.db_engine import get_async_engine
+    return get_async_engine()
+
+
+async def get_price_async(crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+    """get_price의 비동기 버전입니다. 비동기 엔진으로 특정 시간과 가장 가까운 최근 종가를 조회합니다.
+
+    Args:
+        crypto_name: 암호화폐 이름 (예: 'KRW-BTC')
+        timestamp: 조회할 시간
+        type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+    Returns:
+        float: 해당 시간과 가장 가까운 최근 종가
+
+    Raises:
+        ValueError: 데이터가 없는 경우
+    """
+    if not _use_database(type):
+        return price_source_for(type).get_price(crypto_name, timestamp, type)
+
+    profile_count('price_queries')
+    try:
+        with profile_phase('price_query', (crypto_name, timestamp)):
+            async with _async_engine().connect() as conn:
+                result = (await conn.execute(
+                    price_query(type),
+                    {"market": crypto_name, "timestamp": timestamp}
+                )).first()
+    except Exception as e:
+        raise ValueError(f"Error fetching price: {str(e)}")
+    if result is None:
+        raise ValueError(f"Error fetching price: No price data found for {crypto_name} at or before {timestamp}")
+    return float(result[0])
+
+
+async def get_prices_async(crypto_names: Iterable[str], timestamp: datetime,
+                           type: str = 'daily') -> dict[str, float]:
+    """여러 암호화폐의 as-of 종가를 동시에 조회합니다. 전체 지연 시간은 가장 느린 조회와 비슷합니다.
+
+    Args:
+        crypto_names: 암호화폐 이름 목록
+        timestamp: 조회할 시간
+        type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+    Returns:
+        dict[str, float]: {암호화폐 이름: 종가}
+
+    Raises:
+        ValueError: 한 암호화폐라도 데이터가 없는 경우
+    """
+    crypto_names = list(crypto_names)
+    prices = await asyncio.gather(*(get_price_async(name, timestamp, type) for name in crypto_names))
+    return dict(zip(crypto_names, prices))
+
+
+async def get_price_series_many_async(crypto_names: Iterable[str], start: datetime, end: datetime,
+                                      type: str = 'daily'
+                                      ) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """get_price_series_many의 비동기 버전입니다.
+
+    Returns:
+        dict[str, tuple[np.ndarray, np.ndarray]]: {암호화폐 이름: (timestamp_kst, close)}
+
+    Raises:
+        ValueError: 조회 중 오류가 발생한 경우
+    """
+    crypto_names = list(crypto_names)
+    if not _use_database(type):
+        return price_source_for(type).get_price_series_many(crypto_names, start, end, type)
+    if not crypto_names:
+        return {}
+
+    profile_count('price_queries')
+    try:
+        with profile_phase('price_series_query', (len(crypto_names), start, end)):
+            async with _async_engine().connect() as conn:
+                rows = (await conn.execute(
+                    price_series_many_query(type),
+                    {"markets": crypto_names, "start": start, "end": end}
+                )).all()
+    except Exception as e:
+        raise ValueError(f"Error fetching price series: {str(e)}")
+    return split_series(rows, crypto_names)
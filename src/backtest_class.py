@@ -1,7 +1,50 @@
-from typing import Literal
+from typing import Literal, Optional, Sequence, Union
 from datetime import datetime
-from util.log_transaction import log_transaction
-from get_price import get_price
+import numpy as np
+import pandas as pd
+from get_price import get_prices
+from util.log_transaction import TransactionWriter
+from price_cache import PriceCache, default_price_cache
+from transaction_log import SpillLog, TransactionLog
+from trace_buffer import DEBUG, INFO, WARNING, TraceBuffer
+from profiler import Profiler
+from metrics import MetricsTracker
+from fill_model import FillModel
+from resolution import normalize
+
+
+def trade_amount(side: Literal['buy', 'sell'], price: float, quantity: float,
+                 fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005) -> float:
+    """수수료를 반영한 거래 금액 (매수는 지불할 금액, 매도는 받을 금액)
+
+    Raises:
+        ValueError: 알 수 없는 fee_type인 경우
+    """
+    if fee_type == 'percent':
+        return price * quantity * (1 + fee_amount) if side == 'buy' else price * quantity * (1 - fee_amount)
+    elif fee_type == 'fixed':
+        return price * quantity + fee_amount if side == 'buy' else price * quantity - fee_amount
+    raise ValueError(f"Unknown fee_type: {fee_type}")
+
+
+def _affordable_quantity(price: float, cash: float, fee_type: Literal['percent', 'fixed'], fee_amount: float) -> float:
+    """cash로 수수료까지 지불할 수 있는 최대 매수 수량"""
+    if fee_type == 'percent':
+        quantity = cash / (price * (1 + fee_amount))
+    else:
+        quantity = (cash - fee_amount) / price
+    # 나눗셈 반올림으로 금액이 cash를 넘으면 한 단위씩 줄임
+    while quantity > 0 and trade_amount('buy', price, quantity, fee_type, fee_amount) > cash:
+        quantity = float(np.nextafter(quantity, 0))
+    return max(quantity, 0.0)
+
+
+def _order_side(order: dict) -> str:
+    side = str(order['side']).lower()
+    if side not in ('buy', 'sell'):
+        raise ValueError(f"Unknown order side: {order['side']}")
+    return side
+
 
 class Backtest:
     """백테스트 전략 실행을 위한 포트폴리오 관리 클래스입니다.
@@ -18,6 +61,15 @@ class Backtest:
         trades_count (int): 총 거래 횟수
         save_db (bool): db 저장 여부
         debug (bool): 디버그 모드 여부
+        trace (TraceBuffer): 거래/평가/거부 이벤트를 기록하는 추적 버퍼 (debug가 False이고 trace를 넘기지 않으면 None)
+        valuation (str): 거래 기록의 자산 평가 방식 ('eager' 또는 'lazy')
+        log_type (str): 거래 기록 저장 방식 ('list', 'columnar' 또는 'spill')
+        valuation_type (str): 거래 기록의 자산 가치 계산에 사용하는 가격 해상도 (예: '1hour', '1m', '4h')
+        price_cache (PriceCache): 자산 가치 계산에 사용하는 가격 캐시
+        transaction_writer (TransactionWriter): db 저장용 거래 기록기 (save_db가 False면 None)
+        profiler (Profiler): 구간별 호출 횟수/시간 계측기 (profile이 False면 None)
+        metrics (MetricsTracker): 실행 중 갱신되는 성과 지표 추적기 (track_metrics가 False면 None)
+        fill_model (FillModel): 주문의 체결 가격/수량을 정하는 체결 모델 (None이면 주문 가격과 수량 그대로 체결)
     
     
 
@@ -33,9 +85,21 @@ class Backtest:
         ... )
         >>> portfolio_value = strategy.get_portfolio_value(datetime.now(), 'daily')
     """
+
+    # True면 valuation과 관계없이 거래 기록을 대기 목록에 넣고 하위 클래스가 평가 (AsyncBacktest)
+    _deferred_valuation = False
     
     def __init__(self, backtest_id: str, start_date: datetime, market_name: str = 'upbit', 
-                initial_balance: float = 10000000.0, save_db: bool = False, debug: bool = False):
+                initial_balance: float = 10000000.0, save_db: bool = False, debug: bool = False,
+                price_cache: Optional[PriceCache] = None,
+                transaction_writer: Optional[TransactionWriter] = None,
+                valuation: Literal['eager', 'lazy'] = 'eager',
+                log_type: Literal['list', 'columnar', 'spill'] = 'list',
+                profile: bool = False, profiler: Optional[Profiler] = None,
+                valuation_type: str = '1hour',
+                track_metrics: bool = False, metrics: Optional[MetricsTracker] = None,
+                fill_model: Optional[FillModel] = None, spill_log: Optional[SpillLog] = None,
+                trace: Optional[TraceBuffer] = None):
         """
         Args:
             backtest_id: 백테스트 실행 식별자(필수)
@@ -43,18 +107,68 @@ class Backtest:
             market_name: 거래소 이름 (기본값: 'upbit')
             initial_balance: 초기 투자 금액 (기본값: 10,000,000.0)
             save_db: db 저장 여부 (기본값: False)
-            debug: 디버그 모드 여부 (기본값: False)
+            debug: 디버그 모드 여부 (기본값: False, True면 DEBUG 수준의 TraceBuffer에 이벤트를 기록)
+            price_cache: 가격 캐시 (기본값: 모든 Backtest가 공유하는 default_price_cache)
+            transaction_writer: db 저장에 사용할 거래 기록기 (기본값: save_db가 True면 새로 생성)
+            valuation: 거래 기록의 asset_value/total_value/return_rate 계산 방식 (기본값: 'eager')
+                - 'eager': 거래마다 즉시 계산
+                - 'lazy': 거래 기록을 읽거나 flush/close할 때 한 번의 가격 조회로 모아서 계산
+            log_type: 거래 기록 저장 방식 (기본값: 'list')
+                - 'list': 거래마다 dict를 보관하는 list
+                - 'columnar': 필드별 배열에 저장하는 TransactionLog (메모리 절약, to_pandas() 지원)
+                - 'spill': 최근 기록만 메모리에 두고 나머지는 디스크 세그먼트에 저장하는 SpillLog
+                  (거래 수와 관계없이 메모리 일정, 매우 긴 실행용. lazy 평가는 대기 기록이 메모리에 쌓이므로 eager 권장)
+            profile: 가격 조회/자산 가치 계산/db 저장/디버그 출력 구간 계측 여부 (기본값: False, close() 때 종료)
+            profiler: profile이 True일 때 사용할 계측기 (기본값: 새로 생성)
+            valuation_type: 거래 기록의 자산 가치 계산에 사용하는 가격 해상도 (기본값: '1hour')
+                'daily', '1hour' 외에 '1m', '5m', '4h' 등 임의의 해상도를 사용할 수 있습니다 (resolution 참고).
+            track_metrics: 거래/바마다 낙폭, 변동성, 샤프 비율 등을 갱신할지 여부 (기본값: False)
+            metrics: track_metrics가 True일 때 사용할 추적기 (기본값: 새로 생성)
+            fill_model: 스프레드/슬리피지/부분 체결을 계산할 체결 모델 (기본값: None, fill_model 참고)
+            spill_log: log_type이 'spill'일 때 사용할 기록 (기본값: 임시 디렉터리에 새로 생성)
+            trace: 이벤트를 기록할 추적 버퍼 (기본값: debug가 True면 새로 생성, 여러 Backtest가 공유 가능)
         """
+        if valuation not in ('eager', 'lazy'):
+            raise ValueError(f"Unknown valuation mode: {valuation}")
+        if log_type not in ('list', 'columnar', 'spill'):
+            raise ValueError(f"Unknown log type: {log_type}")
         self.start_date = start_date
         self.cash_balance = 0  # 초기화는 0으로
         self.backtest_id = backtest_id
         self.market_name = market_name
         self.portfolio = {}
-        self.transaction_log = []
+        if log_type == 'spill':
+            self._transaction_log = spill_log if spill_log is not None else SpillLog()
+        else:
+            self._transaction_log = TransactionLog() if log_type == 'columnar' else []
         self.initial_balance = initial_balance
         self.trades_count = 0
         self.save_db = save_db
         self.debug = debug
+        self.trace = trace if trace is not None else TraceBuffer(level='debug') if debug else None
+        self.valuation = valuation
+        self.log_type = log_type
+        self.valuation_type = valuation_type
+        self.fill_model = fill_model
+        self.price_cache = price_cache if price_cache is not None else default_price_cache
+        self.transaction_writer = None
+        if self.save_db:
+            self.transaction_writer = transaction_writer if transaction_writer is not None else TransactionWriter()
+        self.profiler = None
+        if profile:
+            self.profiler = profiler if profiler is not None else Profiler()
+            self.profiler.watch_cache(self.price_cache)
+            self.profiler.start()
+        self.metrics = None
+        if track_metrics:
+            self.metrics = metrics if metrics is not None else MetricsTracker()
+            if not self.save_db:
+                # save_db면 초기 잔고 입금 기록이 첫 관측
+                self.metrics.update(start_date, initial_balance)
+        # 지연 평가 대기 중인 (기록 인덱스, 거래 정보, 거래 직후 보유 수량), mark_to_market 관측은 인덱스가 None
+        self._pending_valuation = []
+        # prime_prices로 전달받은 (시간, 가격 타입, {암호화폐: 가격})
+        self._primed_prices = None
 
         # save_db가 True인 경우 초기 잔고를 deposit으로 기록
         if self.save_db:
@@ -62,33 +176,42 @@ class Backtest:
         else:
             self.cash_balance = initial_balance  # save_db가 False면 그냥 잔고만 설정
 
+    @property
+    def transaction_log(self) -> Union[list, TransactionLog, SpillLog]:
+        """거래 기록 목록. 지연 평가 중인 기록이 있으면 읽기 전에 평가합니다."""
+        if self._pending_valuation:
+            self.finalize_valuation()
+        return self._transaction_log
 
     def buy(self, date: datetime, crypto_name: str, price: float, quantity: float, 
-            fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005):
+            fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+            volume: Optional[float] = None):
         """암호화폐 매수 거래를 실행합니다.
         
         Args:
             date: 거래 시점
             crypto_name: 암호화폐 이름 (예: 'KRW-BTC')
-            price: 매수 가격
-            quantity: 매수 수량
+            price: 매수 가격 (fill_model이 있으면 체결 가격을 계산할 기준 가격)
+            quantity: 매수 수량 (fill_model이 있으면 주문 수량)
             fee_type: 수수료 유형 ('percent' 또는 'fixed')
             fee_amount: 수수료 금액 (percent인 경우 비율, fixed인 경우 고정 금액)
+            volume: 해당 바의 거래량 (거래량을 쓰는 fill_model에만 필요)
             
         Returns:
-            dict: 거래 정보 (시간, 가격, 수량, 총액, 수수료 등)
+            dict: 거래 정보 (시간, 가격, 수량, 총액, 수수료 등). fill_model이 체결하지 않은 주문은 None
             
         Raises:
             ValueError: 잔고가 부족한 경우
         """
+        if self.fill_model is not None:
+            price, quantity = self.fill_model.fill_one(True, price, quantity, volume)
+            if quantity == 0:
+                return None
         # 수수료 포함 total amount 계산
-        if fee_type == 'percent':
-            total_amount = price * quantity * (1 + fee_amount)
-        elif fee_type == 'fixed':
-            total_amount = price * quantity + fee_amount
+        total_amount = trade_amount('buy', price, quantity, fee_type, fee_amount)
         # 포트폴리오 업데이트
         if self.cash_balance < total_amount:
-            print(f'{date} 매수 실패\n현금보유량 : {self.cash_balance}\n투자 시도 금액 : {total_amount}')
+            self._trace_rejected(date, crypto_name, f"현금 {self.cash_balance:,.0f} KRW < 매수 금액 {total_amount:,.0f} KRW")
             raise ValueError(f"Not enough cash balance to buy {crypto_name}")
         else:
             self.cash_balance -= total_amount
@@ -98,84 +221,41 @@ class Backtest:
                 self.portfolio[crypto_name] += quantity
         # 거래 내역 기록
         self.trades_count += 1
-        asset_value = self.get_asset_value(date, '1hour')
-        total_value = asset_value + self.cash_balance
-        return_rate = total_value / self.initial_balance - 1
-        transaction_info = {
-            'date': date,
-            'crypto_name': crypto_name,
-            'price': price,
-            'quantity': quantity,
-            'total_amount': total_amount,
-            'fee_type': fee_type,
-            'fee_amount': fee_amount,
-            'transaction_type': 'Buy',
-            'cash_balance': self.cash_balance,
-            'asset_value': asset_value,
-            'total_value': total_value,
-            'return_rate': return_rate,
-        } 
-        self.transaction_log.append(transaction_info)
-        # db 저장        
-        if self.save_db:
-            log_transaction(
-                backtest_id=self.backtest_id,
-                transaction_time=date,
-                crypto_name=crypto_name,
-                market_name=self.market_name,
-                fee_type=fee_type,
-                fee_amount=fee_amount,
-                transaction_type='Buy',
-                price=price,
-                quantity=quantity,
-                total_amount=total_amount,
-                cash_balance=self.cash_balance,
-                asset_value=asset_value,
-                total_value=total_value,
-                return_rate=return_rate,
-            )
-        if self.debug:
-            print(f"\n[매수 시도] {date}")
-            print(f"코인: {crypto_name}")
-            print(f"가격: {price:,.0f} KRW")
-            print(f"수량: {quantity:.8f}")
-            print(f"총 매수 금액: {total_amount:,.0f} KRW")
-            print(f"수수료: {fee_type}, {fee_amount}")
-            print(f"실행 결과:")
-            print(f"- 현금 잔고: {self.cash_balance:,.0f} KRW")
-            print(f"- 자산 가치: {asset_value:,.0f} KRW")
-            print(f"- 총 가치: {total_value:,.0f} KRW")
-            print(f"- 수익률: {return_rate:.2%}")
-        return transaction_info
+        return self._record(date, crypto_name, price, quantity, total_amount, fee_type, fee_amount, 'Buy')
     
 
     def sell(self, date: datetime, crypto_name: str, price: float, quantity: float, 
-            fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005):
+            fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+            volume: Optional[float] = None):
         """암호화폐 매도 거래를 실행합니다.
         
         Args:
             date: 거래 시점
             crypto_name: 암호화폐 이름 (예: 'KRW-BTC')
-            price: 매도 가격
-            quantity: 매도 수량
+            price: 매도 가격 (fill_model이 있으면 체결 가격을 계산할 기준 가격)
+            quantity: 매도 수량 (fill_model이 있으면 주문 수량)
             fee_type: 수수료 유형 ('percent' 또는 'fixed')
             fee_amount: 수수료 금액 (percent인 경우 비율, fixed인 경우 고정 금액)
+            volume: 해당 바의 거래량 (거래량을 쓰는 fill_model에만 필요)
             
         Returns:
-            dict: 거래 정보 (시간, 가격, 수량, 총액, 수수료 등)
+            dict: 거래 정보 (시간, 가격, 수량, 총액, 수수료 등). fill_model이 체결하지 않은 주문은 None
             
         Raises:
             ValueError: 보유 수량이 부족한 경우
         """
+        if self.fill_model is not None:
+            price, quantity = self.fill_model.fill_one(False, price, quantity, volume)
+            if quantity == 0:
+                return None
         # total amount 계산
-        if fee_type == 'percent':
-            total_amount = price * quantity * (1 - fee_amount)
-        elif fee_type == 'fixed':
-            total_amount = price * quantity - fee_amount
+        total_amount = trade_amount('sell', price, quantity, fee_type, fee_amount)
         # 포트폴리오 업데이트
         if crypto_name not in self.portfolio:
+            self._trace_rejected(date, crypto_name, "보유 수량 없음")
             raise ValueError(f"No {crypto_name} in portfolio")
         elif self.portfolio[crypto_name] < quantity:
+            self._trace_rejected(date, crypto_name, f"보유 {self.portfolio[crypto_name]:.8f} < 매도 수량 {quantity:.8f}")
             raise ValueError(f"Not enough {crypto_name} in portfolio")
         else:
             self.portfolio[crypto_name] -= quantity
@@ -184,85 +264,137 @@ class Backtest:
             self.cash_balance += total_amount
         # 거래 내역 기록
         self.trades_count += 1
-        asset_value = self.get_asset_value(date, '1hour')
-        total_value = asset_value + self.cash_balance
-        return_rate = total_value / self.initial_balance - 1
-        transaction_info = {
-            'date': date,
-            'crypto_name': crypto_name,
-            'price': price,
-            'quantity': quantity,
-            'total_amount': total_amount,
-            'fee_type': fee_type,
-            'fee_amount': fee_amount,
-            'transaction_type': 'Sell',
-            'cash_balance': self.cash_balance,
-            'asset_value': asset_value,
-            'total_value': total_value,
-            'return_rate': return_rate,
-        }
-        self.transaction_log.append(transaction_info)
+        return self._record(date, crypto_name, price, quantity, total_amount, fee_type, fee_amount, 'Sell')
 
-        # db 저장
-        if self.save_db:
-            log_transaction(
-                backtest_id=self.backtest_id,
-                transaction_time=date,
-                crypto_name=crypto_name,
-                market_name=self.market_name,
-                fee_type=fee_type,
-                fee_amount=fee_amount,
-                transaction_type='Sell',
-                price=price,
-                quantity=quantity,
-                total_amount=total_amount,
-                cash_balance=self.cash_balance,
-                asset_value=asset_value,
-                total_value=total_value,
-                return_rate=return_rate,
-            )
-        if self.debug:
-            print(f"\n[매도 시도] {date}")
-            print(f"코인: {crypto_name}")
-            print(f"가격: {price:,.0f} KRW")
-            print(f"수량: {quantity:.8f}")
-            print(f"총 매도 금액: {total_amount:,.0f} KRW")
-            print(f"수수료: {fee_type}, {fee_amount}")
-            print(f"실행 결과:")
-            print(f"- 현금 잔고: {self.cash_balance:,.0f} KRW")
-            print(f"- 자산 가치: {asset_value:,.0f} KRW")
-            print(f"- 총 가치: {total_value:,.0f} KRW")
-            print(f"- 수익률: {return_rate:.2%}")
-        return transaction_info
+    def finalize_valuation(self):
+        """지연 평가 중인 거래 기록의 asset_value/total_value/return_rate를 계산합니다.
+
+        대기 중인 기록에 등장하는 모든 암호화폐의 가격을 한 번에 적재한 뒤 메모리에서 평가하고,
+        save_db인 경우 평가가 끝난 기록을 순서대로 db 기록기에 넘깁니다.
+        """
+        pending, self._pending_valuation = self._pending_valuation, []
+        if not pending:
+            return
+        markets = {crypto_name for _, _, holdings in pending for crypto_name in holdings}
+        if markets:
+            dates = [transaction_info['date'] for _, transaction_info, _ in pending]
+            self.price_cache.preload(markets, min(dates), max(dates), self.valuation_type)
+        for index, transaction_info, holdings in pending:
+            asset_value = self._value_holdings(holdings, transaction_info['date'], self.valuation_type)
+            self._apply_value(index, transaction_info, asset_value)
     
+    def flush(self):
+        """지연 평가 중인 기록을 평가하고 버퍼에 남아 있는 거래 기록을 db에 저장합니다."""
+        self.finalize_valuation()
+        if self.transaction_writer is not None:
+            self.transaction_writer.flush()
+
+    def close(self):
+        """백테스트를 종료하고 남은 거래 기록을 평가해 db에 저장합니다."""
+        self.finalize_valuation()
+        if self.transaction_writer is not None:
+            self.transaction_writer.close()
+        if self.log_type == 'spill':
+            self._transaction_log.close()
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def profile_report(self) -> dict:
+        """계측 결과를 반환합니다. 텍스트 보고서는 profiler.format_report(), JSON 파일은 profiler.save_json()
+
+        Raises:
+            ValueError: profile=True로 만들지 않은 경우
+        """
+        if self.profiler is None:
+            raise ValueError("Backtest was created without profile=True")
+        return self.profiler.report()
+
+    def mark_to_market(self, timestamp: datetime):
+        """거래가 없는 시점의 포트폴리오 가치를 성과 지표에 반영합니다. track_metrics가 False면 아무것도 하지 않습니다.
+
+        바 피드는 바마다 호출하므로 변동성/샤프 비율이 바 간격의 수익률로 계산됩니다.
+        가치는 valuation_type 가격으로 평가하며, lazy 평가에서는 거래 기록과 함께 finalize_valuation 때 반영됩니다.
+
+        Args:
+            timestamp: 평가 시점
+        """
+        if self.metrics is None:
+            return
+        mark = {'date': timestamp, 'cash_balance': self.cash_balance, 'transaction_type': None}
+        if self.valuation == 'lazy' or self._deferred_valuation:
+            self._pending_valuation.append((None, mark, dict(self.portfolio)))
+        else:
+            self._observe(mark, self.get_asset_value(timestamp, self.valuation_type))
+
+    def metrics_report(self) -> dict:
+        """현재까지의 성과 지표를 반환합니다. 지연 평가 중인 기록이 있으면 먼저 평가합니다.
+
+        Raises:
+            ValueError: track_metrics=True로 만들지 않은 경우
+        """
+        if self.metrics is None:
+            raise ValueError("Backtest was created without track_metrics=True")
+        if self._pending_valuation:
+            # AsyncBacktest에서도 동기로 평가 (AsyncBacktest.finalize_valuation은 코루틴)
+            Backtest.finalize_valuation(self)
+        return self.metrics.summary()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
     def get_quantity(self, crypto_name: str):
         if crypto_name not in self.portfolio:
             return 0
         else:
             return self.portfolio[crypto_name]
         
-    def get_asset_value(self, timestamp: datetime, price_type: Literal['daily', '1hour'] = '1hour') -> float:
+    def prime_prices(self, timestamp: datetime, prices: dict, price_type: str = '1hour'):
+        """특정 시점의 암호화폐 가격을 미리 알려 자산 가치 계산 시 가격 조회를 생략합니다.
+
+        바 피드처럼 이미 가격을 알고 있는 경우 사용하며, 같은 시점/가격 타입으로 자산 가치를 계산할 때
+        prices에 있는 암호화폐는 전달받은 가격을, 없는 암호화폐는 가격 캐시를 사용합니다.
+
+        Args:
+            timestamp: 가격 시점
+            prices: {암호화폐 이름: 해당 시점 이하의 가장 최근 종가}
+            price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        """
+        self._primed_prices = (timestamp, normalize(price_type), prices)
+
+    def _primed(self, timestamp: datetime, price_type: str) -> dict:
+        """prime_prices로 받은 가격 중 같은 시점/해상도의 가격 ('1h'와 '1hour'처럼 같은 해상도의 다른 이름 포함)"""
+        if self._primed_prices is not None:
+            primed_timestamp, primed_type, prices = self._primed_prices
+            if primed_timestamp == timestamp and primed_type == normalize(price_type):
+                return prices
+        return {}
+
+    def get_asset_value(self, timestamp: Union[datetime, Sequence[datetime]],
+                        price_type: str = '1hour') -> Union[float, np.ndarray]:
         """특정 시점 보유 암호화폐 총 가치 계산
         
         Args:
-            timestamp: 가치 계산 시점
-            price_type: 가격 데이터 타입 ('daily' 또는 '1hour')
+            timestamp: 가치 계산 시점 (시점 목록을 넘기면 현재 보유 수량을 각 시점 가격으로 한 번에 평가)
+            price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
             
         Returns:
-            float: 암호화폐 가치 
+            float: 암호화폐 가치 (시점 목록인 경우 시점별 가치 배열)
         """
-        total_asset_value = sum(
-            amount * get_price(crypto_name, timestamp, price_type) 
-            for crypto_name, amount in self.portfolio.items()
-        )
-        return total_asset_value
+        if not isinstance(timestamp, datetime):
+            return self._value_holdings_many(self.portfolio, timestamp, price_type)
+        return self._value_holdings(self.portfolio, timestamp, price_type)
     
-    def get_portfolio_value(self, timestamp: datetime, price_type: Literal['daily', '1hour'] = '1hour') -> float:
+    def get_portfolio_value(self, timestamp: Union[datetime, Sequence[datetime]],
+                            price_type: str = '1hour') -> Union[float, np.ndarray]:
         """특정 시점 포트폴리오 총 가치 계산
         
         Args:
-            timestamp: 가치 계산 시점
-            price_type: 가격 데이터 타입 ('daily' 또는 '1hour')
+            timestamp: 가치 계산 시점 (시점 목록을 넘기면 시점별 가치 배열을 반환)
+            price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
             
         Returns:
             float: 포트폴리오 총 가치 (현금 + 자산)
@@ -270,6 +402,49 @@ class Backtest:
         total_value = self.cash_balance + self.get_asset_value(timestamp, price_type)
         return total_value
 
+    def equity_curve(self, timestamps: Sequence[datetime], price_type: str = '1hour') -> pd.DataFrame:
+        """거래 기록을 따라가며 각 시점의 포트폴리오 가치를 계산합니다.
+
+        각 시점 이하의 마지막 거래 직후 보유 수량과 현금을 get_prices로 한 번에 조회한 가격으로 평가하므로,
+        시점 수와 관계없이 가격 조회는 두 번의 쿼리로 끝납니다.
+
+        Args:
+            timestamps: 평가 시점 목록 (예: 백테스트 구간의 1시간 간격 시간)
+            price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+        Returns:
+            pd.DataFrame: index가 timestamps, columns가 cash_balance, asset_value, total_value, return_rate
+                (보유 중인 암호화폐의 가격이 없는 시점은 asset_value가 NaN)
+        """
+        points = np.asarray(timestamps, dtype='datetime64[us]')
+        records = list(self._transaction_log)
+        markets = list(dict.fromkeys(r['crypto_name'] for r in records if r['transaction_type'] in ('Buy', 'Sell')))
+        column = {name: j for j, name in enumerate(markets)}
+        # 거래마다 직후 보유 수량/현금 (0번 행은 첫 거래 이전 상태)
+        holdings = np.zeros((len(records) + 1, len(markets)))
+        cash = np.empty(len(records) + 1)
+        cash[0] = 0.0 if self.save_db else self.initial_balance
+        for i, record in enumerate(records):
+            holdings[i + 1] = holdings[i]
+            if record['transaction_type'] == 'Buy':
+                holdings[i + 1, column[record['crypto_name']]] += record['quantity']
+            elif record['transaction_type'] == 'Sell':
+                holdings[i + 1, column[record['crypto_name']]] -= record['quantity']
+            cash[i + 1] = record['cash_balance']
+        dates = np.array([r['date'] for r in records], dtype='datetime64[us]')
+        state = np.searchsorted(dates, points, side='right')
+
+        prices = get_prices(markets, points.astype(datetime), price_type).to_numpy()
+        held = holdings[state]
+        asset_value = np.where(held != 0, held * prices, 0.0).sum(axis=1)
+        total_value = cash[state] + asset_value
+        return pd.DataFrame({
+            'cash_balance': cash[state],
+            'asset_value': asset_value,
+            'total_value': total_value,
+            'return_rate': total_value / self.initial_balance - 1,
+        }, index=pd.DatetimeIndex(points, name='timestamp_kst'))
+
     def deposit(self, date: datetime, amount: float):
         """현금 입금을 실행합니다.
         
@@ -283,54 +458,7 @@ class Backtest:
         self.cash_balance += amount
         
         # 거래 내역 기록
-        asset_value = self.get_asset_value(date, '1hour')
-        total_value = asset_value + self.cash_balance
-        return_rate = total_value / self.initial_balance - 1
-        
-        transaction_info = {
-            'date': date,
-            'crypto_name': 'KRW',
-            'price': 1,
-            'quantity': amount,
-            'total_amount': amount,
-            'fee_type': None,
-            'fee_amount': None,
-            'transaction_type': 'Deposit',
-            'cash_balance': self.cash_balance,
-            'asset_value': asset_value,
-            'total_value': total_value,
-            'return_rate': return_rate,
-        }
-        self.transaction_log.append(transaction_info)
-        
-        # db 저장
-        if self.save_db:
-            log_transaction(
-                backtest_id=self.backtest_id,
-                transaction_time=date,
-                crypto_name='KRW',
-                market_name=self.market_name,
-                fee_type='fixed',
-                fee_amount=0,
-                transaction_type='Deposit',
-                price=1,
-                quantity=amount,
-                total_amount=amount,
-                cash_balance=self.cash_balance,
-
-                asset_value=asset_value,
-                total_value=total_value,
-                return_rate=return_rate,
-            )
-        if self.debug:
-            print(f"\n[입금 실행] {date}")
-            print(f"입금액: {amount:,.0f} KRW")
-            print(f"실행 결과:")
-            print(f"- 현금 잔고: {self.cash_balance:,.0f} KRW")
-            print(f"- 자산 가치: {asset_value:,.0f} KRW")
-            print(f"- 총 가치: {total_value:,.0f} KRW")
-            print(f"- 수익률: {return_rate:.2%}")
-        return transaction_info
+        return self._record(date, 'KRW', 1, amount, amount, None, None, 'Deposit')
 
     def withdraw(self, date: datetime, amount: float):
         """현금 출금을 실행합니다.
@@ -346,64 +474,395 @@ class Backtest:
             ValueError: 잔고가 부족한 경우
         """
         if self.cash_balance < amount:
+            self._trace_rejected(date, 'KRW', f"현금 {self.cash_balance:,.0f} KRW < 출금액 {amount:,.0f} KRW")
             raise ValueError(f"Not enough cash balance to withdraw {amount}")
         
         self.cash_balance -= amount
         
         # 거래 내역 기록
-        asset_value = self.get_asset_value(date, '1hour')
-        total_value = asset_value + self.cash_balance
-        return_rate = total_value / self.initial_balance - 1
+        return self._record(date, 'KRW', 1, amount, amount, None, None, 'Withdraw')
         
+    def submit_orders(self, date: datetime, orders: Sequence[dict],
+                      fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005) -> list[dict]:
+        """같은 시점의 여러 주문을 한 번에 실행합니다.
+
+        매도 주문을 먼저(주어진 순서대로) 실행해 현금을 확보한 뒤 매수 주문을 실행하며, 결과(현금, 보유 수량,
+        거래 기록의 각 값)는 같은 순서로 sell/buy를 하나씩 호출한 것과 같습니다. 주문 하나라도 잔고/보유 수량이
+        부족하면 아무 주문도 실행하지 않습니다. 자산 가치 계산에 필요한 가격은 한 번에 조회하고,
+        save_db인 경우 모든 거래 기록을 한 번에 db 기록기에 넘깁니다.
+        fill_model이 있으면 모든 주문의 체결 가격/수량을 한 번의 배열 연산으로 계산하며, 체결 수량이 0인 주문은 빠집니다.
+
+        Args:
+            date: 거래 시점
+            orders: 주문 목록. 각 주문은 dict
+                - crypto_name: 암호화폐 이름
+                - side: 'buy' 또는 'sell'
+                - price: 거래 가격
+                - quantity: 거래 수량
+                - fee_type, fee_amount: 생략하면 인자로 넘긴 값
+                - volume: 해당 바의 거래량 (거래량을 쓰는 fill_model에만 필요)
+            fee_type: 기본 수수료 유형 ('percent' 또는 'fixed')
+            fee_amount: 기본 수수료 금액
+
+        Returns:
+            list[dict]: 실행 순서대로의 거래 정보
+
+        Raises:
+            ValueError: 주문 형식이 잘못되었거나 잔고/보유 수량이 부족한 경우
+
+        Example:
+            >>> backtest.submit_orders(datetime(2024, 6, 1), [
+            ...     {'crypto_name': 'KRW-BTC', 'side': 'sell', 'price': 90000000.0, 'quantity': 0.01},
+            ...     {'crypto_name': 'KRW-ETH', 'side': 'buy', 'price': 5000000.0, 'quantity': 0.2},
+            ... ])
+        """
+        return self._execute_orders(date, self._fill_orders(orders), fee_type, fee_amount)
+
+    def _execute_orders(self, date: datetime, orders: Sequence[dict],
+                        fee_type: Literal['percent', 'fixed'], fee_amount: float) -> list[dict]:
+        """체결 가격/수량이 정해진 주문을 실행합니다 (submit_orders, rebalance 공통)."""
+        fills = self._plan_orders(date, orders, fee_type, fee_amount)
+        if not fills:
+            return []
+        # 검증이 끝난 뒤 상태를 한 번에 반영 (portfolio는 같은 dict를 유지)
+        self.cash_balance = fills[-1][7]
+        self.portfolio.clear()
+        self.portfolio.update(fills[-1][8])
+        self.trades_count += len(fills)
+
+        entries = [
+            (*self._append(date, crypto_name, price, quantity, total_amount, order_fee_type, order_fee_amount,
+                           transaction_type, cash_balance), holdings)
+            for transaction_type, crypto_name, price, quantity, total_amount, order_fee_type, order_fee_amount,
+                cash_balance, holdings in fills
+        ]
+        if self.valuation == 'lazy' or self._deferred_valuation:
+            self._pending_valuation.extend(entries)
+        else:
+            self._value_batch(date, entries)
+        for _, transaction_info, _ in entries:
+            self._after_record(transaction_info)
+        return [transaction_info for _, transaction_info, _ in entries]
+
+    def rebalance(self, date: datetime, target_weights: dict, prices: Optional[dict] = None,
+                  price_type: Optional[str] = None, fee_type: Literal['percent', 'fixed'] = 'percent',
+                  fee_amount: float = 0.0005, min_order_value: float = 0.0,
+                  volumes: Optional[dict] = None) -> list[dict]:
+        """포트폴리오를 목표 비중에 맞추는 주문을 계산해 submit_orders처럼 한 번에 실행합니다.
+
+        현재 포트폴리오 가치(현금 + 자산)에 비중을 곱한 금액을 목표로 하며, target_weights에 없는 보유 암호화폐는
+        모두 매도합니다. 수수료 때문에 매도 후 현금이 매수 금액에 못 미치면 매수 수량을 같은 비율로 줄입니다.
+        fill_model이 있으면 체결 가격/수량(슬리피지, 부분 체결)을 반영한 뒤 매수 수량을 정합니다.
+
+        Args:
+            date: 거래 시점
+            target_weights: {암호화폐 이름: 포트폴리오 가치 대비 목표 비중}. 합이 1 이하, 나머지는 현금
+            prices: {암호화폐 이름: 거래 가격} (생략한 암호화폐는 date의 as-of 종가를 한 번에 조회)
+            price_type: 가격을 조회할 해상도 (기본값: valuation_type)
+            fee_type: 수수료 유형 ('percent' 또는 'fixed')
+            fee_amount: 수수료 금액
+            min_order_value: 이 금액 이하의 주문은 생략 (기본값: 0.0)
+            volumes: {암호화폐 이름: 해당 바의 거래량} (거래량을 쓰는 fill_model에만 필요)
+
+        Returns:
+            list[dict]: 실행 순서대로의 거래 정보
+
+        Raises:
+            ValueError: 비중이 음수이거나 합이 1을 넘는 경우, 가격이 없는 경우
+        """
+        price_type = price_type if price_type is not None else self.valuation_type
+        markets = list(dict.fromkeys([*self.portfolio, *target_weights]))
+        quotes = dict(prices) if prices is not None else {}
+        quotes.update(self._prices_at([m for m in markets if m not in quotes], date, price_type))
+        orders = self._rebalance_orders(target_weights, quotes, fee_type, fee_amount, min_order_value, volumes)
+        return self._execute_orders(date, orders, fee_type, fee_amount)
+
+    def _fill_orders(self, orders: Sequence[dict]) -> list[dict]:
+        """fill_model로 주문 전체의 체결 가격/수량을 한 번에 계산합니다. 체결 수량이 0인 주문은 뺍니다."""
+        if self.fill_model is None or not orders:
+            return list(orders)
+        is_buy = np.array([_order_side(order) == 'buy' for order in orders])
+        volumes = [order.get('volume') for order in orders]
+        prices, quantities = self.fill_model.fill(
+            is_buy,
+            np.array([order['price'] for order in orders], dtype=np.float64),
+            np.array([order['quantity'] for order in orders], dtype=np.float64),
+            None if all(v is None for v in volumes) else np.array(
+                [np.nan if v is None else v for v in volumes], dtype=np.float64),
+        )
+        return [
+            {**order, 'price': price, 'quantity': quantity}
+            for order, price, quantity in zip(orders, prices.tolist(), quantities.tolist())
+            if quantity > 0
+        ]
+
+    def _plan_orders(self, date: datetime, orders: Sequence[dict],
+                     fee_type: str, fee_amount: float) -> list[tuple]:
+        """주문을 매도 -> 매수 순서로 모의 실행해 (거래 유형, 암호화폐, 가격, 수량, 거래 금액, 수수료 유형,
+        수수료 금액, 거래 직후 현금, 거래 직후 보유 수량) 목록을 만듭니다. 상태는 바꾸지 않습니다."""
+        sells, buys = [], []
+        for order in orders:
+            side = _order_side(order)
+            (buys if side == 'buy' else sells).append((side, order))
+        cash = self.cash_balance
+        holdings = dict(self.portfolio)
+        fills = []
+        for side, order in sells + buys:
+            crypto_name, price, quantity = order['crypto_name'], order['price'], order['quantity']
+            order_fee_type = order.get('fee_type', fee_type)
+            order_fee_amount = order.get('fee_amount', fee_amount)
+            total_amount = trade_amount(side, price, quantity, order_fee_type, order_fee_amount)
+            # sell/buy와 같은 검사와 같은 연산 순서
+            if side == 'sell':
+                if crypto_name not in holdings:
+                    self._trace_rejected(date, crypto_name, "보유 수량 없음")
+                    raise ValueError(f"No {crypto_name} in portfolio")
+                elif holdings[crypto_name] < quantity:
+                    self._trace_rejected(date, crypto_name, f"보유 {holdings[crypto_name]:.8f} < 매도 수량 {quantity:.8f}")
+                    raise ValueError(f"Not enough {crypto_name} in portfolio")
+                holdings[crypto_name] -= quantity
+                if holdings[crypto_name] == 0:
+                    del holdings[crypto_name]
+                cash += total_amount
+            else:
+                if cash < total_amount:
+                    self._trace_rejected(date, crypto_name, f"현금 {cash:,.0f} KRW < 매수 금액 {total_amount:,.0f} KRW")
+                    raise ValueError(f"Not enough cash balance to buy {crypto_name}")
+                cash -= total_amount
+                if crypto_name not in holdings:
+                    holdings[crypto_name] = quantity
+                else:
+                    holdings[crypto_name] += quantity
+            fills.append(('Sell' if side == 'sell' else 'Buy', crypto_name, price, quantity, total_amount,
+                          order_fee_type, order_fee_amount, cash, dict(holdings)))
+        return fills
+
+    def _rebalance_orders(self, target_weights: dict, prices: dict, fee_type: str, fee_amount: float,
+                          min_order_value: float, volumes: Optional[dict] = None) -> list[dict]:
+        """목표 비중과 가격으로 매도/매수 주문 목록을 만듭니다. fill_model이 있으면 체결 가격/수량이 반영된 주문입니다."""
+        if any(weight < 0 for weight in target_weights.values()):
+            raise ValueError("target_weights must not be negative")
+        if sum(target_weights.values()) > 1 + 1e-9:
+            raise ValueError(f"target_weights sum to {sum(target_weights.values())}, more than 1")
+        total_value = self.cash_balance + sum(amount * prices[m] for m, amount in self.portfolio.items())
+        sells, buys = [], []
+        for crypto_name in dict.fromkeys([*self.portfolio, *target_weights]):
+            price = prices[crypto_name]
+            current = self.get_quantity(crypto_name)
+            weight = target_weights.get(crypto_name, 0.0)
+            # 비중 0은 남김없이 매도
+            delta = -current if weight == 0 else weight * total_value / price - current
+            if delta == 0 or abs(delta) * price <= min_order_value:
+                continue
+            order = {'crypto_name': crypto_name, 'price': price, 'quantity': abs(delta)}
+            if volumes is not None and crypto_name in volumes:
+                order['volume'] = volumes[crypto_name]
+            (sells if delta < 0 else buys).append({**order, 'side': 'sell' if delta < 0 else 'buy'})
+        if self.fill_model is not None:
+            filled = self._fill_orders(sells + buys)
+            sells = [order for order in filled if order['side'] == 'sell']
+            buys = [order for order in filled if order['side'] == 'buy']
+
+        # 매도 후 현금으로 수수료까지 지불할 수 있도록 매수 수량 조정
+        cash = self.cash_balance + sum(
+            trade_amount('sell', o['price'], o['quantity'], fee_type, fee_amount) for o in sells)
+        cost = sum(trade_amount('buy', o['price'], o['quantity'], fee_type, fee_amount) for o in buys)
+        scale = min(1.0, cash / cost) if cost > 0 else 1.0
+        orders = list(sells)
+        for order in buys:
+            quantity = min(order['quantity'] * scale,
+                           _affordable_quantity(order['price'], cash, fee_type, fee_amount))
+            if quantity <= 0 or quantity * order['price'] <= min_order_value:
+                continue
+            cash -= trade_amount('buy', order['price'], quantity, fee_type, fee_amount)
+            orders.append({**order, 'quantity': quantity})
+        return orders
+
+    def _record(self, date: datetime, crypto_name: str, price: float, quantity: float, total_amount: float,
+                fee_type: Optional[str], fee_amount: Optional[float], transaction_type: str) -> dict:
+        """거래 정보를 만들어 거래 기록에 추가하고, 자산 평가/db 저장/디버그 출력을 처리합니다."""
+        index, transaction_info = self._append(date, crypto_name, price, quantity, total_amount,
+                                               fee_type, fee_amount, transaction_type, self.cash_balance)
+        if self.valuation == 'lazy' or self._deferred_valuation:
+            self._pending_valuation.append((index, transaction_info, dict(self.portfolio)))
+        else:
+            self._apply_value(index, transaction_info, self.get_asset_value(date, self.valuation_type))
+        self._after_record(transaction_info)
+        return transaction_info
+
+    def _append(self, date: datetime, crypto_name: str, price: float, quantity: float, total_amount: float,
+                fee_type: Optional[str], fee_amount: Optional[float], transaction_type: str,
+                cash_balance: float) -> tuple[int, dict]:
         transaction_info = {
             'date': date,
-            'crypto_name': 'KRW',
-            'price': 1,
-            'quantity': amount,
-            'total_amount': amount,
-            'fee_type': None,
-            'fee_amount': None,
-            'transaction_type': 'Withdraw',
-            'cash_balance': self.cash_balance,
-            'asset_value': asset_value,
-            'total_value': total_value,
-            'return_rate': return_rate,
+            'crypto_name': crypto_name,
+            'price': price,
+            'quantity': quantity,
+            'total_amount': total_amount,
+            'fee_type': fee_type,
+            'fee_amount': fee_amount,
+            'transaction_type': transaction_type,
+            'cash_balance': cash_balance,
+            'asset_value': None,
+            'total_value': None,
+            'return_rate': None,
         }
-        self.transaction_log.append(transaction_info)
+        index = len(self._transaction_log)
+        self._transaction_log.append(transaction_info)
+        return index, transaction_info
+
+    def _after_record(self, transaction_info: dict):
+        if self.profiler is not None:
+            self.profiler.count('transactions')
+        if self.trace is not None:
+            self.trace.emit(INFO, 'transaction', self.backtest_id, transaction_info['date'],
+                            transaction_info['crypto_name'], transaction_info)
         
-        # db 저장
-        if self.save_db:
-            log_transaction(
-                backtest_id=self.backtest_id,
-                transaction_time=date,
-                crypto_name='KRW',
-                market_name=self.market_name,
-                fee_type='fixed',
-                fee_amount=0,
-                transaction_type='Withdraw',
-                price=1,
-                quantity=amount,
-                total_amount=amount,
-                cash_balance=self.cash_balance,
-                asset_value=asset_value,
-                total_value=total_value,
-                return_rate=return_rate,
-            )
-        if self.debug:
-            print(f"\n[출금 실행] {date}")
-            print(f"출금액: {amount:,.0f} KRW")
-            print(f"실행 결과:")
-            print(f"- 현금 잔고: {self.cash_balance:,.0f} KRW")
-            print(f"- 자산 가치: {asset_value:,.0f} KRW")
-            print(f"- 총 가치: {total_value:,.0f} KRW")
-            print(f"- 수익률: {return_rate:.2%}")
-        return transaction_info
+    def _value_holdings(self, holdings: dict, timestamp: datetime, price_type: str) -> float:
+        if self.profiler is not None:
+            with self.profiler.phase('asset_value', (timestamp, len(holdings))):
+                return self._sum_holdings(holdings, timestamp, price_type)
+        return self._sum_holdings(holdings, timestamp, price_type)
+
+    def _value_holdings_many(self, holdings: dict, timestamps: Sequence[datetime], price_type: str) -> np.ndarray:
+        prices = get_prices(list(holdings), timestamps, price_type, missing='raise')
+        # 시점 하나를 평가할 때와 같은 순서로 더해 결과가 같도록 함
+        return sum((amount * prices[crypto_name].to_numpy() for crypto_name, amount in holdings.items()),
+                   np.zeros(len(prices)))
+
+    def _sum_holdings(self, holdings: dict, timestamp: datetime, price_type: str) -> float:
+        prices = self._primed(timestamp, price_type)
+        if prices:
+            return sum(
+                    amount * (prices[crypto_name] if crypto_name in prices
+                              else self.price_cache.get_price(crypto_name, timestamp, price_type))
+                    for crypto_name, amount in holdings.items()
+                )
+        return sum(
+            amount * self.price_cache.get_price(crypto_name, timestamp, price_type)
+            for crypto_name, amount in holdings.items()
+        )
+
+    def _apply_value(self, index: Optional[int], transaction_info: dict, asset_value: float):
+        # 평가 결과를 거래 기록/성과 지표/db에 반영 (index가 None이면 mark_to_market 관측)
+        if self.trace is not None:
+            self._trace_value(index, transaction_info, asset_value)
+        if index is None:
+            self._observe(transaction_info, asset_value)
+            return
+        self._set_value(index, transaction_info, asset_value)
+        self._observe(transaction_info, asset_value)
+        self._save(transaction_info)
+
+    def _value_batch(self, date: datetime, entries: list):
+        # 한 시점의 거래 기록들을 한 번 조회한 가격으로 평가하고 db 기록기에 한 번에 넘김
+        markets = list(dict.fromkeys(crypto_name for _, _, holdings in entries for crypto_name in holdings))
+        if self.profiler is not None:
+            with self.profiler.phase('asset_value', (date, len(markets))):
+                prices = self._prices_at(markets, date, self.valuation_type)
+        else:
+            prices = self._prices_at(markets, date, self.valuation_type)
+        rows = []
+        for index, transaction_info, holdings in entries:
+            # _sum_holdings와 같은 순서로 더해 결과가 같도록 함
+            asset_value = sum(amount * prices[crypto_name] for crypto_name, amount in holdings.items())
+            self._set_value(index, transaction_info, asset_value)
+            if self.trace is not None:
+                self._trace_value(index, transaction_info, asset_value)
+            self._observe(transaction_info, asset_value)
+            rows.append(self._row(transaction_info))
+        if self.transaction_writer is not None:
+            self.transaction_writer.add_many(rows)
+
+    def _prices_at(self, markets: Sequence[str], timestamp: datetime, price_type: str) -> dict:
+        """여러 암호화폐의 as-of 가격. prime_prices로 받은 가격과 캐시를 먼저 쓰고, 나머지는 한 번에 적재합니다."""
+        primed = self._primed(timestamp, price_type)
+        prices, missing = {}, []
+        for crypto_name in markets:
+            price = primed.get(crypto_name)
+            if price is None:
+                price = self.price_cache.peek(crypto_name, timestamp, price_type)
+            if price is None:
+                missing.append(crypto_name)
+            else:
+                prices[crypto_name] = price
+        if missing:
+            # PriceCache가 미스 때 적재하는 구간을 여러 암호화폐에 대해 한 번에 적재
+            self.price_cache.preload(missing, timestamp, timestamp + self.price_cache.window, price_type)
+            for crypto_name in missing:
+                prices[crypto_name] = self.price_cache.get_price(crypto_name, timestamp, price_type)
+        return prices
+
+    def _observe(self, transaction_info: dict, asset_value: float):
+        if self.metrics is None:
+            return
+        transaction_type = transaction_info['transaction_type']
+        flow, traded = 0.0, 0.0
+        if transaction_type == 'Deposit':
+            flow = transaction_info['total_amount']
+        elif transaction_type == 'Withdraw':
+            flow = -transaction_info['total_amount']
+        elif transaction_type in ('Buy', 'Sell'):
+            traded = transaction_info['price'] * transaction_info['quantity']
+        self.metrics.update(transaction_info['date'], transaction_info['cash_balance'] + asset_value,
+                            asset_value, flow, traded)
+
+    def _set_value(self, index: int, transaction_info: dict, asset_value: float):
+        total_value = asset_value + transaction_info['cash_balance']
+        transaction_info['asset_value'] = asset_value
+        transaction_info['total_value'] = total_value
+        transaction_info['return_rate'] = total_value / self.initial_balance - 1
+        if self.log_type in ('columnar', 'spill'):
+            # 열 기반 기록은 dict와 따로 저장되므로 평가 결과를 반영
+            self._transaction_log.update(index, {
+                'asset_value': asset_value,
+                'total_value': total_value,
+                'return_rate': transaction_info['return_rate'],
+            })
+
+    def _save(self, transaction_info: dict):
+        if self.transaction_writer is None:
+            return
+        self.transaction_writer.add(**self._row(transaction_info))
+
+    def _row(self, transaction_info: dict) -> dict:
+        # db 저장용 행 (입출금은 수수료 없는 fixed 유형으로 저장)
+        return dict(
+            backtest_id=self.backtest_id,
+            transaction_time=transaction_info['date'],
+            crypto_name=transaction_info['crypto_name'],
+            market_name=self.market_name,
+            fee_type=transaction_info['fee_type'] if transaction_info['fee_type'] is not None else 'fixed',
+            fee_amount=transaction_info['fee_amount'] if transaction_info['fee_amount'] is not None else 0,
+            transaction_type=transaction_info['transaction_type'],
+            price=transaction_info['price'],
+            quantity=transaction_info['quantity'],
+            total_amount=transaction_info['total_amount'],
+            cash_balance=transaction_info['cash_balance'],
+            asset_value=transaction_info['asset_value'],
+            total_value=transaction_info['total_value'],
+            return_rate=transaction_info['return_rate'],
+        )
+
+    def _trace_value(self, index: Optional[int], transaction_info: dict, asset_value: float):
+        if self.trace.enabled(DEBUG):
+            self.trace.emit(DEBUG, 'valuation' if index is not None else 'mark', self.backtest_id,
+                            transaction_info['date'], data={
+                                'asset_value': asset_value,
+                                'total_value': transaction_info['cash_balance'] + asset_value,
+                            })
+
+    def _trace_rejected(self, date: datetime, crypto_name: str, message: str):
+        if self.trace is not None:
+            self.trace.emit(WARNING, 'rejected', self.backtest_id, date, crypto_name, message=message)
 
 if __name__ == '__main__':
     strategy = Backtest(backtest_id='test', start_date=datetime(2024, 12, 12), market_name='upbit', save_db=True, debug=True)
     strategy.buy(datetime.now(), 'KRW-BTC', 10000000, 0.0001, fee_type='percent', fee_amount=0.005)
 
     strategy.sell(datetime.now(), 'KRW-BTC', 10000000, 0.0001, fee_type='percent', fee_amount=0.005)
+    strategy.close()
+    print(strategy.trace.render())
 
 
 
@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+from backtest_class import Backtest
+from get_price import PriceSource, price_source_for
+from checkpoint import Checkpointer
+
+# 바 콜백: (Backtest, 바 시간, {암호화폐: 이번 바 종가}) -> None
+OnBar = Callable[[Backtest, datetime, dict], None]
+# 조기 종료 조건: (Backtest, 바 시간) -> True면 실행 중단
+StopWhen = Callable[[Backtest, datetime], bool]
+
+
+class BarFeed:
+    """여러 암호화폐의 캔들을 시간순으로 하나의 흐름으로 합쳐 돌려주는 스트리밍 바 피드입니다.
+
+    가격 소스에서 chunk_size 행씩 읽어(db는 서버 측 커서) 같은 시간의 캔들을 묶어 돌려주므로,
+    조회 구간 길이와 관계없이 메모리 사용량이 일정합니다.
+
+    Attributes:
+        markets (list[str]): 암호화폐 이름 목록
+        start (datetime): 시작 시간 (포함)
+        end (datetime): 종료 시간 (포함)
+        price_type (str): 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        chunk_size (int): 한 번에 읽는 행 수
+        last_prices (dict): 지금까지 읽은 암호화폐별 가장 최근 종가
+
+    Example:
+        >>> feed = BarFeed(['KRW-BTC', 'KRW-ETH'], datetime(2024, 1, 1), datetime(2024, 12, 31), '1hour')
+        >>> for timestamp, bar in feed:
+        ...     print(timestamp, bar)
+    """
+
+    def __init__(self, markets: Iterable[str], start: datetime, end: datetime,
+                 price_type: str = '1hour', chunk_size: int = 10000,
+                 source: Optional[PriceSource] = None):
+        """
+        Args:
+            markets: 암호화폐 이름 목록
+            start: 시작 시간 (포함)
+            end: 종료 시간 (포함)
+            price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+            chunk_size: 한 번에 읽는 행 수 (기본값: 10000)
+            source: 가격 소스 (기본값: 현재 설정된 가격 소스)
+        """
+        self.markets = list(markets)
+        self.start = start
+        self.end = end
+        self.price_type = price_type
+        self.chunk_size = chunk_size
+        self.source = source
+        self.last_prices = {}
+
+    def __iter__(self) -> Iterator[tuple[datetime, dict]]:
+        """(바 시간, {암호화폐: 종가})를 시간순으로 돌려줍니다. 해당 시간에 캔들이 있는 암호화폐만 포함됩니다."""
+        source = self.source if self.source is not None else price_source_for(self.price_type)
+        self.last_prices = {}
+        current, bar = None, {}
+        for timestamp, market, close in source.iter_bars(self.markets, self.start, self.end,
+                                                         self.price_type, self.chunk_size):
+            if timestamp != current and bar:
+                yield current, bar
+                bar = {}
+            current = timestamp
+            bar[market] = close
+            self.last_prices[market] = close
+        if bar:
+            yield current, bar
+
+    def run(self, backtest: Backtest, on_bar: OnBar, stop_when: Optional[StopWhen] = None,
+            checkpoint: Optional[Checkpointer] = None) -> Backtest:
+        """바마다 on_bar 콜백을 호출해 전략을 실행합니다.
+
+        콜백 호출 전에 지금까지의 최근 종가를 backtest.prime_prices로 넘기므로,
+        콜백 안에서 바 시간으로 거래하면 자산 가치 계산에 추가 가격 조회가 없습니다.
+        backtest가 track_metrics=True면 콜백 뒤에 mark_to_market으로 바 시점의 가치를 성과 지표에 반영합니다.
+
+        Args:
+            backtest: 거래를 실행할 Backtest 인스턴스
+            on_bar: (Backtest, 바 시간, {암호화폐: 이번 바 종가})를 받는 콜백
+            stop_when: 바마다 콜백 뒤에 호출해 True를 반환하면 실행을 멈추는 조건
+                (예: lambda bt, ts: bt.metrics.max_drawdown < -0.3)
+            checkpoint: 바마다 maybe_save를 호출하고 실행이 끝나면 마지막 바까지 저장할 체크포인트
+
+        Returns:
+            Backtest: 전달받은 backtest
+        """
+        timestamp = None
+        for timestamp, bar in self:
+            backtest.prime_prices(timestamp, self.last_prices, self.price_type)
+            on_bar(backtest, timestamp, bar)
+            backtest.mark_to_market(timestamp)
+            if checkpoint is not None:
+                checkpoint.maybe_save(timestamp)
+            if stop_when is not None and stop_when(backtest, timestamp):
+                break
+        if checkpoint is not None and timestamp is not None:
+            checkpoint.save(timestamp)
+        return backtest
+
+
+def run_strategy(backtest: Backtest, on_bar: OnBar, markets: Iterable[str], start: datetime, end: datetime,
+                 price_type: str = '1hour', chunk_size: int = 10000,
+                 stop_when: Optional[StopWhen] = None, checkpoint: Optional[Checkpointer] = None) -> Backtest:
+    """BarFeed를 만들어 on_bar 전략을 실행합니다.
+
+    Args:
+        backtest: 거래를 실행할 Backtest 인스턴스
+        on_bar: (Backtest, 바 시간, {암호화폐: 이번 바 종가})를 받는 콜백
+        markets: 암호화폐 이름 목록
+        start: 시작 시간 (포함)
+        end: 종료 시간 (포함)
+        price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        chunk_size: 한 번에 읽는 행 수
+        stop_when: 바마다 호출해 True를 반환하면 실행을 멈추는 조건 (BarFeed.run 참고)
+        checkpoint: 실행 상태를 주기적으로 저장할 체크포인트 (BarFeed.run 참고)
+
+    Returns:
+        Backtest: 전달받은 backtest
+
+    Example:
+        >>> def on_bar(bt, timestamp, bar):
+        ...     if 'KRW-BTC' in bar and bt.get_quantity('KRW-BTC') == 0:
+        ...         bt.buy(timestamp, 'KRW-BTC', bar['KRW-BTC'], 0.01)
+        >>> bt = run_strategy(Backtest('test', datetime(2024, 1, 1)), on_bar,
+        ...                   ['KRW-BTC'], datetime(2024, 1, 1), datetime(2024, 12, 31))
+    """
+    return BarFeed(markets, start, end, price_type, chunk_size).run(backtest, on_bar, stop_when, checkpoint)
@@ -0,0 +1,473 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# 벤치마크 시나리오: (설정) -> 측정값 dict
+Scenario = Callable[[dict], dict]
+
+DEFAULT_CONFIG = {
+    'markets': 5,            # 합성 암호화폐 수
+    'days': 365,             # 합성 가격 데이터 기간 (일)
+    'seed': 42,              # 난수 시드
+    'lookups': 2000,         # 가격 조회 횟수
+    'trades': 5000,          # Backtest 거래 횟수
+    'db_rows': 2000,         # db 저장 행 수
+    'batch_size': 1000,      # TransactionWriter 배치 크기
+    'variants': 20,          # BacktestGroup 변형 수
+}
+START = datetime(2024, 1, 1)
+
+
+def use_database(path: str):
+    """벤치마크가 사용할 로컬 sqlite db를 설정합니다.
+
+    Args:
+        path: sqlite db 파일 경로
+    """
+    from util.db_engine import configure_engine
+    url = f"sqlite:///{Path(path).resolve()}"
+    # spawn으로 시작하는 자식 프로세스도 같은 db를 사용하도록 환경변수에도 설정
+    os.environ['DATABASE_URL'] = url
+    configure_engine(url)
+
+
+def market_names(count: int) -> list[str]:
+    return [f"KRW-SYN{i:03d}" for i in range(count)]
+
+
+def seed_database(engine, markets: int, days: int, seed: int = 42) -> dict:
+    """upbit_daily_price / upbit_1hour_price 테이블을 합성 가격 데이터로 다시 만들고 거래 기록 테이블을 만듭니다.
+
+    가격은 시드가 같으면 항상 같은 로그 정규 랜덤 워크로 생성됩니다.
+
+    Args:
+        engine: 데이터를 넣을 db 엔진
+        markets: 합성 암호화폐 수
+        days: 데이터 기간 (일, START부터)
+        seed: 난수 시드
+
+    Returns:
+        dict: {가격 테이블 이름: 행 수}
+    """
+    from sqlalchemy import MetaData
+    from util.table_price import price_table
+    from util.table_transaction_id_log import Base
+
+    metadata = MetaData()
+    tables = {type: price_table(type, metadata) for type in ('daily', '1hour')}
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = np.random.default_rng(seed)
+    hours = days * 24
+    hourly = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (hours, markets)), axis=0))
+    hour_times = [START + timedelta(hours=h) for h in range(hours)]
+    counts = {}
+    with engine.begin() as conn:
+        for type, step in (('1hour', 1), ('daily', 24)):
+            rows = [
+                {'market': name, 'timestamp_kst': hour_times[h], 'close': float(hourly[h, m])}
+                for m, name in enumerate(market_names(markets))
+                for h in range(0, hours, step)
+            ]
+            conn.execute(tables[type].insert(), rows)
+            counts[tables[type].name] = len(rows)
+    return counts
+
+
+def latency_stats(samples: list[float]) -> dict:
+    """초 단위 측정값 목록의 밀리초 단위 백분위수를 계산합니다."""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def _random_lookups(config: dict) -> list[tuple[str, datetime]]:
+    rng = np.random.default_rng(config['seed'] + 1)
+    names = market_names(config['markets'])
+    hours = config['days'] * 24
+    return [
+        (names[rng.integers(len(names))], START + timedelta(minutes=int(rng.integers(hours * 60))))
+        for _ in range(config['lookups'])
+    ]
+
+
+def bench_get_price(config: dict) -> dict:
+    """db에서 가격 한 건씩 조회할 때의 지연 시간 (get_price)"""
+    from get_price import DatabasePriceSource
+    source = DatabasePriceSource()
+    samples = []
+    for name, timestamp in _random_lookups(config):
+        started = time.perf_counter()
+        source.get_price(name, timestamp, '1hour')
+        samples.append(time.perf_counter() - started)
+    return latency_stats(samples)
+
+
+def bench_price_cache(config: dict) -> dict:
+    """가격 캐시로 조회할 때의 지연 시간 (처음 구간 적재 포함)"""
+    from price_cache import PriceCache
+    cache = PriceCache()
+    samples = []
+    for name, timestamp in _random_lookups(config):
+        started = time.perf_counter()
+        cache.get_price(name, timestamp, '1hour')
+        samples.append(time.perf_counter() - started)
+    result = latency_stats(samples)
+    result['hit_rate'] = cache.stats()['hit_rate']
+    return result
+
+
+def bench_get_prices(config: dict) -> dict:
+    """전체 암호화폐를 1시간 간격 모든 시점에서 한 번에 조회 (get_prices)"""
+    from get_price import get_prices
+    points = [START + timedelta(hours=h) for h in range(config['days'] * 24)]
+    started = time.perf_counter()
+    prices = get_prices(market_names(config['markets']), points, '1hour')
+    elapsed = time.perf_counter() - started
+    return {'values': prices.size, 'seconds': elapsed, 'values_per_sec': prices.size / elapsed}
+
+
+def _run_backtest(config: dict, backtest_id: str = 'benchmark', **options) -> dict:
+    from backtest_class import Backtest
+    from price_cache import PriceCache
+
+    names = market_names(config['markets'])
+    rng = np.random.default_rng(config['seed'] + 2)
+    hours = config['days'] * 24
+    trades = config['trades']
+    backtest = Backtest(backtest_id, START, initial_balance=1e12, price_cache=PriceCache(), **options)
+    started = time.perf_counter()
+    for i in range(trades):
+        # 매수 후 같은 수량을 매도하는 거래를 반복 (시간은 앞으로만 진행)
+        name = names[(i // 2) % len(names)]
+        timestamp = START + timedelta(hours=int(i * (hours - 1) / trades))
+        price = float(rng.uniform(90, 110))
+        if i % 2 == 0:
+            backtest.buy(timestamp, name, price, 1.0)
+        else:
+            backtest.sell(timestamp, name, price, 1.0)
+    backtest.close()
+    elapsed = time.perf_counter() - started
+    return {'trades': trades, 'seconds': elapsed, 'trades_per_sec': trades / elapsed}
+
+
+def bench_backtest_eager(config: dict) -> dict:
+    """거래마다 자산 가치를 계산하는 기본 Backtest"""
+    return _run_backtest(config)
+
+
+def bench_backtest_lazy(config: dict) -> dict:
+    """지연 평가 + 열 기반 거래 기록 Backtest"""
+    return _run_backtest(config, valuation='lazy', log_type='columnar')
+
+
+def bench_backtest_spill(config: dict) -> dict:
+    """최근 기록만 메모리에 두고 나머지는 디스크로 내보내는 거래 기록 Backtest"""
+    from transaction_log import SpillLog
+    return _run_backtest(config, log_type='spill', spill_log=SpillLog(tail_size=max(config['trades'] // 10, 1)))
+
+
+def bench_backtest_save_db(config: dict) -> dict:
+    """db 저장을 포함한 Backtest"""
+    return _run_backtest(config, save_db=True)
+
+
+def bench_replay(config: dict) -> dict:
+    """db에 저장된 실행을 읽어(load_run) 다시 계산하는(replay) 재검증"""
+    from sqlalchemy import delete
+    from replay import load_run, replay
+    from util.db_engine import get_engine
+    from util.table_transaction_id_log import Transaction
+    backtest_id = 'benchmark-replay'
+    # 메모리 측정으로 다시 실행될 때 이전 기록이 섞이지 않도록 지우고 저장
+    with get_engine().begin() as conn:
+        conn.execute(delete(Transaction).where(Transaction.backtest_id == backtest_id))
+    _run_backtest(config, backtest_id=backtest_id, save_db=True)
+    started = time.perf_counter()
+    frame = load_run(backtest_id)
+    loaded = time.perf_counter()
+    result = replay(frame)
+    elapsed = time.perf_counter() - started
+    return {'rows': len(frame), 'load_seconds': loaded - started, 'replay_seconds': elapsed - (loaded - started),
+            'rows_per_sec': len(frame) / elapsed, 'drift_rows': len(result['drift'])}
+
+
+def _transaction_row(i: int) -> dict:
+    return {
+        'backtest_id': 'benchmark', 'transaction_time': START + timedelta(hours=i), 'crypto_name': 'KRW-SYN000',
+        'transaction_type': 'Buy', 'price': 100.0, 'quantity': 1.0, 'total_amount': 100.05,
+        'cash_balance': 1e7, 'asset_value': 100.0, 'total_value': 1e7, 'return_rate': 0.0,
+        'market_name': 'upbit', 'fee_type': 'percent', 'fee_amount': 0.0005,
+    }
+
+
+def bench_log_transaction(config: dict) -> dict:
+    """거래마다 세션을 열고 커밋하는 log_transaction의 저장 처리량"""
+    from util.log_transaction import log_transaction
+    rows = config['db_rows']
+    started = time.perf_counter()
+    for i in range(rows):
+        log_transaction(**_transaction_row(i))
+    elapsed = time.perf_counter() - started
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_sec': rows / elapsed}
+
+
+def bench_transaction_writer(config: dict) -> dict:
+    """TransactionWriter 일괄 저장 처리량"""
+    from util.log_transaction import TransactionWriter
+    rows = config['db_rows']
+    started = time.perf_counter()
+    with TransactionWriter(batch_size=config['batch_size'], flush_interval=None) as writer:
+        for i in range(rows):
+            writer.add(**_transaction_row(i))
+    elapsed = time.perf_counter() - started
+    return {'rows': writer.written, 'seconds': elapsed, 'rows_per_sec': writer.written / elapsed}
+
+
+def bench_vectorized(config: dict) -> dict:
+    """db에서 가격 행렬을 읽어 벡터화 백테스트 실행 (이동평균 교차 전략)"""
+    from sweep import load_price_matrix
+    from vectorized_backtest import run_vectorized
+    end = START + timedelta(days=config['days'])
+    started = time.perf_counter()
+    prices = load_price_matrix(market_names(config['markets']), START, end, '1hour')
+    loaded = time.perf_counter()
+    positions = (prices.rolling(12).mean() > prices.rolling(48).mean()).astype(float)
+    result = run_vectorized(prices, positions, initial_balance=1e9)
+    finished = time.perf_counter()
+    bars = len(prices)
+    return {
+        'bars': bars,
+        'trades': result['trades_count'],
+        'load_seconds': loaded - started,
+        'run_seconds': finished - loaded,
+        'bars_per_sec': bars / (finished - loaded),
+    }
+
+
+def bench_group_runner(config: dict) -> dict:
+    """BacktestGroup으로 여러 변형을 한 바 피드에서 함께 실행 (바마다 보유 여부를 뒤집는 전략)"""
+    from group_runner import BacktestGroup
+
+    def on_bar(backtest, timestamp, bar, params):
+        for crypto_name, price in bar.items():
+            quantity = backtest.get_quantity(crypto_name)
+            if quantity:
+                backtest.sell(timestamp, crypto_name, price, quantity)
+            else:
+                backtest.buy(timestamp, crypto_name, price, params['size'])
+
+    end = START + timedelta(days=min(config['days'], 30))
+    variants = [{'size': 1.0 + i} for i in range(config['variants'])]
+    group = BacktestGroup.from_variants('benchmark', START, variants, initial_balance=1e12)
+    started = time.perf_counter()
+    group.run(on_bar, market_names(config['markets']), START, end, '1hour')
+    elapsed = time.perf_counter() - started
+    trades = sum(backtest.trades_count for backtest in group.backtests)
+    return {'variants': len(group), 'trades': trades, 'seconds': elapsed, 'trades_per_sec': trades / elapsed}
+
+
+def bench_fill_model(config: dict) -> dict:
+    """체결 모델의 주문당 비용 (주문 배열 일괄 계산과 fill_one 단건 호출 비교)"""
+    from fill_model import FixedSlippage, SpreadImpact, VolumeParticipation
+    orders = config['trades']
+    rng = np.random.default_rng(config['seed'])
+    is_buy = rng.random(orders) < 0.5
+    price = rng.uniform(100.0, 200.0, orders)
+    quantity = rng.uniform(1.0, 10.0, orders)
+    volume = rng.uniform(10.0, 1000.0, orders)
+    spread_impact = SpreadImpact(spread_bps=10, impact=0.05)
+    models = {
+        'fixed': FixedSlippage(5),
+        'spread_impact': spread_impact,
+        'participation': VolumeParticipation(0.1, price_model=spread_impact),
+    }
+    result = {'orders': orders}
+    for name, model in models.items():
+        started = time.perf_counter()
+        model.fill(is_buy, price, quantity, volume)
+        result[f'{name}_orders_per_sec'] = orders / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for i in range(orders):
+        spread_impact.fill_one(bool(is_buy[i]), float(price[i]), float(quantity[i]), float(volume[i]))
+    result['scalar_orders_per_sec'] = orders / (time.perf_counter() - started)
+    result['spread_impact_ns_per_order'] = 1e9 / result['spread_impact_orders_per_sec']
+    return result
+
+
+SCENARIOS: dict[str, Scenario] = {
+    'get_price': bench_get_price,
+    'price_cache': bench_price_cache,
+    'get_prices': bench_get_prices,
+    'backtest_eager': bench_backtest_eager,
+    'backtest_lazy': bench_backtest_lazy,
+    'backtest_spill': bench_backtest_spill,
+    'backtest_save_db': bench_backtest_save_db,
+    'log_transaction': bench_log_transaction,
+    'transaction_writer': bench_transaction_writer,
+    'vectorized': bench_vectorized,
+    'group_runner': bench_group_runner,
+    'fill_model': bench_fill_model,
+    'replay': bench_replay,
+}
+
+
+def measure_peak_memory(scenario: Scenario, config: dict) -> int:
+    """시나리오를 tracemalloc으로 한 번 더 실행해 최대 파이썬 메모리 할당량(바이트)을 측정합니다.
+
+    tracemalloc은 실행 속도를 떨어뜨리므로 시간 측정과 따로 실행합니다.
+    """
+    tracemalloc.start()
+    try:
+        scenario(config)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(config: Optional[dict] = None, scenarios: Optional[list[str]] = None,
+                   memory: bool = True, progress: bool = True) -> dict:
+    """db를 합성 데이터로 채운 뒤 시나리오별 측정값을 모읍니다. 먼저 use_database()로 db를 설정해야 합니다.
+
+    Args:
+        config: DEFAULT_CONFIG를 덮어쓸 설정
+        scenarios: 실행할 시나리오 이름 목록 (기본값: 전체)
+        memory: 최대 메모리 측정 여부
+        progress: 진행 상황 출력 여부
+
+    Returns:
+        dict: {'meta': 실행 환경/설정, 'scenarios': {시나리오 이름: 측정값}}
+
+    Raises:
+        ValueError: 알 수 없는 시나리오 이름
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    names = list(SCENARIOS) if scenarios is None else list(scenarios)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {unknown}")
+
+    from util.db_engine import get_engine
+    engine = get_engine()
+    seeded = seed_database(engine, config['markets'], config['days'], config['seed'])
+    results = {}
+    for name in names:
+        if progress:
+            print(f"[{name}] 실행 중...", flush=True)
+        results[name] = SCENARIOS[name](config)
+        if memory:
+            results[name]['peak_memory_bytes'] = measure_peak_memory(SCENARIOS[name], config)
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': engine.url.render_as_string(hide_password=True),
+            'config': config,
+            'rows': seeded,
+        },
+        'scenarios': results,
+    }
+
+
+def compare_results(current: dict, previous: dict, threshold: float = 0.1) -> list[dict]:
+    """두 벤치마크 결과의 같은 측정값을 비교합니다.
+
+    *_per_sec는 클수록, *_ms / *_seconds / *_bytes는 작을수록 좋은 값으로 보고,
+    threshold 비율 이상 나빠진 측정값을 regression으로 표시합니다.
+
+    Returns:
+        list[dict]: [{'scenario', 'metric', 'previous', 'current', 'change', 'regression'}]
+    """
+    rows = []
+    for scenario, metrics in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(scenario, {})
+        for metric, value in metrics.items():
+            higher_is_better = metric.endswith('_per_sec')
+            lower_is_better = metric.endswith(('_ms', '_seconds', '_bytes'))
+            if not (higher_is_better or lower_is_better) or not before.get(metric):
+                continue
+            change = value / before[metric] - 1
+            worse = -change if higher_is_better else change
+            rows.append({
+                'scenario': scenario, 'metric': metric, 'previous': before[metric], 'current': value,
+                'change': change, 'regression': worse > threshold,
+            })
+    return rows
+
+
+def print_results(results: dict):
+    print(f"\ncommit: {results['meta']['commit']}, rows: {results['meta']['rows']}")
+    for name, metrics in results['scenarios'].items():
+        values = ', '.join(
+            f"{key}={value:,.3f}" if isinstance(value, float) else f"{key}={value:,}"
+            for key, value in metrics.items()
+        )
+        print(f"{name}: {values}")
+
+
+def print_comparison(rows: list[dict], previous_commit: Optional[str]):
+    print(f"\n{previous_commit} 대비:")
+    for row in rows:
+        mark = '  <-- regression' if row['regression'] else ''
+        print(f"{row['scenario']}.{row['metric']}: {row['previous']:,.3f} -> {row['current']:,.3f} "
+              f"({row['change']:+.1%}){mark}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='로컬 sqlite 합성 가격 db로 가격 조회/백테스트/db 저장 성능을 측정합니다.')
+    parser.add_argument('--db', default='benchmark.sqlite', help='합성 데이터를 넣을 sqlite 파일 (실행마다 다시 생성)')
+    parser.add_argument('--output', default=None, help='결과 JSON 저장 경로')
+    parser.add_argument('--compare', default=None, help='비교할 이전 결과 JSON 경로')
+    parser.add_argument('--threshold', type=float, default=0.1, help='regression으로 표시할 악화 비율')
+    parser.add_argument('--scenarios', nargs='*', default=None, choices=list(SCENARIOS))
+    parser.add_argument('--no-memory', action='store_true', help='최대 메모리 측정 생략')
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    use_database(args.db)
+    results = run_benchmarks(
+        {key: getattr(args, key) for key in DEFAULT_CONFIG},
+        args.scenarios, memory=not args.no_memory,
+    )
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        rows = compare_results(results, previous, args.threshold)
+        print_comparison(rows, previous['meta'].get('commit'))
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
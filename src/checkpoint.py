@@ -0,0 +1,272 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+import math
+import os
+import pickle
+import struct
+import time
+import numpy as np
+from backtest_class import Backtest
+from profiler import profile_count, profile_phase
+from transaction_log import CATEGORY_FIELDS, FIELDS, FLOAT_FIELDS
+
+# 레코드 = 8바이트 길이(little-endian) + pickle
+_LENGTH = struct.Struct('<Q')
+FORMAT_VERSION = 1
+
+
+class Checkpointer:
+    """Backtest 상태를 주기적으로 파일에 저장해 중단된 실행을 이어서 할 수 있게 합니다.
+
+    파일은 추가 전용이며 첫 레코드는 Backtest 설정(헤더), 이후 레코드는 스냅샷입니다. 스냅샷에는 현금/보유 수량/
+    거래 횟수/성과 지표/전략 상태와 함께 이전 스냅샷 이후에 추가된 거래 기록만 열 단위 배열로 담기므로,
+    저장 비용은 실행 길이가 아니라 새 거래 수에 비례합니다. 쓰는 도중 프로세스가 죽어 잘린 마지막 레코드는
+    읽을 때 무시하고 잘라냅니다.
+
+    저장 전에 지연 평가 중인 거래 기록을 평가하고 db 기록기의 버퍼를 저장하므로,
+    스냅샷 시점에 db에는 스냅샷의 거래 기록이 모두 들어 있습니다 (resume_backtest 참고).
+    AsyncBacktest는 평가와 저장이 코루틴이라 이 보장을 지킬 수 없으므로 지원하지 않습니다.
+
+    Attributes:
+        path (Path): 체크포인트 파일 경로
+        every (int): maybe_save가 저장하는 바 간격
+        interval (float): maybe_save가 저장하는 최소 시간 간격 (초, None이면 사용 안 함)
+        saves (int): 이 인스턴스가 저장한 스냅샷 수
+
+    Example:
+        >>> backtest = Backtest('long_run', datetime(2020, 1, 1), save_db=True)
+        >>> checkpoint = Checkpointer(backtest, 'long_run.ckpt', every=5000)
+        >>> run_strategy(backtest, on_bar, markets, start, end, '1m', checkpoint=checkpoint)
+    """
+
+    def __init__(self, backtest: Backtest, path: Union[str, os.PathLike], every: Optional[int] = 1000,
+                 interval: Optional[float] = None, state: Optional[Callable[[], Any]] = None, fsync: bool = True):
+        """
+        Args:
+            backtest: 저장할 Backtest
+            path: 체크포인트 파일 경로 (스냅샷이 있으면 이어서 추가, 없으면 새로 작성)
+            every: maybe_save가 저장하는 바 간격 (기본값: 1000, None이면 사용 안 함)
+            interval: maybe_save가 저장하는 최소 시간 간격 (초, 기본값: None)
+            state: 저장할 전략 상태를 반환하는 함수 (pickle 가능해야 함, resume_backtest가 그대로 돌려줌)
+            fsync: 스냅샷마다 디스크에 기록될 때까지 기다릴지 여부 (기본값: True)
+
+        Raises:
+            TypeError: backtest가 AsyncBacktest인 경우
+            ValueError: 파일이 다른 백테스트의 체크포인트이거나 backtest의 거래 기록과 맞지 않는 경우
+        """
+        from async_backtest import AsyncBacktest
+        if isinstance(backtest, AsyncBacktest):
+            raise TypeError("Checkpointer does not support AsyncBacktest (flush() is a coroutine)")
+        self.backtest = backtest
+        self.path = Path(path)
+        self.every = every
+        self.interval = interval
+        self.state = state
+        self.fsync = fsync
+        self.saves = 0
+        self._bars = 0
+        self._last_save = time.monotonic()
+
+        header, snapshots = _read(self.path, truncate=True)
+        if not snapshots:
+            # 첫 스냅샷 전에 중단된 파일은 처음부터 다시 작성
+            self.path.write_bytes(b'')
+            self._saved_rows = 0
+            self._write(_header(backtest))
+            return
+        if header['backtest_id'] != backtest.backtest_id:
+            raise ValueError(f"{self.path} is a checkpoint of {header['backtest_id']}, not {backtest.backtest_id}")
+        self._saved_rows = sum(len(s['rows']['date']) for s in snapshots)
+        if len(backtest._transaction_log) != self._saved_rows:
+            raise ValueError(f"{self.path} has {self._saved_rows} transactions but the backtest has "
+                             f"{len(backtest._transaction_log)}; resume it with resume_backtest()")
+
+    def maybe_save(self, timestamp: datetime) -> bool:
+        """바마다 호출합니다. every개의 바가 지났거나 interval초가 지났으면 저장합니다.
+
+        Returns:
+            bool: 저장했는지 여부
+        """
+        self._bars += 1
+        due = self.every is not None and self._bars >= self.every
+        if self.interval is not None and time.monotonic() - self._last_save >= self.interval:
+            due = True
+        if due:
+            self.save(timestamp)
+        return due
+
+    def save(self, timestamp: datetime):
+        """timestamp까지 실행한 상태를 스냅샷으로 저장합니다. 이어서 실행할 때는 timestamp 이후부터 실행합니다.
+
+        Args:
+            timestamp: 마지막으로 처리한 바 시간
+        """
+        backtest = self.backtest
+        backtest.flush()
+        log = backtest._transaction_log
+        rows = log[self._saved_rows:len(log)]
+        snapshot = {
+            'timestamp': timestamp,
+            'cash_balance': backtest.cash_balance,
+            'portfolio': dict(backtest.portfolio),
+            'trades_count': backtest.trades_count,
+            'rows': _pack_rows(rows),
+            'metrics': backtest.metrics,
+            'state': self.state() if self.state is not None else None,
+        }
+        profile_count('checkpoints')
+        with profile_phase('checkpoint', f"{len(rows)} rows"):
+            self._write(snapshot)
+        self._saved_rows += len(rows)
+        self._bars = 0
+        self._last_save = time.monotonic()
+        self.saves += 1
+
+    def _write(self, record: dict):
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.path, 'ab') as f:
+            f.write(_LENGTH.pack(len(payload)) + payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+
+def load_checkpoint(path: Union[str, os.PathLike]) -> Optional[dict]:
+    """체크포인트 파일의 마지막 스냅샷까지를 합쳐 반환합니다.
+
+    Returns:
+        dict: 헤더 정보(backtest_id, start_date, ...)와 마지막 스냅샷의 timestamp, cash_balance, portfolio,
+            trades_count, metrics, state, 그리고 전체 거래 기록 rows (스냅샷이 없으면 None)
+    """
+    header, snapshots = _read(Path(path))
+    if header is None or not snapshots:
+        return None
+    rows = []
+    for snapshot in snapshots:
+        rows.extend(_unpack_rows(snapshot['rows']))
+    last = snapshots[-1]
+    return {**header, **{key: value for key, value in last.items() if key != 'rows'}, 'rows': rows}
+
+
+def resume_backtest(path: Union[str, os.PathLike], **backtest_options) -> tuple[Backtest, datetime, Any]:
+    """체크포인트에서 Backtest를 복원합니다.
+
+    save_db인 경우 db의 거래 기록을 체크포인트에 맞춥니다. 스냅샷 이후에 저장된 기록은 삭제하고,
+    스냅샷에는 있지만 db에 없는 기록은 다시 저장하므로 이어서 실행해도 같은 거래가 두 번 저장되지 않습니다.
+    (backtest_id가 실행마다 고유하다고 가정합니다.)
+
+    Args:
+        path: 체크포인트 파일 경로
+        **backtest_options: Backtest에 넘길 추가 인자 (price_cache, debug, profile, transaction_writer 등)
+
+    Returns:
+        tuple: (복원한 Backtest, 마지막으로 처리한 바 시간, Checkpointer의 state가 저장한 전략 상태)
+
+    Raises:
+        ValueError: 체크포인트가 없거나 비어 있는 경우
+
+    Example:
+        >>> backtest, last, state = resume_backtest('long_run.ckpt')
+        >>> checkpoint = Checkpointer(backtest, 'long_run.ckpt', every=5000)
+        >>> run_strategy(backtest, on_bar, markets, last + timedelta(microseconds=1), end, '1m', checkpoint=checkpoint)
+    """
+    checkpoint = load_checkpoint(path)
+    if checkpoint is None:
+        raise ValueError(f"No checkpoint snapshot in {path}")
+    transaction_writer = backtest_options.pop('transaction_writer', None)
+    # 초기 입금이 다시 기록되지 않도록 save_db 없이 만든 뒤 상태를 복원
+    backtest = Backtest(checkpoint['backtest_id'], checkpoint['start_date'], checkpoint['market_name'],
+                        checkpoint['initial_balance'], save_db=False, valuation=checkpoint['valuation'],
+                        log_type=checkpoint['log_type'], valuation_type=checkpoint['valuation_type'],
+                        **backtest_options)
+    backtest.cash_balance = checkpoint['cash_balance']
+    backtest.portfolio = dict(checkpoint['portfolio'])
+    backtest.trades_count = checkpoint['trades_count']
+    if checkpoint['metrics'] is not None:
+        backtest.metrics = checkpoint['metrics']
+    log = backtest._transaction_log
+    for row in checkpoint['rows']:
+        log.append(row)
+
+    if checkpoint['save_db']:
+        from util.log_transaction import TransactionWriter, count_transactions, trim_transactions
+        backtest.save_db = True
+        backtest.transaction_writer = transaction_writer if transaction_writer is not None else TransactionWriter()
+        saved = count_transactions(backtest.backtest_id)
+        if saved > len(log):
+            trim_transactions(backtest.backtest_id, len(log))
+        elif saved < len(log):
+            backtest.transaction_writer.add_many([backtest._row(row) for row in log[saved:len(log)]])
+            backtest.transaction_writer.flush()
+    return backtest, checkpoint['timestamp'], checkpoint['state']
+
+
+def _header(backtest: Backtest) -> dict:
+    return {
+        'version': FORMAT_VERSION,
+        'backtest_id': backtest.backtest_id,
+        'start_date': backtest.start_date,
+        'market_name': backtest.market_name,
+        'initial_balance': backtest.initial_balance,
+        'save_db': backtest.save_db,
+        'valuation': backtest.valuation,
+        'log_type': backtest.log_type,
+        'valuation_type': backtest.valuation_type,
+    }
+
+
+def _read(path: Path, truncate: bool = False) -> tuple[Optional[dict], list[dict]]:
+    """(헤더, 스냅샷 목록)을 읽습니다. truncate면 잘린 마지막 레코드를 파일에서 잘라냅니다."""
+    if not path.exists():
+        return None, []
+    records = []
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        end = offset + _LENGTH.size + length
+        if end > len(data):
+            break
+        try:
+            records.append(pickle.loads(data[offset + _LENGTH.size:end]))
+        except Exception:
+            break
+        offset = end
+    if truncate and offset < len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(offset)
+    if not records:
+        return None, []
+    if records[0].get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format in {path}")
+    return records[0], records[1:]
+
+
+def _pack_rows(rows: list[dict]) -> dict:
+    """거래 기록을 필드별 배열로 묶습니다 (None은 NaN, TransactionLog와 같은 규칙)."""
+    columns = {'date': np.array([row['date'] for row in rows], dtype='datetime64[us]')}
+    for field in FLOAT_FIELDS:
+        columns[field] = np.array([np.nan if row[field] is None else row[field] for row in rows], dtype=np.float64)
+    for field in CATEGORY_FIELDS:
+        columns[field] = [row[field] for row in rows]
+    return columns
+
+
+def _unpack_rows(columns: dict) -> list[dict]:
+    dates = columns['date'].tolist()
+    floats = {field: columns[field].tolist() for field in FLOAT_FIELDS}
+    rows = []
+    for i, date in enumerate(dates):
+        row = {}
+        for field in FIELDS:
+            if field == 'date':
+                row[field] = date
+            elif field in CATEGORY_FIELDS:
+                row[field] = columns[field][i]
+            else:
+                value = floats[field][i]
+                row[field] = None if math.isnan(value) else value
+        rows.append(row)
+    return rows
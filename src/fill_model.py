@@ -0,0 +1,178 @@
+from typing import Literal, Optional
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+def trade_amounts(is_buy: ArrayLike, price: ArrayLike, quantity: ArrayLike,
+                  fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005) -> np.ndarray:
+    """backtest_class.trade_amount의 배열 버전 (매수는 지불할 금액, 매도는 받을 금액)
+
+    거래마다 trade_amount와 같은 연산 순서로 계산하므로 결과가 같습니다.
+
+    Raises:
+        ValueError: 알 수 없는 fee_type인 경우
+    """
+    is_buy = np.asarray(is_buy, dtype=bool)
+    notional = np.asarray(price, dtype=np.float64) * np.asarray(quantity, dtype=np.float64)
+    if fee_type == 'percent':
+        return np.where(is_buy, notional * (1 + fee_amount), notional * (1 - fee_amount))
+    elif fee_type == 'fixed':
+        return np.where(is_buy, notional + fee_amount, notional - fee_amount)
+    raise ValueError(f"Unknown fee_type: {fee_type}")
+
+
+def _slipped(is_buy: np.ndarray, price: np.ndarray, fraction: np.ndarray) -> np.ndarray:
+    """매수는 fraction만큼 비싸게, 매도는 fraction만큼 싸게 체결한 가격"""
+    return price * np.where(is_buy, 1 + fraction, 1 - fraction)
+
+
+class FillModel:
+    """주문 배열을 체결 가격/체결 수량 배열로 바꾸는 체결 모델의 기본 클래스입니다.
+
+    모든 계산은 주문 배열 전체에 대한 NumPy 연산이므로, 주문을 모아 한 번에 넘기면(Backtest.submit_orders,
+    run_vectorized) 주문당 비용이 파이썬 함수 호출 한 번보다 훨씬 작습니다. 기본 클래스는 주문 가격과 수량
+    그대로 체결합니다. 수수료는 체결 가격과 수량에 Backtest의 fee_type/fee_amount를 그대로 적용합니다.
+
+    하위 클래스는 fill_price(체결 가격)와 fill_quantity(체결 수량)를 구현합니다.
+    fill_quantity가 주문보다 적은 수량을 돌려줄 수 있으면 partial을 True로 둡니다.
+
+    Attributes:
+        partial (bool): 부분 체결이 생길 수 있는지 여부
+    """
+
+    partial = False
+
+    def fill_quantity(self, is_buy: np.ndarray, price: np.ndarray, quantity: np.ndarray,
+                      volume: Optional[np.ndarray]) -> np.ndarray:
+        """체결 수량 (기본값: 주문 수량 전부)"""
+        return quantity
+
+    def fill_price(self, is_buy: np.ndarray, price: np.ndarray, quantity: np.ndarray,
+                   volume: Optional[np.ndarray]) -> np.ndarray:
+        """체결 수량이 quantity일 때의 체결 가격 (기본값: 주문 가격)"""
+        return price
+
+    def fill(self, is_buy: ArrayLike, price: ArrayLike, quantity: ArrayLike,
+             volume: Optional[ArrayLike] = None) -> tuple[np.ndarray, np.ndarray]:
+        """주문 배열의 (체결 가격, 체결 수량)을 계산합니다.
+
+        Args:
+            is_buy: 주문별 매수 여부
+            price: 주문별 기준 가격 (예: 바 종가)
+            quantity: 주문별 주문 수량 (0 초과)
+            volume: 주문별 해당 바의 거래량 (수량 단위, 거래량을 쓰는 모델에만 필요)
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (체결 가격, 체결 수량). 체결 수량 0은 체결되지 않은 주문
+
+        Raises:
+            ValueError: 모델에 필요한 거래량이 없는 경우
+        """
+        is_buy = np.asarray(is_buy, dtype=bool)
+        price = np.asarray(price, dtype=np.float64)
+        quantity = np.asarray(quantity, dtype=np.float64)
+        if volume is not None:
+            volume = np.broadcast_to(np.asarray(volume, dtype=np.float64), quantity.shape)
+        filled = self.fill_quantity(is_buy, price, quantity, volume)
+        return self.fill_price(is_buy, price, filled, volume), filled
+
+    def fill_one(self, is_buy: bool, price: float, quantity: float,
+                 volume: Optional[float] = None) -> tuple[float, float]:
+        """주문 하나의 (체결 가격, 체결 수량)을 계산합니다 (Backtest.buy/sell용)."""
+        fill_price, filled = self.fill(
+            np.array([is_buy]), np.array([price], dtype=np.float64), np.array([quantity], dtype=np.float64),
+            None if volume is None else np.array([volume], dtype=np.float64))
+        return float(fill_price[0]), float(filled[0])
+
+    @staticmethod
+    def _require_volume(volume: Optional[np.ndarray], model: str) -> np.ndarray:
+        if volume is None or np.isnan(volume).any():
+            raise ValueError(f"{model} requires a volume for every order")
+        return volume
+
+
+class FixedSlippage(FillModel):
+    """기준 가격에서 고정 bps만큼 불리하게 체결합니다.
+
+    Example:
+        >>> FixedSlippage(5).fill([True, False], [100.0, 100.0], [1.0, 1.0])
+        (array([100.05,  99.95]), array([1., 1.]))
+    """
+
+    def __init__(self, bps: float):
+        """
+        Args:
+            bps: 슬리피지 (1bps = 0.01%)
+        """
+        if bps < 0:
+            raise ValueError(f"bps must not be negative: {bps}")
+        self.bps = bps
+
+    def fill_price(self, is_buy, price, quantity, volume):
+        return _slipped(is_buy, price, self.bps * 1e-4)
+
+
+class SpreadImpact(FillModel):
+    """호가 스프레드의 절반과 주문 크기에 따른 시장 충격만큼 불리하게 체결합니다.
+
+    슬리피지 비율 = spread_bps / 2 * 1e-4 + impact * (체결 수량 / 거래량) ** exponent
+    impact가 0이면 거래량 없이 스프레드만 적용합니다.
+    """
+
+    def __init__(self, spread_bps: float = 0.0, impact: float = 0.0, exponent: float = 0.5):
+        """
+        Args:
+            spread_bps: 호가 스프레드 (bps, 매수/매도 각각 절반씩 적용)
+            impact: 거래량 대비 주문 비율 1일 때의 충격 비율 (예: 0.1이면 거래량만큼 주문할 때 10%)
+            exponent: 충격의 거래량 대비 주문 비율 지수 (기본값: 0.5, 제곱근 모델)
+        """
+        if spread_bps < 0 or impact < 0:
+            raise ValueError("spread_bps and impact must not be negative")
+        self.spread_bps = spread_bps
+        self.impact = impact
+        self.exponent = exponent
+
+    def fill_price(self, is_buy, price, quantity, volume):
+        fraction = self.spread_bps * 0.5e-4
+        if self.impact:
+            volume = self._require_volume(volume, 'SpreadImpact')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                participation = np.where(volume > 0, quantity / volume, np.where(quantity > 0, np.inf, 0.0))
+            fraction = fraction + self.impact * participation ** self.exponent
+        return _slipped(is_buy, price, fraction)
+
+
+class VolumeParticipation(FillModel):
+    """주문 수량을 바 거래량의 일정 비율로 제한해 부분 체결합니다. 체결 가격은 price_model이 정합니다.
+
+    Example:
+        >>> model = VolumeParticipation(0.1, price_model=SpreadImpact(spread_bps=4, impact=0.05))
+        >>> backtest = Backtest('test', datetime(2024, 1, 1), fill_model=model)
+        >>> backtest.buy(datetime(2024, 1, 2), 'KRW-BTC', 50000000.0, 2.0, volume=12.5)   # 최대 1.25개 체결
+    """
+
+    partial = True
+
+    def __init__(self, max_participation: float = 0.1, price_model: Optional[FillModel] = None,
+                 min_quantity: float = 0.0):
+        """
+        Args:
+            max_participation: 한 주문이 체결할 수 있는 바 거래량의 최대 비율 (0 초과 1 이하)
+            price_model: 체결 가격을 정할 모델 (기본값: 주문 가격 그대로)
+            min_quantity: 이보다 작은 체결 수량은 체결하지 않음 (기본값: 0.0)
+        """
+        if not 0 < max_participation <= 1:
+            raise ValueError(f"max_participation must be in (0, 1]: {max_participation}")
+        self.max_participation = max_participation
+        self.price_model = price_model
+        self.min_quantity = min_quantity
+
+    def fill_quantity(self, is_buy, price, quantity, volume):
+        volume = self._require_volume(volume, 'VolumeParticipation')
+        filled = np.minimum(quantity, self.max_participation * volume)
+        return np.where(filled < self.min_quantity, 0.0, filled)
+
+    def fill_price(self, is_buy, price, quantity, volume):
+        if self.price_model is None:
+            return price
+        return self.price_model.fill_price(is_buy, price, quantity, volume)
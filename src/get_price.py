@@ -1,46 +1,439 @@
-from sqlalchemy import text
-from util.db_engine import engine
+from sqlalchemy import DateTime, Float, String, bindparam, text
 from datetime import datetime
-from typing import Literal
+from typing import Iterable, Iterator, Literal, Optional, Sequence
+import os
+import numpy as np
+import pandas as pd
+from profiler import profile_count, profile_phase
+from resolution import normalize, storage_name
 
-def get_price(crypto_name: str, timestamp: datetime, type: Literal['daily', '1hour'] = 'daily') -> float:
+
+class PriceSource:
+    """가격 데이터 조회 방식을 정의하는 기본 클래스입니다.
+
+    get_price / get_price_series는 현재 설정된 PriceSource로 조회를 위임합니다.
+    기본값은 db에서 조회하는 DatabasePriceSource이며, set_price_source()로 교체할 수 있습니다.
+    소스가 직접 가지고 있지 않은 해상도(예: '4h')는 rollup.RollupPriceSource가 원본 해상도에서 만들어 돌려줍니다.
+    """
+
+    def native_types(self) -> list[str]:
+        """소스가 직접 저장하고 있는 해상도 목록 (표준 이름, 예: ['1h', '1d'])"""
+        return []
+
+    def has_type(self, type: str) -> bool:
+        """type 해상도를 직접 조회할 수 있는지 여부 (기본값: 모든 해상도를 직접 조회)"""
+        return True
+
+    def get_price(self, crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+        raise NotImplementedError
+
+    def get_price_series(self, crypto_name: str, start: datetime, end: datetime,
+                         type: str = 'daily') -> tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def get_price_series_many(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                              type: str = 'daily') -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        return {name: self.get_price_series(name, start, end, type) for name in crypto_names}
+
+    def get_latest_prices(self, crypto_names: Iterable[str], timestamp: datetime,
+                          type: str = 'daily') -> dict[str, tuple[np.datetime64, float]]:
+        """여러 암호화폐의 timestamp 이하 가장 최근 캔들을 조회합니다. 데이터가 없는 암호화폐는 결과에서 빠집니다.
+
+        Returns:
+            dict[str, tuple[np.datetime64, float]]: {암호화폐 이름: (timestamp_kst, close)}
+        """
+        latest = {}
+        for name in crypto_names:
+            timestamps, closes = self.get_price_series(name, datetime.min, timestamp, type)
+            if len(timestamps):
+                latest[name] = (timestamps[-1], float(closes[-1]))
+        return latest
+
+    def get_prices(self, crypto_names: Iterable[str], timestamps: Sequence[datetime],
+                   type: str = 'daily',
+                   missing: Literal['nan', 'raise'] = 'nan') -> pd.DataFrame:
+        """여러 암호화폐의 여러 시점 as-of 종가를 하나의 행렬로 조회합니다.
+
+        가장 이른 시점 직전의 캔들(get_latest_prices)과 [가장 이른 시점, 가장 늦은 시점] 구간의 캔들
+        (get_price_series_many)만 조회한 뒤, 각 시점 이하의 가장 최근 종가를 이진 탐색으로 찾습니다.
+        """
+        crypto_names = list(crypto_names)
+        points = np.asarray(timestamps, dtype='datetime64[us]')
+        prices = np.full((len(points), len(crypto_names)), np.nan)
+        if len(points) and crypto_names:
+            start, end = points.min().astype(datetime), points.max().astype(datetime)
+            latest = self.get_latest_prices(crypto_names, start, type)
+            series = self.get_price_series_many(crypto_names, start, end, type)
+            for j, name in enumerate(crypto_names):
+                times, closes = series[name]
+                if name in latest:
+                    # 구간 시작 시점의 캔들이 두 조회에 모두 포함될 수 있으므로 구간 이전 캔들만 앞에 붙임
+                    seed_time, seed_close = latest[name]
+                    if not len(times) or seed_time < times[0]:
+                        times = np.concatenate(([seed_time], times))
+                        closes = np.concatenate(([seed_close], closes))
+                index = np.searchsorted(times, points, side='right') - 1
+                found = index >= 0
+                prices[found, j] = closes[index[found]]
+        frame = pd.DataFrame(prices, index=pd.DatetimeIndex(points, name='timestamp_kst'), columns=crypto_names)
+        if missing == 'raise':
+            counts = frame.isna().sum()
+            counts = counts[counts > 0]
+            if len(counts):
+                raise ValueError(f"No price data found at or before some timestamps "
+                                 f"(missing count per market: {counts.to_dict()})")
+        elif missing != 'nan':
+            raise ValueError(f"Unknown missing mode: {missing}")
+        return frame
+
+    def iter_bars(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                  type: str = 'daily',
+                  chunk_size: int = 10000) -> Iterator[tuple[datetime, str, float]]:
+        """(timestamp_kst, market, close)를 시간, 암호화폐 이름 순으로 하나씩 돌려줍니다."""
+        crypto_names = sorted(crypto_names)
+        series = self.get_price_series_many(crypto_names, start, end, type)
+        rows = [
+            (timestamp, name, float(close))
+            for name in crypto_names
+            for timestamp, close in zip(series[name][0].tolist(), series[name][1])
+        ]
+        rows.sort(key=lambda row: (row[0], row[1]))
+        return iter(rows)
+
+    def list_markets(self, type: str = 'daily') -> list[str]:
+        raise NotImplementedError
+
+
+class DatabasePriceSource(PriceSource):
+    """upbit_{type}_price 테이블에서 가격을 조회합니다.
+
+    Attributes:
+        tables (tuple[str, ...]): 가격 테이블이 있는 해상도 (기본값: 1분/1시간/1일봉,
+            'daily' -> upbit_daily_price, '1hour' -> upbit_1hour_price, '1m' -> upbit_1min_price)
+    """
+
+    def __init__(self, tables: Iterable[str] = ('1m', '1h', '1d')):
+        self.tables = tuple(normalize(type) for type in tables)
+
+    def native_types(self) -> list[str]:
+        return list(self.tables)
+
+    def has_type(self, type: str) -> bool:
+        return normalize(type) in self.tables
+
+    def get_price(self, crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+        query = price_query(type)
+
+        profile_count('price_queries')
+        try:
+            with profile_phase('price_query', (crypto_name, timestamp)), _engine().connect() as conn:
+                result = conn.execute(
+                    query,
+                    {"market": crypto_name, "timestamp": timestamp}
+                ).first()
+
+                if result is None:
+                    raise ValueError(f"No price data found for {crypto_name} at or before {timestamp}")
+
+                return float(result[0])
+
+        except Exception as e:
+            raise ValueError(f"Error fetching price: {str(e)}")
+
+    def get_price_series(self, crypto_name: str, start: datetime, end: datetime,
+                         type: str = 'daily') -> tuple[np.ndarray, np.ndarray]:
+        query = price_series_query(type)
+
+        profile_count('price_queries')
+        try:
+            with profile_phase('price_series_query', (crypto_name, start, end)), _engine().connect() as conn:
+                rows = conn.execute(
+                    query,
+                    {"market": crypto_name, "start": start, "end": end}
+                ).all()
+        except Exception as e:
+            raise ValueError(f"Error fetching price series: {str(e)}")
+
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[us]')
+        closes = np.array([row[1] for row in rows], dtype=np.float64)
+        return timestamps, closes
+
+    def get_price_series_many(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                              type: str = 'daily') -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        crypto_names = list(crypto_names)
+        if not crypto_names:
+            return {}
+        query = price_series_many_query(type)
+
+        profile_count('price_queries')
+        try:
+            with profile_phase('price_series_query', (len(crypto_names), start, end)), _engine().connect() as conn:
+                rows = conn.execute(
+                    query,
+                    {"markets": crypto_names, "start": start, "end": end}
+                ).all()
+        except Exception as e:
+            raise ValueError(f"Error fetching price series: {str(e)}")
+
+        return split_series(rows, crypto_names)
+
+    def get_latest_prices(self, crypto_names: Iterable[str], timestamp: datetime,
+                          type: str = 'daily') -> dict[str, tuple[np.datetime64, float]]:
+        crypto_names = list(crypto_names)
+        if not crypto_names:
+            return {}
+        query = latest_prices_query(type, len(crypto_names))
+        params = {f"market_{i}": name for i, name in enumerate(crypto_names)}
+        params['timestamp'] = timestamp
+
+        profile_count('price_queries')
+        try:
+            with profile_phase('price_query', (len(crypto_names), timestamp)), _engine().connect() as conn:
+                rows = conn.execute(query, params).all()
+        except Exception as e:
+            raise ValueError(f"Error fetching price: {str(e)}")
+        return {market: (np.datetime64(timestamp_kst, 'us'), float(close)) for market, timestamp_kst, close in rows}
+
+    def iter_bars(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                  type: str = 'daily',
+                  chunk_size: int = 10000) -> Iterator[tuple[datetime, str, float]]:
+        crypto_names = list(crypto_names)
+        if not crypto_names:
+            return
+        query = text(f"""
+            SELECT timestamp_kst, market, close
+            FROM upbit_{storage_name(type)}_price
+            WHERE market IN :markets
+            AND timestamp_kst >= :start
+            AND timestamp_kst <= :end
+            ORDER BY timestamp_kst, market
+        """).bindparams(bindparam('markets', expanding=True), *_range_params()).columns(
+            timestamp_kst=DateTime, market=String, close=Float)
+
+        profile_count('price_queries')
+        # 서버 측 커서로 chunk_size 행씩 가져와 구간 길이와 관계없이 메모리 사용량을 일정하게 유지
+        with _engine().connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+                query,
+                {"markets": crypto_names, "start": start, "end": end}
+            )
+            for timestamp, market, close in result:
+                yield timestamp, market, float(close)
+
+    def list_markets(self, type: str = 'daily') -> list[str]:
+        query = text(f"SELECT DISTINCT market FROM upbit_{storage_name(type)}_price ORDER BY market")
+        try:
+            with _engine().connect() as conn:
+                return [row[0] for row in conn.execute(query)]
+        except Exception as e:
+            raise ValueError(f"Error fetching markets: {str(e)}")
+
+
+def price_query(type: str):
+    """암호화폐 한 개의 as-of 종가 쿼리 (파라미터: market, timestamp)"""
+    return text(f"""
+        SELECT close
+        FROM upbit_{storage_name(type)}_price
+        WHERE market = :market
+        AND timestamp_kst <= :timestamp
+        ORDER BY timestamp_kst DESC
+        LIMIT 1
+    """).bindparams(bindparam('timestamp', type_=DateTime))
+
+
+def price_series_query(type: str):
+    """암호화폐 한 개의 구간 종가 쿼리 (파라미터: market, start, end)"""
+    return text(f"""
+        SELECT timestamp_kst, close
+        FROM upbit_{storage_name(type)}_price
+        WHERE market = :market
+        AND timestamp_kst >= :start
+        AND timestamp_kst <= :end
+        ORDER BY timestamp_kst
+    """).bindparams(*_range_params()).columns(timestamp_kst=DateTime, close=Float)
+
+
+def price_series_many_query(type: str):
+    """여러 암호화폐의 구간 종가 쿼리 (파라미터: markets, start, end)"""
+    return text(f"""
+        SELECT market, timestamp_kst, close
+        FROM upbit_{storage_name(type)}_price
+        WHERE market IN :markets
+        AND timestamp_kst >= :start
+        AND timestamp_kst <= :end
+        ORDER BY market, timestamp_kst
+    """).bindparams(bindparam('markets', expanding=True), *_range_params()).columns(
+        market=String, timestamp_kst=DateTime, close=Float)
+
+
+def latest_prices_query(type: str, count: int):
+    """암호화폐 count개의 as-of 캔들을 한 번에 조회하는 쿼리 (파라미터: market_0 ... market_{count-1}, timestamp)
+
+    암호화폐마다 (market, timestamp_kst) 인덱스를 역순으로 한 행만 읽는 하위 쿼리를 UNION ALL로 묶습니다.
+    """
+    parts = [
+        f"""SELECT * FROM (
+            SELECT market, timestamp_kst, close
+            FROM upbit_{storage_name(type)}_price
+            WHERE market = :market_{i}
+            AND timestamp_kst <= :timestamp
+            ORDER BY timestamp_kst DESC
+            LIMIT 1
+        ) AS latest_{i}"""
+        for i in range(count)
+    ]
+    return text("\nUNION ALL\n".join(parts)).bindparams(bindparam('timestamp', type_=DateTime)).columns(
+        market=String, timestamp_kst=DateTime, close=Float)
+
+
+def split_series(rows, crypto_names: Iterable[str]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """(market, timestamp_kst, close) 행을 암호화폐별 (timestamp_kst, close) 배열로 나눕니다."""
+    markets = np.array([row[0] for row in rows], dtype=object)
+    timestamps = np.array([row[1] for row in rows], dtype='datetime64[us]')
+    closes = np.array([row[2] for row in rows], dtype=np.float64)
+    series = {}
+    for name in crypto_names:
+        mask = markets == name
+        series[name] = (timestamps[mask], closes[mask])
+    return series
+
+
+def _range_params():
+    # 시간 파라미터/결과의 타입을 지정해 sqlite 등 문자열로 시간을 저장하는 db에서도 같은 비교/변환이 되도록 함
+    return bindparam('start', type_=DateTime), bindparam('end', type_=DateTime)
+
+
+def _engine():
+    # db를 쓰지 않는 경우(로컬 가격 저장소)에는 엔진을 만들지 않도록 처음 조회할 때 import
+    from util.db_engine import get_engine
+    return get_engine()
+
+
+_price_source: Optional[PriceSource] = None
+
+
+def set_price_source(source: Optional[PriceSource]):
+    """get_price / get_price_series가 사용할 가격 소스를 설정합니다.
+
+    Args:
+        source: 사용할 PriceSource (None이면 기본값으로 되돌림)
+    """
+    global _price_source
+    _price_source = source
+
+
+def get_price_source() -> PriceSource:
+    """현재 가격 소스를 반환합니다.
+
+    설정된 소스가 없으면 환경변수 PRICE_SOURCE가 'local'인 경우 PRICE_STORE_PATH
+    (기본값: 'price_store')의 로컬 가격 저장소를, 그 외에는 db를 사용합니다.
+    """
+    global _price_source
+    if _price_source is None:
+        if os.environ.get('PRICE_SOURCE') == 'local':
+            from price_store import LocalPriceStore
+            _price_source = LocalPriceStore(os.environ.get('PRICE_STORE_PATH', 'price_store'))
+        else:
+            _price_source = DatabasePriceSource()
+    return _price_source
+
+
+_rollup_source = None
+
+
+def price_source_for(type: str) -> PriceSource:
+    """type 해상도를 조회할 가격 소스를 반환합니다.
+
+    현재 가격 소스가 직접 가지고 있는 해상도면 그대로, 아니면 원본 해상도에서 캔들을 만드는 RollupPriceSource를 반환합니다.
+    """
+    global _rollup_source
+    source = get_price_source()
+    if source.has_type(type):
+        return source
+    if _rollup_source is None or _rollup_source.base is not source:
+        from rollup import RollupPriceSource
+        _rollup_source = RollupPriceSource(source)
+    return _rollup_source
+
+
+def get_price(crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
     """특정 시간과 가장 가까운 최근 암호화폐 가격을 조회합니다.
-    
+
     Args:
         crypto_name: 암호화폐 이름 (예: 'KRW-BTC')
         timestamp: 조회할 시간
-    
+        type: 가격 데이터 타입 ('daily', '1hour' 또는 '1m', '5m', '4h' 등 임의의 해상도)
+
     Returns:
         float: 해당 시간과 가장 가까운 최근 종가
-        
+
     Raises:
         ValueError: 데이터가 없는 경우
     """
-    query = text(f"""
-        SELECT close
-        FROM upbit_{type}_price
-        WHERE market = :market
-        AND timestamp_kst <= :timestamp
-        ORDER BY timestamp_kst DESC
-        LIMIT 1
-    """)
-    
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(
-                query,
-                {"market": crypto_name, "timestamp": timestamp}
-            ).first()
-            
-            if result is None:
-                raise ValueError(f"No price data found for {crypto_name} at or before {timestamp}")
-                
-            return float(result[0])
-            
-    except Exception as e:
-        raise ValueError(f"Error fetching price: {str(e)}")
+    return price_source_for(type).get_price(crypto_name, timestamp, type)
+
+
+def get_price_series(crypto_name: str, start: datetime, end: datetime,
+                     type: str = 'daily') -> tuple[np.ndarray, np.ndarray]:
+    """특정 구간의 암호화폐 종가 시계열을 한 번의 쿼리로 조회합니다.
+
+    Args:
+        crypto_name: 암호화폐 이름 (예: 'KRW-BTC')
+        start: 조회 시작 시간 (포함)
+        end: 조회 종료 시간 (포함)
+        type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 시간순으로 정렬된 (timestamp_kst[datetime64[us]], close[float64]) 배열
+
+    Raises:
+        ValueError: 조회 중 오류가 발생한 경우
+    """
+    return price_source_for(type).get_price_series(crypto_name, start, end, type)
+
+
+def get_price_series_many(crypto_names: Iterable[str], start: datetime, end: datetime,
+                          type: str = 'daily') -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """여러 암호화폐의 특정 구간 종가 시계열을 한 번에 조회합니다.
+
+    Args:
+        crypto_names: 암호화폐 이름 목록
+        start: 조회 시작 시간 (포함)
+        end: 조회 종료 시간 (포함)
+        type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+    Returns:
+        dict[str, tuple[np.ndarray, np.ndarray]]: {암호화폐 이름: (timestamp_kst, close)}
+
+    Raises:
+        ValueError: 조회 중 오류가 발생한 경우
+    """
+    return price_source_for(type).get_price_series_many(crypto_names, start, end, type)
+
+
+def get_prices(crypto_names: Iterable[str], timestamps: Sequence[datetime],
+               type: str = 'daily',
+               missing: Literal['nan', 'raise'] = 'nan') -> pd.DataFrame:
+    """여러 암호화폐의 여러 시점 as-of 종가를 한 번에 조회합니다.
+
+    시점 수와 관계없이 db에는 두 번의 쿼리(구간 이전 최근 캔들 + 구간 캔들)만 실행합니다.
+
+    Args:
+        crypto_names: 암호화폐 이름 목록
+        timestamps: 조회할 시간 목록 (정렬되지 않아도 됨, 결과는 같은 순서)
+        type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        missing: 해당 시점 이하의 데이터가 없는 경우 처리 방식 (기본값: 'nan')
+            - 'nan': NaN으로 채움
+            - 'raise': ValueError 발생
+
+    Returns:
+        pd.DataFrame: index가 timestamps, columns가 crypto_names인 종가 행렬
+
+    Raises:
+        ValueError: 조회 중 오류가 발생했거나 missing='raise'에서 데이터가 없는 경우
+    """
+    return price_source_for(type).get_prices(crypto_names, timestamps, type, missing)
 
 
 if __name__ == '__main__':
     print(get_price('KRW-BTC', datetime.now(), '1hour'))
-
@@ -0,0 +1,186 @@
+from datetime import datetime
+from inspect import signature
+from typing import Callable, Iterable, Optional, Sequence
+import pandas as pd
+from backtest_class import Backtest
+from bar_feed import BarFeed
+from get_price import PriceSource
+from price_cache import PriceCache
+from util.log_transaction import TransactionWriter
+
+# 그룹 바 콜백: (Backtest, 바 시간, {암호화폐: 이번 바 종가}, 변형 파라미터) -> None
+GroupOnBar = Callable[[Backtest, datetime, dict, dict], None]
+# 변형별 조기 종료 조건: (Backtest, 바 시간) -> True면 해당 변형만 중단
+StopWhen = Callable[[Backtest, datetime], bool]
+
+# Backtest 생성자가 받는 인자 (from_variants에서 변형 dict를 생성자 인자와 파라미터로 나눌 때 사용)
+_BACKTEST_OPTIONS = frozenset(signature(Backtest.__init__).parameters) - {'self'}
+
+
+class BacktestGroup:
+    """같은 암호화폐/바를 사용하는 여러 Backtest를 한 타임라인에서 함께 진행하는 실행기입니다.
+
+    바 피드를 한 번만 읽고, 바마다 지금까지의 최근 종가를 모든 Backtest에 같은 dict로 prime_prices 하므로
+    변형 수와 관계없이 바당 가격 조회는 한 번입니다. prime 가격에 없는 암호화폐는 그룹이 공유하는
+    가격 캐시에서 조회합니다. save_db인 Backtest는 하나의 TransactionWriter를 공유하며, 그룹이 바마다
+    한 번 flush하므로 모든 변형의 거래 기록이 바당 하나의 INSERT로 저장됩니다.
+
+    Attributes:
+        backtests (list[Backtest]): 변형별 Backtest
+        params (list[dict]): 변형별 파라미터 (on_bar의 네 번째 인자)
+        price_cache (PriceCache): 모든 변형이 공유하는 가격 캐시
+        transaction_writer (TransactionWriter): save_db 변형이 공유하는 거래 기록기 (save_db 변형이 없으면 None)
+        stopped (list[Optional[datetime]]): 변형별 stop_when으로 중단된 바 시간 (끝까지 실행했으면 None)
+
+    Example:
+        >>> def on_bar(bt, timestamp, bar, params):
+        ...     if 'KRW-BTC' in bar and bt.get_quantity('KRW-BTC') == 0:
+        ...         bt.buy(timestamp, 'KRW-BTC', bar['KRW-BTC'], params['size'], fee_amount=params['fee'])
+        >>> variants = [{'size': size, 'fee': fee, 'initial_balance': 1e8}
+        ...             for size in (0.01, 0.05) for fee in (0.0005, 0.001)]
+        >>> group = BacktestGroup.from_variants('btc_sizing', datetime(2024, 1, 1), variants)
+        >>> group.run(on_bar, ['KRW-BTC'], datetime(2024, 1, 1), datetime(2024, 12, 31))
+        >>> group.summary().sort_values('return_rate')
+    """
+
+    def __init__(self, backtests: Iterable[Backtest], params: Optional[Sequence[dict]] = None,
+                 price_cache: Optional[PriceCache] = None,
+                 transaction_writer: Optional[TransactionWriter] = None):
+        """
+        Args:
+            backtests: 함께 실행할 Backtest 목록 (backtest_id가 서로 달라야 함)
+            params: 변형별 파라미터 (기본값: 모두 빈 dict)
+            price_cache: 모든 변형이 사용할 가격 캐시 (기본값: 첫 Backtest의 가격 캐시)
+            transaction_writer: save_db 변형이 공유할 거래 기록기 (기본값: save_db 변형이 있으면 새로 생성)
+                각 변형이 가지고 있던 기록기는 남은 행을 저장한 뒤 공유 기록기로 바뀝니다.
+
+        Raises:
+            ValueError: Backtest가 없거나, backtest_id가 겹치거나, params 수가 다른 경우
+        """
+        self.backtests = list(backtests)
+        if not self.backtests:
+            raise ValueError("BacktestGroup needs at least one backtest")
+        ids = [backtest.backtest_id for backtest in self.backtests]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Backtests in a group must have distinct backtest_id")
+        self.params = [dict(p) for p in params] if params is not None else [{} for _ in self.backtests]
+        if len(self.params) != len(self.backtests):
+            raise ValueError(f"Expected {len(self.backtests)} params, got {len(self.params)}")
+
+        self.price_cache = price_cache if price_cache is not None else self.backtests[0].price_cache
+        self.transaction_writer = None
+        if any(backtest.save_db for backtest in self.backtests):
+            # 자동 저장은 끄고 바마다 한 번만 저장
+            self.transaction_writer = (transaction_writer if transaction_writer is not None
+                                       else TransactionWriter(batch_size=2 ** 62, flush_interval=None))
+        for backtest in self.backtests:
+            backtest.price_cache = self.price_cache
+            if backtest.save_db and backtest.transaction_writer is not self.transaction_writer:
+                # 초기 입금 등 이미 버퍼에 있는 행을 저장한 뒤 공유 기록기로 교체
+                if backtest.transaction_writer is not None:
+                    backtest.transaction_writer.close()
+                backtest.transaction_writer = self.transaction_writer
+        self.stopped = [None] * len(self.backtests)
+
+    @classmethod
+    def from_variants(cls, group_id: str, start_date: datetime, variants: Sequence[dict],
+                      price_cache: Optional[PriceCache] = None, **options) -> 'BacktestGroup':
+        """변형 목록으로 Backtest를 만들어 그룹을 만듭니다.
+
+        변형 dict 중 Backtest 생성자 인자(initial_balance, fill_model 등)는 생성자에 넘기고,
+        dict 전체는 변형 파라미터로 on_bar에 넘깁니다. backtest_id는 '{group_id}-{번호}'입니다
+        (결과 카탈로그의 record_sweep과 같은 규칙).
+
+        Args:
+            group_id: 그룹 이름
+            start_date: 백테스트 시작 시간
+            variants: 변형별 파라미터 dict 목록
+            price_cache: 공유 가격 캐시 (기본값: 새 PriceCache)
+            **options: 모든 변형에 공통인 Backtest 생성자 인자 (예: save_db=True, valuation_type='1m')
+
+        Returns:
+            BacktestGroup: 새 그룹
+        """
+        price_cache = price_cache if price_cache is not None else PriceCache()
+        writer = None
+        if options.get('save_db') or any(variant.get('save_db') for variant in variants):
+            writer = options.pop('transaction_writer', None) or TransactionWriter(batch_size=2 ** 62,
+                                                                                 flush_interval=None)
+        backtests = []
+        for i, variant in enumerate(variants):
+            arguments = {**options, **{key: value for key, value in variant.items() if key in _BACKTEST_OPTIONS}}
+            if arguments.get('save_db'):
+                arguments['transaction_writer'] = writer
+            backtests.append(Backtest(f"{group_id}-{i}", start_date, price_cache=price_cache, **arguments))
+        return cls(backtests, variants, price_cache=price_cache, transaction_writer=writer)
+
+    def __len__(self) -> int:
+        return len(self.backtests)
+
+    def run(self, on_bar: GroupOnBar, markets: Iterable[str], start: datetime, end: datetime,
+            price_type: str = '1hour', chunk_size: int = 10000,
+            stop_when: Optional[StopWhen] = None, source: Optional[PriceSource] = None,
+            close: bool = True) -> list[Backtest]:
+        """모든 변형을 바마다 함께 진행합니다.
+
+        바마다 각 변형에 대해 on_bar와 mark_to_market을 호출한 뒤 공유 거래 기록기를 한 번 flush합니다.
+        stop_when이 True를 반환한 변형은 그 바 이후로 진행하지 않으며, 모든 변형이 멈추면 실행을 끝냅니다.
+
+        Args:
+            on_bar: (Backtest, 바 시간, {암호화폐: 이번 바 종가}, 변형 파라미터)를 받는 콜백
+            markets: 암호화폐 이름 목록
+            start: 시작 시간 (포함)
+            end: 종료 시간 (포함)
+            price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+            chunk_size: 바 피드가 한 번에 읽는 행 수
+            stop_when: 변형별 조기 종료 조건 (BarFeed.run 참고)
+            source: 가격 소스 (기본값: 현재 설정된 가격 소스)
+            close: 실행이 끝나면 close()를 호출할지 여부 (기본값: True)
+
+        Returns:
+            list[Backtest]: 변형별 Backtest
+        """
+        feed = BarFeed(markets, start, end, price_type, chunk_size, source)
+        active = [i for i, stopped in enumerate(self.stopped) if stopped is None]
+        for timestamp, bar in feed:
+            prices = feed.last_prices
+            for i in active:
+                backtest = self.backtests[i]
+                backtest.prime_prices(timestamp, prices, price_type)
+                on_bar(backtest, timestamp, bar, self.params[i])
+                backtest.mark_to_market(timestamp)
+                if stop_when is not None and stop_when(backtest, timestamp):
+                    self.stopped[i] = timestamp
+                    # 피드가 계속 진행되며 last_prices가 바뀌므로, 멈춘 변형은 이 바의 가격 사본으로 평가
+                    backtest.prime_prices(timestamp, dict(prices), price_type)
+            if self.transaction_writer is not None:
+                self.transaction_writer.flush()
+            if stop_when is not None:
+                active = [i for i in active if self.stopped[i] is None]
+                if not active:
+                    break
+        if close:
+            self.close()
+        return self.backtests
+
+    def close(self):
+        """모든 변형을 종료(지연 평가, 기록 저장)하고 공유 거래 기록기를 닫습니다."""
+        for backtest in self.backtests:
+            backtest.close()
+        if self.transaction_writer is not None:
+            self.transaction_writer.close()
+
+    def summary(self, end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """변형별 실행 요약 (results_catalog.summarize_backtest)과 파라미터를 한 표로 만듭니다.
+
+        Args:
+            end_date: 최종 가치를 평가할 시간 (기본값: 마지막 거래 기록의 가치)
+
+        Returns:
+            pd.DataFrame: 변형마다 한 행, 파라미터 열과 backtest_id, final_value, return_rate, max_drawdown 등
+        """
+        from results_catalog import summarize_backtest
+        rows = []
+        for backtest, params, stopped in zip(self.backtests, self.params, self.stopped):
+            rows.append({**params, **summarize_backtest(backtest, end_date), 'stopped': stopped})
+        return pd.DataFrame(rows)
@@ -0,0 +1,248 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import math
+
+_YEAR_SECONDS = timedelta(days=365).total_seconds()
+
+
+class MetricsTracker:
+    """백테스트 진행 중 성과 지표를 관측마다 O(1)로 갱신하는 추적기입니다.
+
+    관측(거래 직후 또는 바마다의 포트폴리오 가치)이 들어올 때마다 고점/낙폭, 수익률의 평균/분산(Welford),
+    하방 편차, 최근 window개 수익률의 변동성, 투자 비중, 회전율을 갱신하므로 실행 중 언제든 조회할 수 있습니다.
+
+    수익률은 시점 단위로 계산합니다. 같은 시점의 관측이 여러 번 들어오면(한 바 안의 여러 거래) 그 시점의 마지막 가치로
+    수익률을 고쳐 쓰며, 입출금(flow)은 수익률에서 제외합니다.
+
+    Attributes:
+        window (int): 최근 변동성을 계산할 수익률 개수
+        periods_per_year (float): 연율화에 사용할 연간 시점 수 (None이면 관측 간격으로 추정)
+        observations (int): 관측 횟수
+        periods (int): 수익률 개수 (시점 수 - 1)
+        value (float): 가장 최근 포트폴리오 가치
+        asset_value (float): 가장 최근 보유 암호화폐 가치
+        traded_value (float): 누적 거래 금액 (가격 x 수량)
+
+    Example:
+        >>> tracker = MetricsTracker(window=24)
+        >>> tracker.update(datetime(2024, 1, 1, 0), 1000000.0)
+        >>> tracker.update(datetime(2024, 1, 1, 1), 990000.0, asset_value=500000.0, traded=500000.0)
+        >>> round(tracker.max_drawdown, 4)
+        -0.01
+    """
+
+    def __init__(self, window: int = 30, periods_per_year: Optional[float] = None):
+        """
+        Args:
+            window: 최근 변동성을 계산할 수익률 개수 (기본값: 30)
+            periods_per_year: 연율화에 사용할 연간 시점 수 (예: 1시간봉 8760, 기본값: 관측 간격으로 추정)
+        """
+        if window < 2:
+            raise ValueError(f"window must be at least 2: {window}")
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.observations = 0
+        self.periods = 0
+        self.value = None
+        self.asset_value = 0.0
+        self.traded_value = 0.0
+        self._last_time = None
+        # 직전 시점 마감 상태 (같은 시점의 관측은 이 상태를 기준으로 다시 계산)
+        self._prev_value = None
+        self._period_flow = 0.0
+        self._nav_close = 1.0
+        self._peak_close = 1.0
+        self._max_drawdown_close = 0.0
+        self._open = False
+        self._last_return = 0.0
+        self._nav = 1.0
+        # 수익률 평균/분산 (Welford), 하방 제곱합
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._downside = 0.0
+        # 최근 window개 수익률 (원형 버퍼)
+        self._ring = [0.0] * window
+        self._ring_pos = 0
+        self._ring_count = 0
+        self._ring_sum = 0.0
+        self._ring_sumsq = 0.0
+        # 시간 가중 누적값 (초)
+        self._elapsed = 0.0
+        self._invested = 0.0
+        self._value_time = 0.0
+
+    def update(self, timestamp: datetime, total_value: float, asset_value: float = 0.0,
+               flow: float = 0.0, traded: float = 0.0):
+        """관측 하나를 반영합니다.
+
+        Args:
+            timestamp: 관측 시점 (이전 관측보다 이르면 안 됨)
+            total_value: 포트폴리오 총 가치 (현금 + 자산)
+            asset_value: 보유 암호화폐 가치 (투자 비중 계산용)
+            flow: 이 관측에서 들어온 외부 자금 (입금은 양수, 출금은 음수)
+            traded: 이 관측에서 거래한 금액 (가격 x 수량, 회전율 계산용)
+
+        Raises:
+            ValueError: timestamp가 이전 관측 시점보다 이른 경우
+        """
+        if self._last_time is not None and timestamp != self._last_time:
+            if timestamp < self._last_time:
+                raise ValueError(f"Metrics observation at {timestamp} is earlier than {self._last_time}")
+            # 직전 시점 마감: 직전 시점의 상태가 두 관측 사이 구간에 유지된 것으로 봄
+            seconds = (timestamp - self._last_time).total_seconds()
+            self._elapsed += seconds
+            self._value_time += self.value * seconds
+            if self.asset_value > 0:
+                self._invested += seconds
+            self._prev_value = self.value
+            self._period_flow = 0.0
+            self._nav_close = self._nav
+            self._peak_close = max(self._peak_close, self._nav)
+            self._max_drawdown_close = min(self._max_drawdown_close, self._nav / self._peak_close - 1)
+            self._open = False
+        self._last_time = timestamp
+        self.observations += 1
+        self.value = total_value
+        self.asset_value = asset_value
+        self.traded_value += traded
+        self._period_flow += flow
+
+        if self._prev_value is not None and self._prev_value > 0:
+            period_return = (total_value - self._period_flow) / self._prev_value - 1
+            if self._open:
+                self._replace_return(period_return)
+            else:
+                self._add_return(period_return)
+                self._open = True
+            self._nav = self._nav_close * (1 + period_return)
+
+    def _add_return(self, r: float):
+        self.periods += 1
+        delta = r - self._mean
+        self._mean += delta / self.periods
+        self._m2 += delta * (r - self._mean)
+        self._downside += min(r, 0.0) ** 2
+        if self._ring_count == self.window:
+            old = self._ring[self._ring_pos]
+            self._ring_sum -= old
+            self._ring_sumsq -= old * old
+        else:
+            self._ring_count += 1
+        self._ring[self._ring_pos] = r
+        self._ring_sum += r
+        self._ring_sumsq += r * r
+        self._ring_pos = (self._ring_pos + 1) % self.window
+        self._last_return = r
+
+    def _replace_return(self, r: float):
+        # 같은 시점의 마지막 수익률을 고쳐 씀 (Welford 역연산 후 다시 추가)
+        old = self._last_return
+        if self.periods == 1:
+            self._mean, self._m2 = 0.0, 0.0
+        else:
+            mean = (self.periods * self._mean - old) / (self.periods - 1)
+            self._m2 -= (old - mean) * (old - self._mean)
+            self._mean = mean
+        self.periods -= 1
+        self._downside -= min(old, 0.0) ** 2
+        slot = (self._ring_pos - 1) % self.window
+        self._ring_sum += r - old
+        self._ring_sumsq += r * r - old * old
+        self._ring[slot] = r
+        self.periods += 1
+        delta = r - self._mean
+        self._mean += delta / self.periods
+        self._m2 += delta * (r - self._mean)
+        self._downside += min(r, 0.0) ** 2
+        self._last_return = r
+
+    @property
+    def return_rate(self) -> float:
+        """입출금을 제외한 누적 수익률 (시간 가중)"""
+        return self._nav - 1
+
+    @property
+    def peak(self) -> float:
+        """누적 수익률 지수(시작 = 1)의 고점"""
+        return max(self._peak_close, self._nav)
+
+    @property
+    def drawdown(self) -> float:
+        """현재 낙폭 (0 이하의 비율)"""
+        return self._nav / self.peak - 1
+
+    @property
+    def max_drawdown(self) -> float:
+        """최대 낙폭 (0 이하의 비율, 예: -0.25는 고점 대비 25% 하락)"""
+        return min(self._max_drawdown_close, self.drawdown)
+
+    @property
+    def annualization(self) -> float:
+        """연율화 계수 (연간 시점 수). periods_per_year가 없으면 평균 관측 간격으로 추정하며, 추정할 수 없으면 NaN"""
+        if self.periods_per_year is not None:
+            return float(self.periods_per_year)
+        if self.periods == 0 or self._elapsed <= 0:
+            return math.nan
+        return _YEAR_SECONDS / (self._elapsed / self.periods)
+
+    @property
+    def volatility(self) -> float:
+        """전체 구간 수익률의 연율화 표준편차"""
+        if self.periods < 2:
+            return math.nan
+        return math.sqrt(max(self._m2, 0.0) / (self.periods - 1) * self.annualization)
+
+    @property
+    def rolling_volatility(self) -> float:
+        """최근 window개 수익률의 연율화 표준편차"""
+        count = self._ring_count
+        if count < 2:
+            return math.nan
+        variance = (self._ring_sumsq - self._ring_sum * self._ring_sum / count) / (count - 1)
+        return math.sqrt(max(variance, 0.0) * self.annualization)
+
+    @property
+    def sharpe(self) -> float:
+        """연율화 샤프 비율 (무위험 수익률 0)"""
+        if self.periods < 2 or self._m2 <= 0:
+            return math.nan
+        return self._mean / math.sqrt(self._m2 / (self.periods - 1)) * math.sqrt(self.annualization)
+
+    @property
+    def sortino(self) -> float:
+        """연율화 소르티노 비율 (하방 편차 기준, 목표 수익률 0)"""
+        if self.periods == 0 or self._downside <= 0:
+            return math.nan
+        return self._mean / math.sqrt(self._downside / self.periods) * math.sqrt(self.annualization)
+
+    @property
+    def exposure(self) -> float:
+        """암호화폐를 보유하고 있던 시간의 비율"""
+        if self._elapsed <= 0:
+            return 1.0 if self.asset_value > 0 else 0.0
+        return self._invested / self._elapsed
+
+    @property
+    def turnover(self) -> float:
+        """누적 거래 금액 / 시간 가중 평균 포트폴리오 가치"""
+        average = self._value_time / self._elapsed if self._elapsed > 0 else self.value
+        if not average:
+            return 0.0
+        return self.traded_value / average
+
+    def summary(self) -> dict:
+        """현재까지의 지표를 dict로 반환합니다."""
+        return {
+            'observations': self.observations,
+            'periods': self.periods,
+            'value': self.value,
+            'return_rate': self.return_rate,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+            'volatility': self.volatility,
+            'rolling_volatility': self.rolling_volatility,
+            'sharpe': self.sharpe,
+            'sortino': self.sortino,
+            'exposure': self.exposure,
+            'turnover': self.turnover,
+        }
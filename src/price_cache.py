@@ -0,0 +1,267 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+import numpy as np
+from get_price import get_price, get_price_series, get_price_series_many
+
+
+class _PriceSeries:
+    """한 (암호화폐, 가격 타입)에 대해 적재된 연속 구간의 종가 배열"""
+
+    __slots__ = ('start', 'end', 'timestamps', 'closes')
+
+    def __init__(self, start: np.datetime64, end: np.datetime64, timestamps: np.ndarray, closes: np.ndarray):
+        self.start = start
+        self.end = end
+        self.timestamps = timestamps
+        self.closes = closes
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.closes.nbytes
+
+
+def _loaded_end(end: datetime, timestamps: np.ndarray) -> np.datetime64:
+    """db에서 end까지 조회한 결과를 빠짐없는 구간으로 볼 수 있는 끝 시간
+
+    현재 시간 이후의 캔들은 아직 적재되지 않았을 수 있으므로, 마지막으로 받은 캔들 시간과 현재 시간 중
+    늦은 쪽까지만 적재된 구간으로 봅니다. 그 이후 시점은 다음 조회 때 db에서 다시 읽습니다.
+    """
+    limit = np.datetime64(datetime.now(), 'us')
+    if len(timestamps):
+        limit = max(limit, np.datetime64(timestamps[-1], 'us'))
+    return min(np.datetime64(end, 'us'), limit)
+
+
+class PriceCache:
+    """get_price 앞단에서 동작하는 프로세스 내 as-of 가격 캐시입니다.
+
+    암호화폐별 종가 시계열을 구간 단위로 한 번에 적재한 뒤, 정렬된 배열에 대한
+    이진 탐색으로 as-of 조회(해당 시점 이하의 가장 최근 종가)를 처리합니다.
+    현재 시간 이후로 미리 적재한 구간은 캔들이 없는 것으로 확정하지 않고 다음 조회 때 다시 읽습니다.
+    전체 메모리 사용량이 max_bytes를 넘으면 가장 오래 사용되지 않은 시계열부터 제거합니다.
+
+    Attributes:
+        max_bytes (int): 캐시가 사용할 최대 메모리 (바이트)
+        window (timedelta): 캐시 미스 시 조회 시점 이후로 미리 적재할 구간 길이
+        lookback (timedelta): 캐시 미스 시 조회 시점 이전으로 함께 적재할 구간 길이
+        hits (int): 캐시에서 바로 응답한 조회 횟수
+        misses (int): db 조회가 필요했던 조회 횟수
+        loads (int): 구간 적재 쿼리 실행 횟수
+        evictions (int): 메모리 제한으로 제거된 시계열 수
+
+    Example:
+        >>> cache = PriceCache(max_bytes=64 * 1024 * 1024)
+        >>> cache.preload(['KRW-BTC', 'KRW-ETH'], datetime(2024, 1, 1), datetime(2024, 12, 31), '1hour')
+        >>> price = cache.get_price('KRW-BTC', datetime(2024, 6, 1, 12), '1hour')
+        >>> cache.stats()
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, window: timedelta = timedelta(days=30),
+                 lookback: timedelta = timedelta(days=7)):
+        """
+        Args:
+            max_bytes: 캐시가 사용할 최대 메모리 (기본값: 256MB)
+            window: 캐시 미스 시 조회 시점 이후로 미리 적재할 구간 길이 (기본값: 30일)
+            lookback: 캐시 미스 시 조회 시점 이전으로 함께 적재할 구간 길이 (기본값: 7일)
+        """
+        self.max_bytes = max_bytes
+        self.window = window
+        self.lookback = lookback
+        self._series: OrderedDict[tuple[str, str], _PriceSeries] = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get_price(self, crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+        """특정 시간과 가장 가까운 최근 암호화폐 가격을 캐시에서 조회합니다.
+
+        캐시에 해당 시점을 포함하는 구간이 없으면 주변 구간을 한 번에 적재한 뒤 응답합니다.
+
+        Args:
+            crypto_name: 암호화폐 이름 (예: 'KRW-BTC')
+            timestamp: 조회할 시간
+            type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+        Returns:
+            float: 해당 시간과 가장 가까운 최근 종가
+
+        Raises:
+            ValueError: 데이터가 없는 경우
+        """
+        key = (crypto_name, type)
+        t = np.datetime64(timestamp, 'us')
+        covered, price = self._lookup(key, t)
+        if price is not None:
+            self.hits += 1
+            return price
+
+        self.misses += 1
+        if not covered:
+            self._load(key, timestamp)
+            covered, price = self._lookup(key, t)
+            if price is not None:
+                return price
+        # 적재 구간 이전에만 데이터가 있는 경우 단건 조회로 대체
+        return get_price(crypto_name, timestamp, type)
+
+    def peek(self, crypto_name: str, timestamp: datetime, type: str = 'daily') -> Optional[float]:
+        """캐시에 이미 적재된 구간에서만 가격을 찾습니다. 없으면 db를 조회하지 않고 None을 반환합니다.
+
+        비동기 조회처럼 캐시 미스를 직접 처리하려는 경우 사용합니다.
+        """
+        _, price = self._lookup((crypto_name, type), np.datetime64(timestamp, 'us'))
+        if price is not None:
+            self.hits += 1
+        return price
+
+    def preload(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                type: str = 'daily'):
+        """여러 암호화폐의 특정 구간 종가를 한 번의 조회로 미리 적재합니다.
+
+        Args:
+            crypto_names: 암호화폐 이름 목록
+            start: 적재 시작 시간
+            end: 적재 종료 시간
+            type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        """
+        start = start - self.lookback
+        self.put_many(get_price_series_many(crypto_names, start, end, type), type, start, end)
+
+    def put_many(self, series: dict[str, tuple[np.ndarray, np.ndarray]], type: str,
+                 start: datetime, end: datetime):
+        """get_price_series_many 결과처럼 한 번에 조회한 여러 암호화폐의 [start, end] 구간 종가를 등록합니다.
+
+        현재 시간 이후의 구간은 암호화폐별로 마지막 캔들까지만 적재된 것으로 등록합니다.
+        """
+        self.loads += 1
+        for crypto_name, (timestamps, closes) in series.items():
+            self._put_loaded(crypto_name, timestamps, closes, type, start, end)
+
+    def put(self, crypto_name: str, timestamps: np.ndarray, closes: np.ndarray,
+            type: str = 'daily',
+            start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """이미 가지고 있는 종가 시계열을 캐시에 등록합니다.
+
+        기존 구간과 겹치거나 맞닿아 있으면 하나의 구간으로 병합하고, 그렇지 않으면 교체합니다.
+
+        Args:
+            crypto_name: 암호화폐 이름
+            timestamps: 시간순으로 정렬된 시간 배열
+            closes: timestamps와 같은 길이의 종가 배열
+            type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+            start: 데이터가 빠짐없이 포함된 구간의 시작 (기본값: 첫 시간)
+            end: 데이터가 빠짐없이 포함된 구간의 끝 (기본값: 마지막 시간)
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[us]')
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(timestamps) != len(closes):
+            raise ValueError("timestamps and closes must have the same length")
+        if start is None or end is None:
+            if len(timestamps) == 0:
+                return
+            start = timestamps[0] if start is None else start
+            end = timestamps[-1] if end is None else end
+        start = np.datetime64(start, 'us')
+        end = np.datetime64(end, 'us')
+
+        key = (crypto_name, type)
+        series = self._series.pop(key, None)
+        if series is not None:
+            self._nbytes -= series.nbytes
+            if start <= series.end and end >= series.start:
+                start = min(start, series.start)
+                end = max(end, series.end)
+                timestamps = np.concatenate([series.timestamps, timestamps])
+                closes = np.concatenate([series.closes, closes])
+                order = np.argsort(timestamps, kind='stable')
+                timestamps = timestamps[order]
+                closes = closes[order]
+                # 같은 시간이 중복되면 나중에 적재한 값을 사용
+                keep = np.append(timestamps[1:] != timestamps[:-1], True)
+                timestamps = timestamps[keep]
+                closes = closes[keep]
+
+        series = _PriceSeries(start, end, timestamps, closes)
+        self._series[key] = series
+        self._nbytes += series.nbytes
+        self._evict()
+
+    def clear(self):
+        """캐시된 시계열과 통계를 모두 초기화합니다."""
+        self._series.clear()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """캐시 사용 통계를 반환합니다.
+
+        Returns:
+            dict: hits, misses, hit_rate, loads, evictions, series(캐시된 시계열 수), nbytes(사용 메모리)
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'series': len(self._series),
+            'nbytes': self._nbytes,
+        }
+
+    def _lookup(self, key: tuple[str, str], t: np.datetime64) -> tuple[bool, Optional[float]]:
+        """(적재 구간이 t를 포함하는지, as-of 종가)를 반환합니다."""
+        series = self._series.get(key)
+        if series is None or t < series.start or t > series.end:
+            return False, None
+        self._series.move_to_end(key)
+        i = np.searchsorted(series.timestamps, t, side='right')
+        if i == 0:
+            return True, None
+        return True, float(series.closes[i - 1])
+
+    def _load(self, key: tuple[str, str], timestamp: datetime):
+        crypto_name, type = key
+        start = timestamp - self.lookback
+        end = timestamp + self.window
+        series = self._series.get(key)
+        if series is not None:
+            # 기존 구간에 이어지는 부분만 적재해 하나의 연속 구간을 유지
+            t = np.datetime64(timestamp, 'us')
+            if series.end < t <= series.end + np.timedelta64(self.window):
+                start = series.end.astype(datetime)
+            elif series.start - np.timedelta64(self.window) <= t < series.start:
+                end = series.start.astype(datetime)
+        timestamps, closes = get_price_series(crypto_name, start, end, type)
+        self.loads += 1
+        self._put_loaded(crypto_name, timestamps, closes, type, start, end)
+
+    def _put_loaded(self, crypto_name: str, timestamps: np.ndarray, closes: np.ndarray, type: str,
+                    start: datetime, end: datetime):
+        """db에서 [start, end]를 조회한 결과를 아직 적재되지 않았을 수 있는 미래 구간을 빼고 등록합니다."""
+        end = _loaded_end(end, timestamps)
+        if end < np.datetime64(start, 'us'):
+            # 구간 전체가 미래이고 캔들도 없으면 확정할 수 있는 구간이 없음
+            return
+        self.put(crypto_name, timestamps, closes, type, start, end)
+
+    def _evict(self):
+        while self._nbytes > self.max_bytes and len(self._series) > 1:
+            _, series = self._series.popitem(last=False)
+            self._nbytes -= series.nbytes
+            self.evictions += 1
+
+
+# Backtest 등에서 공유하는 기본 캐시
+default_price_cache = PriceCache()
+
+
+def get_cached_price(crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+    """get_price와 같은 인터페이스로 기본 캐시를 통해 가격을 조회합니다."""
+    return default_price_cache.get_price(crypto_name, timestamp, type)
@@ -0,0 +1,289 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Union
+import argparse
+import io
+import os
+import pandas as pd
+from sqlalchemy import DateTime, String, bindparam, text
+from get_price import price_query
+from profiler import profile_count, profile_phase
+from util.db_engine import get_engine
+from util.table_price import PRICE_TYPES, create_partitions, create_tables, is_partitioned, price_table, price_table_name
+
+# upbit 캔들 API 응답의 열 이름 -> 가격 테이블 열 이름
+CANDLE_COLUMNS = {
+    'code': 'market',
+    'candle_date_time_kst': 'timestamp_kst',
+    'trade_price': 'close',
+}
+PRICE_COLUMNS = ['market', 'timestamp_kst', 'close']
+
+
+def read_candles(path: Union[str, os.PathLike], market: Optional[str] = None,
+                 columns: Optional[dict] = None) -> pd.DataFrame:
+    """CSV 또는 Parquet 캔들 파일을 (market, timestamp_kst, close) DataFrame으로 읽습니다.
+
+    upbit 캔들 API 형식의 열 이름(candle_date_time_kst, trade_price 등)은 자동으로 바꾸며,
+    같은 (market, timestamp_kst)가 여러 번 있으면 파일에서 마지막 행을 사용합니다.
+
+    Args:
+        path: .csv(.gz 등 압축 포함) 또는 .parquet 파일 경로
+        market: 파일에 market 열이 없을 때 사용할 암호화폐 이름
+        columns: 추가로 바꿀 열 이름 {파일 열 이름: 가격 테이블 열 이름}
+
+    Returns:
+        pd.DataFrame: market, timestamp_kst, close 열 (market, timestamp_kst 순 정렬)
+
+    Raises:
+        ValueError: 필요한 열이 없는 경우
+        ImportError: Parquet 파일인데 pyarrow가 설치되지 않은 경우
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        try:
+            frame = pd.read_parquet(path)
+        except ImportError as e:
+            raise ImportError("Reading parquet candles requires pyarrow (pip install pyarrow)") from e
+    else:
+        frame = pd.read_csv(path)
+    frame = frame.rename(columns={**CANDLE_COLUMNS, **(columns or {})})
+    if 'market' not in frame.columns:
+        if market is None:
+            raise ValueError(f"{path} has no market column; pass market")
+        frame['market'] = market
+    missing = [column for column in PRICE_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {missing}")
+    frame = frame[PRICE_COLUMNS].dropna()
+    frame['timestamp_kst'] = pd.to_datetime(frame['timestamp_kst'])
+    frame['close'] = frame['close'].astype('float64')
+    frame = frame.drop_duplicates(['market', 'timestamp_kst'], keep='last')
+    return frame.sort_values(['market', 'timestamp_kst']).reset_index(drop=True)
+
+
+def stored_until(conn, type: str, markets: Iterable[str]) -> dict[str, datetime]:
+    """암호화폐별로 테이블에 저장된 마지막 캔들 시간을 조회합니다. 데이터가 없는 암호화폐는 결과에서 빠집니다."""
+    query = text(f"""
+        SELECT market, MAX(timestamp_kst) AS timestamp_kst
+        FROM {price_table_name(type)}
+        WHERE market IN :markets
+        GROUP BY market
+    """).bindparams(bindparam('markets', expanding=True)).columns(market=String, timestamp_kst=DateTime)
+    return {market: last for market, last in conn.execute(query, {"markets": list(markets)})}
+
+
+def ingest_frame(frame: pd.DataFrame, type: str, incremental: bool = True, chunk_size: int = 100000) -> int:
+    """캔들 DataFrame을 가격 테이블에 upsert합니다.
+
+    postgresql(psycopg2)은 COPY로 임시 테이블에 올린 뒤 INSERT ... ON CONFLICT DO UPDATE로 한 번에 반영하고,
+    그 외(sqlite 등)는 같은 upsert를 chunk_size행씩 실행합니다. 종가가 같은 행은 다시 쓰지 않으므로
+    같은 파일을 여러 번 적재해도 결과가 같습니다. 파티션 테이블이면 필요한 월별 파티션을 먼저 만듭니다.
+
+    Args:
+        frame: read_candles 형식의 DataFrame (market, timestamp_kst, close)
+        type: 가격 타입 (예: 'daily', '1hour', '1m')
+        incremental: True면 암호화폐별로 저장된 마지막 캔들 이후만 적재 (마지막 캔들은 미완성이었을 수 있어 다시 씀)
+        chunk_size: COPY가 아닌 경우 한 번에 실행할 행 수
+
+    Returns:
+        int: 테이블에 보낸 행 수 (incremental로 제외한 행은 빠짐)
+    """
+    engine = get_engine()
+    if incremental and len(frame):
+        with engine.connect() as conn:
+            last = stored_until(conn, type, frame['market'].unique().tolist())
+        if last:
+            cutoff = frame['market'].map(last)
+            frame = frame[cutoff.isna() | (frame['timestamp_kst'] >= cutoff)]
+    if not len(frame):
+        return 0
+
+    profile_count('price_rows_ingested', len(frame))
+    with profile_phase('price_ingest', (price_table_name(type), len(frame))):
+        if engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2':
+            _copy_upsert(engine, frame, type)
+        else:
+            _upsert(engine, frame, type, chunk_size)
+    return len(frame)
+
+
+def _ensure_partitions(conn, frame: pd.DataFrame, type: str):
+    if is_partitioned(conn, type):
+        create_partitions(conn, type, frame['timestamp_kst'].min().to_pydatetime(),
+                          frame['timestamp_kst'].max().to_pydatetime())
+
+
+def _copy_upsert(engine, frame: pd.DataFrame, type: str):
+    name = price_table_name(type)
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+    buffer.seek(0)
+    with engine.begin() as conn:
+        _ensure_partitions(conn, frame, type)
+        conn.execute(text(f"CREATE TEMP TABLE price_stage (LIKE {name} INCLUDING DEFAULTS) ON COMMIT DROP"))
+        # COPY는 psycopg2 커서로 직접 실행 (SQLAlchemy 트랜잭션과 같은 연결)
+        cursor = conn.connection.driver_connection.cursor()
+        cursor.copy_expert("COPY price_stage (market, timestamp_kst, close) FROM STDIN WITH (FORMAT csv)", buffer)
+        conn.execute(text(f"""
+            INSERT INTO {name} (market, timestamp_kst, close)
+            SELECT market, timestamp_kst, close FROM price_stage
+            ON CONFLICT (market, timestamp_kst) DO UPDATE SET close = EXCLUDED.close
+            WHERE {name}.close IS DISTINCT FROM EXCLUDED.close
+        """))
+
+
+def _upsert(engine, frame: pd.DataFrame, type: str, chunk_size: int):
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Price ingestion does not support {engine.dialect.name}")
+    table = price_table(type)
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['market', 'timestamp_kst'],
+        set_={'close': statement.excluded.close},
+        where=table.c.close != statement.excluded.close,
+    )
+    markets = frame['market'].tolist()
+    timestamps = [timestamp.to_pydatetime() for timestamp in frame['timestamp_kst']]
+    closes = frame['close'].tolist()
+    with engine.begin() as conn:
+        _ensure_partitions(conn, frame, type)
+        for i in range(0, len(frame), chunk_size):
+            conn.execute(statement, [
+                {'market': markets[j], 'timestamp_kst': timestamps[j], 'close': closes[j]}
+                for j in range(i, min(i + chunk_size, len(frame)))
+            ])
+
+
+def ingest_files(paths: Iterable[Union[str, os.PathLike]], type: str, market: Optional[str] = None,
+                 columns: Optional[dict] = None, incremental: bool = True, chunk_size: int = 100000,
+                 analyze: bool = True) -> dict[str, int]:
+    """캔들 파일들을 가격 테이블에 적재합니다.
+
+    파일마다 read_candles로 읽어 ingest_frame으로 upsert하고, 끝나면 테이블 통계를 갱신합니다.
+    postgresql은 VACUUM (ANALYZE)로 visibility map도 갱신해야 as-of 조회가 index-only scan에서 테이블을 읽지 않습니다.
+
+    Args:
+        paths: CSV 또는 Parquet 파일 경로 목록
+        type: 가격 타입 (예: 'daily', '1hour', '1m')
+        market: 파일에 market 열이 없을 때 사용할 암호화폐 이름
+        columns: 추가로 바꿀 열 이름 {파일 열 이름: 가격 테이블 열 이름}
+        incremental: 저장된 마지막 캔들 이후만 적재할지 여부 (False면 파일 전체를 upsert)
+        chunk_size: COPY가 아닌 경우 한 번에 실행할 행 수
+        analyze: 적재 후 통계를 갱신할지 여부
+
+    Returns:
+        dict[str, int]: {파일 경로: 테이블에 보낸 행 수}
+
+    Example:
+        >>> create_tables(['1m'], partition_by_month=True)
+        >>> ingest_files(sorted(Path('candles').glob('KRW-*.parquet')), '1m')
+        >>> check_price_index('1m')['index_only']
+        True
+    """
+    loaded = {}
+    for path in paths:
+        loaded[str(path)] = ingest_frame(read_candles(path, market, columns), type, incremental, chunk_size)
+    if analyze and any(loaded.values()):
+        analyze_table(type)
+    return loaded
+
+
+def analyze_table(type: str):
+    """가격 테이블의 통계를 갱신합니다 (postgresql: VACUUM (ANALYZE), sqlite: ANALYZE)."""
+    engine = get_engine()
+    name = price_table_name(type)
+    if engine.dialect.name == 'postgresql':
+        # VACUUM은 트랜잭션 밖에서만 실행할 수 있음
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(f"VACUUM (ANALYZE) {name}"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"ANALYZE {name}"))
+
+
+def check_price_index(type: str, market: Optional[str] = None, timestamp: Optional[datetime] = None) -> dict:
+    """get_price의 as-of 쿼리 실행 계획이 인덱스만 읽는지 확인합니다.
+
+    postgresql은 EXPLAIN (ANALYZE)에서 Index Only Scan과 테이블 조회 횟수(Heap Fetches)를,
+    sqlite는 EXPLAIN QUERY PLAN에서 covering index 또는 WITHOUT ROWID 기본 키 검색을 확인하고,
+    두 경우 모두 정렬 단계가 없어야 합니다.
+
+    Args:
+        type: 가격 타입
+        market: 조회할 암호화폐 이름 (기본값: 테이블의 첫 암호화폐)
+        timestamp: 조회 시간 (기본값: 테이블의 마지막 캔들 시간)
+
+    Returns:
+        dict: table, plan(실행 계획 문자열), index_only(인덱스만 읽는지), sort(정렬 단계가 있는지),
+            heap_fetches(postgresql Index Only Scan이 테이블을 읽은 횟수 합계, 그 외 None)
+
+    Raises:
+        ValueError: 테이블이 비어 있는 경우
+    """
+    engine = get_engine()
+    name = price_table_name(type)
+    with engine.connect() as conn:
+        if market is None:
+            market = conn.execute(text(f"SELECT MIN(market) FROM {name}")).scalar()
+        if timestamp is None and market is not None:
+            timestamp = stored_until(conn, type, [market]).get(market)
+        if market is None or timestamp is None:
+            raise ValueError(f"No price data in {name}")
+        query = price_query(type)
+        params = {"market": market, "timestamp": timestamp}
+        if engine.dialect.name == 'postgresql':
+            explain = text(f"EXPLAIN (ANALYZE, FORMAT TEXT) {query.text}").bindparams(
+                bindparam('timestamp', type_=DateTime))
+            plan = '\n'.join(row[0] for row in conn.execute(explain, params))
+            index_only = 'Index Only Scan' in plan and 'Seq Scan' not in plan
+            sort = any(line.strip().startswith(('Sort', '->  Sort')) for line in plan.splitlines())
+            heap_fetches = sum(int(line.split('Heap Fetches:')[1]) for line in plan.splitlines()
+                               if 'Heap Fetches:' in line)
+        else:
+            explain = text(f"EXPLAIN QUERY PLAN {query.text}").bindparams(bindparam('timestamp', type_=DateTime))
+            plan = '\n'.join(row[-1] for row in conn.execute(explain, params))
+            index_only = 'COVERING INDEX' in plan or ('USING PRIMARY KEY' in plan and 'SCAN' not in plan)
+            sort = 'TEMP B-TREE' in plan
+            heap_fetches = None
+    return {
+        'table': name,
+        'plan': plan,
+        'index_only': index_only and not sort,
+        'sort': sort,
+        'heap_fetches': heap_fetches,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='캔들 파일을 upbit 가격 테이블에 적재하고 인덱스를 확인합니다.')
+    parser.add_argument('command', choices=['create', 'ingest', 'check'])
+    parser.add_argument('paths', nargs='*', help='ingest: CSV/Parquet 캔들 파일 경로')
+    parser.add_argument('--types', nargs='*', default=list(PRICE_TYPES),
+                        help='create/check: 가격 타입 목록, ingest: 첫 번째 타입에 적재 (기본값: daily 1hour)')
+    parser.add_argument('--partition-by-month', action='store_true', help='create: 월별 파티션 테이블로 생성')
+    parser.add_argument('--market', default=None, help='ingest: 파일에 market 열이 없을 때 사용할 암호화폐 이름')
+    parser.add_argument('--full', action='store_true', help='ingest: 저장된 구간도 포함해 파일 전체를 upsert')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        # 예: python price_ingest.py create --types 1m 1hour daily --partition-by-month
+        create_tables(args.types, partition_by_month=args.partition_by_month)
+    elif args.command == 'ingest':
+        # 예: python price_ingest.py ingest candles/*.parquet --types 1m
+        if not args.paths:
+            parser.error('ingest requires candle file paths')
+        for path, count in ingest_files(args.paths, args.types[0], args.market, incremental=not args.full).items():
+            print(f"{path}: {count}행 적재")
+    else:
+        failed = False
+        for type in args.types:
+            result = check_price_index(type)
+            status = 'index-only' if result['index_only'] else '인덱스만으로 조회하지 못함'
+            print(f"{result['table']}: {status}\n{result['plan']}")
+            failed = failed or not result['index_only']
+        raise SystemExit(1 if failed else 0)
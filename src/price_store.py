@@ -0,0 +1,209 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+import argparse
+import heapq
+import os
+import numpy as np
+from get_price import DatabasePriceSource, PriceSource
+from resolution import normalize, storage_name
+
+PRICE_TYPES = ('daily', '1hour')
+
+
+class LocalPriceStore(PriceSource):
+    """upbit 가격 테이블을 로컬 디스크에 열 단위로 저장한 가격 소스입니다.
+
+    가격 타입과 암호화폐별로 디렉터리를 나누고, 각 열을 고정 길이 바이너리 파일로 저장합니다.
+        {root}/{type}/{market}/timestamp_kst.bin  (int64, 마이크로초)
+        {root}/{type}/{market}/close.bin          (float64)
+    type 디렉터리 이름은 resolution.storage_name을 따릅니다 ('daily', '1hour', '1min', '5m', '4h' ...).
+    파일은 뒤에 추가만 하며, 읽을 때는 np.memmap으로 열어 네트워크 없이 페이지 캐시에서 바로 읽습니다.
+
+    Example:
+        >>> store = LocalPriceStore('price_store')
+        >>> sync(store, types=['1hour'])            # db -> 로컬 (새 캔들만 추가)
+        >>> set_price_source(store)                 # 이후 get_price는 로컬에서 조회
+    """
+
+    def __init__(self, root: Union[str, os.PathLike]):
+        """
+        Args:
+            root: 저장소 최상위 디렉터리
+        """
+        self.root = Path(root)
+        self._columns: dict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = {}
+
+    def native_types(self) -> list[str]:
+        if not self.root.is_dir():
+            return []
+        types = []
+        for path in self.root.iterdir():
+            try:
+                types.append(normalize(path.name))
+            except ValueError:
+                continue
+        return types
+
+    def has_type(self, type: str) -> bool:
+        return (self.root / storage_name(type)).is_dir()
+
+    def list_markets(self, type: str = 'daily') -> list[str]:
+        directory = self.root / storage_name(type)
+        if not directory.is_dir():
+            return []
+        return sorted(path.name for path in directory.iterdir() if path.is_dir())
+
+    def last_timestamp(self, crypto_name: str, type: str = 'daily') -> Optional[datetime]:
+        """저장된 마지막 캔들의 시간을 반환합니다. 저장된 데이터가 없으면 None"""
+        timestamps, _ = self.read(crypto_name, type)
+        if len(timestamps) == 0:
+            return None
+        return timestamps[-1].astype(datetime)
+
+    def read(self, crypto_name: str, type: str = 'daily') -> tuple[np.ndarray, np.ndarray]:
+        """저장된 전체 시계열을 메모리 매핑으로 엽니다.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (timestamp_kst[datetime64[us]], close[float64]) 읽기 전용 배열
+        """
+        key = (crypto_name, storage_name(type))
+        if key not in self._columns:
+            directory = self.root / key[1] / crypto_name
+            timestamps = _memmap(directory / 'timestamp_kst.bin', np.int64)
+            closes = _memmap(directory / 'close.bin', np.float64)
+            # 추가 도중 중단되어 길이가 다르면 짧은 쪽에 맞춤
+            length = min(len(timestamps), len(closes))
+            self._columns[key] = (timestamps[:length].view('datetime64[us]'), closes[:length])
+        return self._columns[key]
+
+    def append(self, crypto_name: str, timestamps: np.ndarray, closes: np.ndarray,
+               type: str = 'daily') -> int:
+        """마지막 저장 시간 이후의 캔들만 파일 끝에 추가합니다.
+
+        Args:
+            crypto_name: 암호화폐 이름
+            timestamps: 시간순으로 정렬된 시간 배열
+            closes: timestamps와 같은 길이의 종가 배열
+            type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+        Returns:
+            int: 추가된 캔들 수
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[us]')
+        closes = np.asarray(closes, dtype=np.float64)
+        stored, _ = self.read(crypto_name, type)
+        if len(stored):
+            new = timestamps > stored[-1]
+            timestamps, closes = timestamps[new], closes[new]
+        if len(timestamps) == 0:
+            return 0
+
+        directory = self.root / storage_name(type) / crypto_name
+        directory.mkdir(parents=True, exist_ok=True)
+        length = len(stored)
+        self._columns.pop((crypto_name, storage_name(type)), None)
+        for name, values in (('timestamp_kst.bin', timestamps.view(np.int64)), ('close.bin', closes)):
+            with open(directory / name, 'ab') as f:
+                # 이전 추가가 중간에 끊긴 경우 남은 조각을 잘라냄
+                f.truncate(length * values.itemsize)
+                f.write(values.tobytes())
+        return len(timestamps)
+
+    def truncate(self, crypto_name: str, length: int, type: str = 'daily'):
+        """앞에서부터 length개의 캔들만 남기고 나머지를 지웁니다 (예: 미완성 캔들을 다시 계산하기 전)."""
+        directory = self.root / storage_name(type) / crypto_name
+        self._columns.pop((crypto_name, storage_name(type)), None)
+        for name, itemsize in (('timestamp_kst.bin', 8), ('close.bin', 8)):
+            path = directory / name
+            if path.exists() and path.stat().st_size > length * itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(length * itemsize)
+
+    def refresh(self):
+        """열어 둔 메모리 매핑을 닫아 다른 프로세스가 추가한 데이터를 다시 읽게 합니다."""
+        self._columns.clear()
+
+    def get_price(self, crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+        timestamps, closes = self.read(crypto_name, type)
+        i = np.searchsorted(timestamps, np.datetime64(timestamp, 'us'), side='right')
+        if i == 0:
+            raise ValueError(f"Error fetching price: No price data found for {crypto_name} at or before {timestamp}")
+        return float(closes[i - 1])
+
+    def get_price_series(self, crypto_name: str, start: datetime, end: datetime,
+                         type: str = 'daily') -> tuple[np.ndarray, np.ndarray]:
+        timestamps, closes = self.read(crypto_name, type)
+        lo = np.searchsorted(timestamps, np.datetime64(start, 'us'), side='left')
+        hi = np.searchsorted(timestamps, np.datetime64(end, 'us'), side='right')
+        return timestamps[lo:hi], closes[lo:hi]
+
+    def iter_bars(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                  type: str = 'daily',
+                  chunk_size: int = 10000) -> Iterator[tuple[datetime, str, float]]:
+        streams = [
+            self._iter_series(name, start, end, type, chunk_size)
+            for name in sorted(crypto_names)
+        ]
+        yield from heapq.merge(*streams)
+
+    def _iter_series(self, crypto_name: str, start: datetime, end: datetime, type: str,
+                     chunk_size: int) -> Iterator[tuple[datetime, str, float]]:
+        timestamps, closes = self.get_price_series(crypto_name, start, end, type)
+        # 메모리 매핑된 배열을 chunk_size 단위로 읽음
+        for lo in range(0, len(timestamps), chunk_size):
+            for timestamp, close in zip(timestamps[lo:lo + chunk_size].tolist(), closes[lo:lo + chunk_size].tolist()):
+                yield timestamp, crypto_name, close
+
+
+def sync(store: LocalPriceStore, markets: Optional[Iterable[str]] = None,
+         types: Iterable[str] = PRICE_TYPES, source: Optional[PriceSource] = None) -> dict:
+    """db 가격 테이블을 로컬 저장소로 가져옵니다. 마지막 저장 시간 이후의 캔들만 추가합니다.
+
+    Args:
+        store: 저장할 로컬 가격 저장소
+        markets: 가져올 암호화폐 이름 목록 (기본값: 테이블의 전체 암호화폐)
+        types: 가져올 가격 데이터 타입 목록 (기본값: 'daily', '1hour')
+        source: 원본 가격 소스 (기본값: db)
+
+    Returns:
+        dict: {(가격 타입, 암호화폐): 추가된 캔들 수}
+    """
+    source = source if source is not None else DatabasePriceSource()
+    appended = {}
+    for type in types:
+        for market in (markets if markets is not None else source.list_markets(type)):
+            last = store.last_timestamp(market, type)
+            start = datetime.min if last is None else last + timedelta(microseconds=1)
+            timestamps, closes = source.get_price_series(market, start, datetime.max, type)
+            appended[(type, market)] = store.append(market, timestamps, closes, type)
+    return appended
+
+
+def _memmap(path: Path, dtype) -> np.ndarray:
+    if not path.exists() or path.stat().st_size == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='db 가격 테이블을 로컬 가격 저장소로 동기화합니다.')
+    parser.add_argument('command', choices=['sync', 'rollup'])
+    parser.add_argument('--root', default=os.environ.get('PRICE_STORE_PATH', 'price_store'))
+    parser.add_argument('--markets', nargs='*', default=None)
+    parser.add_argument('--types', nargs='*', default=None,
+                        help="sync: 가져올 가격 타입 (기본값: daily 1hour), rollup: 만들 해상도 (필수, 예: 5m 15m 4h)")
+    parser.add_argument('--base', default=None, help='rollup에 사용할 원본 해상도 (기본값: 가능한 가장 긴 해상도)')
+    args = parser.parse_args()
+
+    if args.command == 'rollup':
+        # 예: python price_store.py rollup --types 5m 15m 4h  (저장소의 원본 해상도에서 캔들을 만들어 저장)
+        from rollup import build_rollups
+        if not args.types:
+            parser.error('rollup requires --types')
+        store = LocalPriceStore(args.root)
+        result = build_rollups(store, args.types, args.markets, source=store, base_type=args.base)
+    else:
+        result = sync(LocalPriceStore(args.root), args.markets, args.types or PRICE_TYPES)
+    for (type, market), count in result.items():
+        print(f"{type} {market}: {count}개 추가")
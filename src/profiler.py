@@ -0,0 +1,228 @@
+from contextlib import contextmanager, nullcontext
+from typing import Any, Optional
+import cProfile
+import heapq
+import itertools
+import json
+import time
+
+# 현재 활성화된 프로파일러 (없으면 계측 지점은 아무 일도 하지 않음)
+_active: Optional['Profiler'] = None
+
+
+class _Phase:
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'slowest')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # (소요 시간, 순번, 상세 정보) 최소 힙으로 가장 느린 호출 N개 유지
+        self.slowest = []
+
+
+class Profiler:
+    """백테스트 실행 구간별 호출 횟수와 소요 시간을 모으는 계측기입니다.
+
+    start()로 활성화하면 가격 db 조회('price_query'), 자산 가치 계산('asset_value'),
+    db 저장('db_write') 등의 계측 지점이 시간을 기록합니다.
+    활성화된 프로파일러가 없으면 계측 지점은 None 확인만 하므로 비용이 거의 없습니다.
+    구간 시간은 중첩된 구간을 포함합니다 (예: asset_value는 그 안의 price_query 시간을 포함).
+
+    Attributes:
+        slowest (int): 구간별로 보관할 가장 느린 호출 수
+        counters (dict): {카운터 이름: 값}
+
+    Example:
+        >>> profiler = Profiler(cprofile=True)
+        >>> backtest = Backtest('test', datetime(2024, 1, 1), profile=True, profiler=profiler)
+        >>> ...
+        >>> backtest.close()
+        >>> print(profiler.format_report())
+        >>> profiler.dump_stats('backtest.pstats')
+    """
+
+    def __init__(self, slowest: int = 10, cprofile: bool = False):
+        """
+        Args:
+            slowest: 구간별로 보관할 가장 느린 호출 수 (기본값: 10)
+            cprofile: cProfile도 함께 실행할지 여부 (기본값: False, dump_stats()로 저장)
+        """
+        self.slowest = slowest
+        self.counters = {}
+        self._phases: dict[str, _Phase] = {}
+        self._sequence = itertools.count()
+        self._caches = []
+        self._cprofile = cProfile.Profile() if cprofile else None
+        self._previous = None
+        self._started = None
+        self._elapsed = 0.0
+
+    @property
+    def active(self) -> bool:
+        """현재 활성화되어 있는지 여부"""
+        return self._started is not None
+
+    def start(self):
+        """프로파일러를 활성화합니다. 이미 다른 프로파일러가 활성화되어 있으면 stop() 때 되돌립니다."""
+        global _active
+        if self._started is not None:
+            return
+        self._previous, _active = _active, self
+        self._started = time.perf_counter()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def stop(self):
+        """프로파일러를 비활성화합니다.
+
+        시작한 순서와 다르게 멈춰도 활성 목록에서 이 프로파일러만 빼므로, 멈춘 프로파일러가 다시 활성화되지 않습니다.
+        """
+        global _active
+        if self._started is None:
+            return
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self._elapsed += time.perf_counter() - self._started
+        self._started = None
+        if _active is self:
+            _active = self._previous
+        else:
+            # 나중에 시작한 프로파일러가 아직 활성화되어 있으면 이 프로파일러를 건너뛰도록 연결
+            later = _active
+            while later is not None and later._previous is not self:
+                later = later._previous
+            if later is not None:
+                later._previous = self._previous
+        self._previous = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def watch_cache(self, cache):
+        """report()에 포함할 가격 캐시를 등록합니다. 등록 시점 이후의 hits/misses/loads 변화량을 보고합니다."""
+        self._caches.append((cache, cache.stats()))
+
+    @contextmanager
+    def phase(self, name: str, detail: Any = None):
+        """with 블록의 소요 시간을 name 구간에 기록합니다.
+
+        Args:
+            name: 구간 이름
+            detail: 가장 느린 호출 목록에 함께 보관할 정보 (보고서 작성 시 문자열로 변환)
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, detail)
+
+    def record(self, name: str, seconds: float, detail: Any = None):
+        """name 구간에 호출 한 번의 소요 시간을 기록합니다."""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase()
+        phase.calls += 1
+        phase.seconds += seconds
+        if seconds > phase.max_seconds:
+            phase.max_seconds = seconds
+        entry = (seconds, next(self._sequence), detail)
+        if len(phase.slowest) < self.slowest:
+            heapq.heappush(phase.slowest, entry)
+        elif self.slowest and seconds > phase.slowest[0][0]:
+            heapq.heapreplace(phase.slowest, entry)
+
+    def count(self, name: str, value: int = 1):
+        """카운터 값을 늘립니다."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> dict:
+        """수집한 결과를 JSON으로 저장할 수 있는 dict로 반환합니다.
+
+        Returns:
+            dict: wall_seconds(활성화되어 있던 시간), phases({구간: calls, seconds, mean_ms, max_ms, share, slowest}),
+                counters, cache(등록된 가격 캐시의 변화량)
+        """
+        wall = self._elapsed
+        if self._started is not None:
+            wall += time.perf_counter() - self._started
+        phases = {}
+        for name, phase in sorted(self._phases.items(), key=lambda item: -item[1].seconds):
+            phases[name] = {
+                'calls': phase.calls,
+                'seconds': phase.seconds,
+                'mean_ms': phase.seconds / phase.calls * 1000,
+                'max_ms': phase.max_seconds * 1000,
+                'share': phase.seconds / wall if wall else 0.0,
+                'slowest': [
+                    {'ms': seconds * 1000, 'detail': None if detail is None else str(detail)}
+                    for seconds, _, detail in sorted(phase.slowest, reverse=True)
+                ],
+            }
+        cache = {}
+        for watched, baseline in self._caches:
+            current = watched.stats()
+            for key in ('hits', 'misses', 'loads', 'evictions'):
+                cache[key] = cache.get(key, 0) + current[key] - baseline[key]
+        if cache:
+            lookups = cache['hits'] + cache['misses']
+            cache['hit_rate'] = cache['hits'] / lookups if lookups else 0.0
+        return {'wall_seconds': wall, 'phases': phases, 'counters': dict(self.counters), 'cache': cache}
+
+    def format_report(self) -> str:
+        """report()를 사람이 읽을 수 있는 표 형식 문자열로 반환합니다."""
+        report = self.report()
+        lines = [f"프로파일 결과 (전체 {report['wall_seconds']:.3f}초)",
+                 f"{'구간':<20}{'호출':>10}{'합계(s)':>12}{'평균(ms)':>12}{'최대(ms)':>12}{'비율':>8}"]
+        for name, phase in report['phases'].items():
+            lines.append(f"{name:<20}{phase['calls']:>10,}{phase['seconds']:>12.4f}{phase['mean_ms']:>12.4f}"
+                         f"{phase['max_ms']:>12.4f}{phase['share']:>8.1%}")
+        if report['counters']:
+            lines.append("카운터: " + ", ".join(f"{key}={value:,}" for key, value in report['counters'].items()))
+        if report['cache']:
+            cache = report['cache']
+            lines.append(f"가격 캐시: hits={cache['hits']:,}, misses={cache['misses']:,}, "
+                         f"hit_rate={cache['hit_rate']:.1%}, loads={cache['loads']:,}")
+        for name, phase in report['phases'].items():
+            if phase['slowest']:
+                lines.append(f"가장 느린 {name} 호출:")
+                lines.extend(f"  {call['ms']:.3f} ms  {call['detail'] or ''}" for call in phase['slowest'])
+        return "\n".join(lines)
+
+    def save_json(self, path: str):
+        """report()를 JSON 파일로 저장합니다."""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+    def dump_stats(self, path: str):
+        """cProfile 결과를 pstats 파일로 저장합니다 (python -m pstats path 또는 snakeviz 등으로 확인).
+
+        Raises:
+            ValueError: cprofile=False로 만든 경우
+        """
+        if self._cprofile is None:
+            raise ValueError("Profiler was created without cprofile=True")
+        self._cprofile.dump_stats(path)
+
+
+def active_profiler() -> Optional[Profiler]:
+    """현재 활성화된 프로파일러를 반환합니다. 없으면 None"""
+    return _active
+
+
+def profile_phase(name: str, detail: Any = None):
+    """활성화된 프로파일러가 있으면 name 구간을 기록하는 컨텍스트를, 없으면 빈 컨텍스트를 반환합니다."""
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name, detail)
+
+
+def profile_count(name: str, value: int = 1):
+    """활성화된 프로파일러가 있으면 카운터 값을 늘립니다."""
+    if _active is not None:
+        _active.count(name, value)
@@ -0,0 +1,354 @@
+from datetime import datetime
+from typing import Iterator, Optional, Sequence, Union
+import argparse
+import io
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, String, cast, select, type_coerce
+from fill_model import trade_amounts
+from get_price import get_prices
+from profiler import profile_count, profile_phase
+from util.db_engine import get_engine
+from util.table_transaction_id_log import Transaction
+from vectorized_backtest import max_drawdown
+
+# transactions_id_log에서 읽는 열 (조회 순서)
+RUN_COLUMNS = (
+    'transaction_time', 'crypto_name', 'transaction_type', 'fee_type', 'fee_amount', 'price', 'quantity',
+    'total_amount', 'cash_balance', 'asset_value', 'total_value', 'return_rate',
+)
+FLOAT_COLUMNS = RUN_COLUMNS[4:]
+CATEGORY_COLUMNS = ('crypto_name', 'transaction_type', 'fee_type')
+# return_rate 열은 Numeric(20, 2)로 저장되므로 반올림 오차까지 허용
+_RETURN_RATE_ATOL = 0.005
+
+
+def run_query(backtest_id: str):
+    """backtest_id의 거래 기록을 (transaction_time, id) 순서로 읽는 쿼리
+
+    idx_backtest_id_log (backtest_id, transaction_time) 인덱스로 행을 찾고 정렬합니다.
+    Numeric 열은 db에서 float로 변환해 행마다 Decimal을 만들지 않고, 시간은 드라이버 값 그대로 받아
+    pandas에서 한 번에 변환합니다.
+    """
+    return (
+        select(
+            type_coerce(Transaction.transaction_time, String).label('transaction_time'),
+            Transaction.crypto_name,
+            Transaction.transaction_type,
+            Transaction.fee_type,
+            *[cast(getattr(Transaction, column), Float).label(column) for column in FLOAT_COLUMNS],
+        )
+        .where(Transaction.backtest_id == backtest_id)
+        .order_by(Transaction.transaction_time, Transaction.id)
+    )
+
+
+def load_run(backtest_id: str, chunk_size: int = 100_000) -> pd.DataFrame:
+    """db에 저장된 백테스트 실행의 거래 기록을 열 단위로 한 번에 읽습니다.
+
+    postgresql(psycopg2)은 COPY ... TO STDOUT으로 CSV를 받아 pandas로 파싱하고,
+    그 외에는 드라이버 커서로 chunk_size행씩 읽어 DataFrame으로 모읍니다. ORM 객체나 Row 객체는 만들지 않습니다.
+
+    Args:
+        backtest_id: 백테스트 실행 ID
+        chunk_size: 커서로 한 번에 읽는 행 수 (COPY를 쓰지 않는 경우)
+
+    Returns:
+        pd.DataFrame: RUN_COLUMNS 열 (시간순, 범주 열은 category, 숫자 열은 float64)
+    """
+    engine = get_engine()
+    statement = run_query(backtest_id)
+    with profile_phase('replay_load', backtest_id):
+        if engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2':
+            frame = _copy_run(engine, statement)
+        else:
+            frame = _fetch_run(engine, statement, chunk_size)
+    profile_count('replay_rows', len(frame))
+    return frame
+
+
+def _copy_run(engine, statement) -> pd.DataFrame:
+    sql = statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})
+    buffer = io.StringIO()
+    with engine.connect() as conn:
+        # COPY는 psycopg2 커서로 직접 실행
+        cursor = conn.connection.driver_connection.cursor()
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", buffer)
+    buffer.seek(0)
+    frame = pd.read_csv(buffer, names=list(RUN_COLUMNS), header=None,
+                        dtype={**{column: 'category' for column in CATEGORY_COLUMNS},
+                               **{column: np.float64 for column in FLOAT_COLUMNS}})
+    frame['transaction_time'] = pd.to_datetime(frame['transaction_time'], format='ISO8601')
+    return frame
+
+
+def _fetch_run(engine, statement, chunk_size: int) -> pd.DataFrame:
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+    chunks = []
+    with engine.connect() as conn:
+        # Row 객체를 만들지 않도록 드라이버 커서에서 튜플을 직접 받아 chunk_size행씩 DataFrame으로 만듦
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            cursor.execute(sql)
+            while rows := cursor.fetchmany(chunk_size):
+                chunks.append(pd.DataFrame.from_records(rows, columns=list(RUN_COLUMNS)))
+        finally:
+            cursor.close()
+    if not chunks:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in RUN_COLUMNS})
+    frame = pd.concat(chunks, ignore_index=True)
+    frame['transaction_time'] = pd.to_datetime(frame['transaction_time'], format='ISO8601')
+    for column in CATEGORY_COLUMNS:
+        frame[column] = frame[column].astype('category')
+    frame[list(FLOAT_COLUMNS)] = frame[list(FLOAT_COLUMNS)].astype(np.float64)
+    return frame
+
+
+def replay(run: Union[str, pd.DataFrame], initial_balance: Optional[float] = None, initial_cash: float = 0.0,
+           revalue: bool = False, price_type: str = '1hour', atol: float = 0.01, rtol: float = 1e-9) -> dict:
+    """저장된 거래 기록으로 현금/보유 수량/총 가치를 다시 계산해 저장된 값과 어긋나는 행을 찾습니다.
+
+    모든 계산은 열 전체에 대한 NumPy 연산입니다. 행마다 다음 항목을 확인합니다.
+        - total_amount: 가격/수량/수수료로 계산한 거래 금액 (입출금은 금액 그대로)
+        - cash_balance: 직전 행의 저장된 현금 잔고 + 이번 거래의 현금 증감
+        - holdings: 매도 후 보유 수량이 음수가 되는지 여부
+        - total_value: 저장된 현금 잔고 + 저장된 asset_value
+        - return_rate: 저장된 total_value / initial_balance - 1 (소수 둘째 자리 저장 오차 허용)
+        - asset_value (revalue인 경우): 거래 직후 보유 수량을 price_type 가격으로 다시 평가한 값
+    현금은 직전 행의 저장된 값과 비교하므로, 소수 둘째 자리로 저장된 금액의 반올림 오차가 누적되지 않고
+    처음으로 어긋난 행만 표시됩니다.
+
+    Args:
+        run: 백테스트 실행 ID 또는 load_run이 반환한 DataFrame
+        initial_balance: 수익률 기준 금액 (기본값: 첫 행이 입금이면 그 금액)
+        initial_cash: 첫 행 이전의 현금 잔고 (기본값: 0.0, save_db 실행은 초기 잔고를 입금으로 기록)
+        revalue: asset_value를 가격 db로 다시 평가해 비교할지 여부 (기본값: False)
+        price_type: revalue에 사용할 가격 해상도 (Backtest의 valuation_type과 같게 지정)
+        atol: 금액 비교 절대 허용 오차 (KRW)
+        rtol: 금액 비교 상대 허용 오차
+
+    Returns:
+        dict:
+            - backtest_id (str): 실행 ID (DataFrame을 넘긴 경우 None)
+            - rows (int): 거래 기록 수
+            - ok (bool): 어긋난 행이 없는지 여부
+            - checks (dict): 항목별 어긋난 행 수
+            - first_drift (datetime): 처음 어긋난 행의 시간 (없으면 None)
+            - drift (DataFrame): 어긋난 행과 항목별 표시(drift_*), 다시 계산한 값(expected_*)
+            - final_cash (float): 다시 계산한 최종 현금 잔고
+            - holdings (dict): 다시 계산한 최종 보유 수량 {암호화폐: 수량}
+            - equity_curve (DataFrame): 거래 시간별 마지막 cash_balance, asset_value, total_value, return_rate
+            - max_drawdown (float): equity_curve의 최대 낙폭
+
+    Raises:
+        ValueError: 거래 기록이 없거나, initial_balance를 알 수 없는 경우
+    """
+    backtest_id = run if isinstance(run, str) else None
+    frame = load_run(run) if isinstance(run, str) else run
+    if not len(frame):
+        raise ValueError(f"No transactions for {backtest_id}")
+    transaction_type = frame['transaction_type'].to_numpy(dtype=object)
+    is_buy = transaction_type == 'Buy'
+    is_sell = transaction_type == 'Sell'
+    is_deposit = transaction_type == 'Deposit'
+    traded = is_buy | is_sell
+    price, quantity, fee_amount, total_amount, cash_balance, asset_value, total_value, return_rate = (
+        frame[column].to_numpy(dtype=np.float64) for column in
+        ('price', 'quantity', 'fee_amount', 'total_amount', 'cash_balance', 'asset_value', 'total_value',
+         'return_rate'))
+    if initial_balance is None:
+        if not is_deposit[0]:
+            raise ValueError("initial_balance is required when the run does not start with a deposit")
+        initial_balance = float(total_amount[0])
+
+    with profile_phase('replay', (backtest_id, len(frame))):
+        # 거래 금액: 매수/매도는 수수료 유형별로 trade_amount와 같은 계산, 입출금은 금액 그대로
+        expected_amount = quantity.copy()
+        fee_type = frame['fee_type'].to_numpy(dtype=object)
+        for kind in ('percent', 'fixed'):
+            mask = traded & (fee_type == kind)
+            if mask.any():
+                expected_amount[mask] = trade_amounts(is_buy[mask], price[mask], quantity[mask], kind, fee_amount[mask])
+        cash_delta = np.where(is_buy | (transaction_type == 'Withdraw'), -total_amount, total_amount)
+        previous_cash = np.concatenate(([initial_cash], cash_balance[:-1]))
+        cash = initial_cash + np.cumsum(cash_delta)
+
+        codes, markets = _market_codes(frame, traded)
+        signed = np.where(is_buy, quantity, np.where(is_sell, -quantity, 0.0))
+        held = _held_after(codes, signed)
+
+        checks = {
+            'total_amount': ~np.isclose(total_amount, expected_amount, rtol=rtol, atol=atol),
+            'cash_balance': ~np.isclose(cash_balance, previous_cash + cash_delta, rtol=rtol, atol=atol),
+            'holdings': traded & (held < -1e-8),
+            'total_value': ~np.isclose(total_value, cash_balance + asset_value, rtol=rtol, atol=atol),
+            'return_rate': ~np.isclose(return_rate, total_value / initial_balance - 1,
+                                       rtol=0, atol=_RETURN_RATE_ATOL + rtol),
+        }
+        expected = {
+            'total_amount': expected_amount,
+            'cash_balance': previous_cash + cash_delta,
+            'total_value': cash_balance + asset_value,
+            'return_rate': total_value / initial_balance - 1,
+        }
+        times = frame['transaction_time'].to_numpy(dtype='datetime64[us]')
+        valued = asset_value
+        if revalue and markets:
+            # 거래마다 그 거래 직후의 보유 수량으로 평가 (Backtest의 거래 기록과 같은 기준)
+            valued = _revalue(codes, signed, markets, np.arange(1, len(frame) + 1), times, price_type)
+            checks['asset_value'] = ~np.isclose(asset_value, valued, rtol=rtol, atol=atol)
+            expected['asset_value'] = valued
+
+    flagged = np.zeros(len(frame), dtype=bool)
+    for mask in checks.values():
+        flagged |= mask
+    drift = frame[flagged].copy()
+    for name, mask in checks.items():
+        drift[f"drift_{name}"] = mask[flagged]
+    for name, values in expected.items():
+        drift[f"expected_{name}"] = values[flagged]
+    if flagged.any():
+        profile_count('replay_drift_rows', int(flagged.sum()))
+
+    # 같은 시간의 여러 거래는 마지막 거래 직후 상태로 곡선을 만듦
+    last = np.concatenate((times[1:] != times[:-1], [True]))
+    curve_total = cash[last] + valued[last]
+    equity_curve = pd.DataFrame({
+        'cash_balance': cash[last],
+        'asset_value': valued[last],
+        'total_value': curve_total,
+        'return_rate': curve_total / initial_balance - 1,
+    }, index=pd.DatetimeIndex(times[last], name='transaction_time'))
+
+    final = {}
+    for j, market in enumerate(markets):
+        amount = float(signed[codes == j].sum())
+        if abs(amount) > 1e-12:
+            final[market] = amount
+    first = np.flatnonzero(flagged)
+    return {
+        'backtest_id': backtest_id,
+        'rows': len(frame),
+        'ok': not flagged.any(),
+        'checks': {name: int(mask.sum()) for name, mask in checks.items()},
+        'first_drift': frame['transaction_time'].iloc[first[0]].to_pydatetime() if len(first) else None,
+        'drift': drift,
+        'final_cash': float(cash[-1]),
+        'holdings': final,
+        'equity_curve': equity_curve,
+        'max_drawdown': max_drawdown(curve_total),
+    }
+
+
+def _revalue(codes: np.ndarray, signed: np.ndarray, markets: Sequence[str], state: np.ndarray,
+             points: np.ndarray, price_type: str) -> np.ndarray:
+    """앞의 state개 거래를 반영한 보유 수량을 points 시점의 as-of 가격으로 평가한 자산 가치
+
+    가격은 get_prices로 모든 시점/암호화폐를 한 번에 조회하고, 보유 수량은 암호화폐별 누적 합으로 계산하므로
+    (행 수 x 암호화폐 수) 행렬을 만들지 않습니다. 보유 중인 암호화폐의 가격이 없으면 NaN입니다.
+    """
+    unique, inverse = np.unique(points, return_inverse=True)
+    prices = get_prices(markets, unique.astype(datetime), price_type).to_numpy()
+    value = np.zeros(len(points))
+    for j, held in _held_at(codes, signed, len(markets), state):
+        price = prices[inverse, j]
+        value += np.where(held != 0, held * price, 0.0)
+    return value
+
+
+def equity_at(frame: pd.DataFrame, timestamps: Sequence[datetime], price_type: str = '1hour',
+              initial_cash: float = 0.0, initial_balance: Optional[float] = None) -> pd.DataFrame:
+    """저장된 거래 기록으로 임의 시점의 포트폴리오 가치를 계산합니다 (Backtest.equity_curve와 같은 방식).
+
+    Args:
+        frame: load_run이 반환한 DataFrame
+        timestamps: 평가 시점 목록 (예: 백테스트 구간의 1시간 간격 시간)
+        price_type: 가격 해상도
+        initial_cash: 첫 행 이전의 현금 잔고
+        initial_balance: 수익률 기준 금액 (기본값: 첫 행이 입금이면 그 금액)
+
+    Returns:
+        pd.DataFrame: index가 timestamps, columns가 cash_balance, asset_value, total_value, return_rate
+    """
+    points = np.asarray(timestamps, dtype='datetime64[us]')
+    times = frame['transaction_time'].to_numpy(dtype='datetime64[us]')
+    transaction_type = frame['transaction_type'].to_numpy(dtype=object)
+    is_buy = transaction_type == 'Buy'
+    traded = is_buy | (transaction_type == 'Sell')
+    quantity = frame['quantity'].to_numpy(dtype=np.float64)
+    total_amount = frame['total_amount'].to_numpy(dtype=np.float64)
+    if initial_balance is None:
+        if not len(frame) or transaction_type[0] != 'Deposit':
+            raise ValueError("initial_balance is required when the run does not start with a deposit")
+        initial_balance = float(total_amount[0])
+    codes, markets = _market_codes(frame, traded)
+    signed = np.where(is_buy, quantity, np.where(traded, -quantity, 0.0))
+    cash_delta = np.where(is_buy | (transaction_type == 'Withdraw'), -total_amount, total_amount)
+    cash = np.concatenate(([initial_cash], initial_cash + np.cumsum(cash_delta)))
+    state = np.searchsorted(times, points, side='right')
+    asset_value = (_revalue(codes, signed, markets, state, points, price_type) if markets
+                   else np.zeros(len(points)))
+    total_value = cash[state] + asset_value
+    return pd.DataFrame({
+        'cash_balance': cash[state],
+        'asset_value': asset_value,
+        'total_value': total_value,
+        'return_rate': total_value / initial_balance - 1,
+    }, index=pd.DatetimeIndex(points, name='timestamp_kst'))
+
+
+def _market_codes(frame: pd.DataFrame, traded: np.ndarray) -> tuple[np.ndarray, list[str]]:
+    # 매수/매도 행의 암호화폐 코드 (입출금의 'KRW'는 -1)
+    names = frame['crypto_name'].to_numpy(dtype=object)
+    markets = list(dict.fromkeys(names[traded]))
+    if not markets:
+        return np.full(len(frame), -1, dtype=np.int64), markets
+    index = pd.Index(markets)
+    codes = index.get_indexer(names)
+    return np.where(traded, codes, -1), markets
+
+
+def _held_after(codes: np.ndarray, signed: np.ndarray) -> np.ndarray:
+    """각 행 직후 그 행 암호화폐의 보유 수량 (암호화폐별 누적 합, 입출금 행은 0)"""
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    cumulative = np.cumsum(signed[order])
+    starts = np.concatenate(([True], sorted_codes[1:] != sorted_codes[:-1]))
+    group = np.cumsum(starts) - 1
+    base = np.concatenate(([0.0], cumulative))[np.flatnonzero(starts)]
+    held = np.empty(len(codes))
+    held[order] = cumulative - base[group]
+    return np.where(codes >= 0, held, 0.0)
+
+
+def _held_at(codes: np.ndarray, signed: np.ndarray, count: int, state: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+    """암호화폐별로 (코드, 앞의 state개 거래를 반영한 보유 수량 배열)을 돌려줍니다."""
+    for j in range(count):
+        rows = np.flatnonzero(codes == j)
+        cumulative = np.concatenate(([0.0], np.cumsum(signed[rows])))
+        yield j, cumulative[np.searchsorted(rows, state, side='left')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='db에 저장된 백테스트 실행을 다시 계산해 저장된 값과 비교합니다.')
+    parser.add_argument('backtest_id')
+    parser.add_argument('--revalue', action='store_true', help='asset_value를 가격 db로 다시 평가해 비교')
+    parser.add_argument('--price-type', default='1hour', help='revalue에 사용할 가격 해상도 (기본값: 1hour)')
+    parser.add_argument('--initial-balance', type=float, default=None, help='수익률 기준 금액 (기본값: 첫 입금액)')
+    parser.add_argument('--drift-out', default=None, help='어긋난 행을 저장할 CSV 경로')
+    parser.add_argument('--equity-out', default=None, help='equity curve를 저장할 CSV 경로')
+    args = parser.parse_args()
+
+    result = replay(args.backtest_id, initial_balance=args.initial_balance, revalue=args.revalue,
+                    price_type=args.price_type)
+    print(f"{result['backtest_id']}: {result['rows']:,}행, 최종 현금 {result['final_cash']:,.0f} KRW, "
+          f"보유 {result['holdings']}, 최대 낙폭 {result['max_drawdown']:.2%}")
+    for name, count in result['checks'].items():
+        print(f"- {name}: {'일치' if count == 0 else f'{count:,}행 어긋남'}")
+    if result['first_drift'] is not None:
+        print(f"처음 어긋난 시간: {result['first_drift']}")
+    if args.drift_out:
+        result['drift'].to_csv(args.drift_out, index=False)
+    if args.equity_out:
+        result['equity_curve'].to_csv(args.equity_out)
+    raise SystemExit(0 if result['ok'] else 1)
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from functools import lru_cache
+import re
+import numpy as np
+
+# 기존 가격 타입 이름 -> 표준 해상도 이름
+ALIASES = {
+    'daily': '1d',
+    '1hour': '1h',
+    '1min': '1m',
+    'minute': '1m',
+}
+# 표준 해상도 이름 -> 테이블/저장소에서 사용하는 이름 (upbit_{이름}_price)
+STORAGE_NAMES = {
+    '1d': 'daily',
+    '1h': '1hour',
+    '1m': '1min',
+}
+UNITS = {'m': timedelta(minutes=1), 'h': timedelta(hours=1), 'd': timedelta(days=1)}
+_PATTERN = re.compile(r'^(\d+)([mhd])$')
+
+
+@lru_cache(maxsize=None)
+def normalize(price_type: str) -> str:
+    """가격 타입을 표준 해상도 이름으로 바꿉니다 (예: 'daily' -> '1d', '60m' -> '1h', '4h' -> '4h').
+
+    Raises:
+        ValueError: 해석할 수 없는 가격 타입인 경우
+    """
+    name = ALIASES.get(price_type, price_type)
+    match = _PATTERN.match(name)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Unknown price type: {price_type}")
+    step = int(match.group(1)) * UNITS[match.group(2)]
+    # 가장 큰 단위로 표현 (60m -> 1h, 24h -> 1d)
+    for unit in ('d', 'h', 'm'):
+        if step % UNITS[unit] == timedelta(0):
+            return f"{step // UNITS[unit]}{unit}"
+
+
+def step_of(price_type: str) -> timedelta:
+    """가격 타입의 캔들 길이"""
+    match = _PATTERN.match(normalize(price_type))
+    return int(match.group(1)) * UNITS[match.group(2)]
+
+
+def storage_name(price_type: str) -> str:
+    """테이블(upbit_{이름}_price)과 로컬 저장소 디렉터리에 사용하는 이름 (예: '1h' -> '1hour', '4h' -> '4h')"""
+    name = normalize(price_type)
+    return STORAGE_NAMES.get(name, name)
+
+
+def floor_times(timestamps: np.ndarray, price_type: str) -> np.ndarray:
+    """시간을 해당 해상도 캔들의 시작 시간으로 내립니다 (1970-01-01 00:00 기준 정렬, 일봉은 KST 자정)."""
+    step = np.timedelta64(step_of(price_type), 'us').astype(np.int64)
+    micros = np.asarray(timestamps, dtype='datetime64[us]').astype(np.int64)
+    return ((micros // step) * step).astype('datetime64[us]')
+
+
+def resample(timestamps: np.ndarray, closes: np.ndarray, price_type: str) -> tuple[np.ndarray, np.ndarray]:
+    """시간순으로 정렬된 종가 시계열을 더 큰 해상도의 캔들로 묶습니다.
+
+    각 캔들의 시간은 구간 시작 시간, 종가는 구간 안 마지막 종가입니다 (upbit 캔들과 같은 규칙).
+
+    Args:
+        timestamps: 정렬된 시간 배열
+        closes: timestamps와 같은 길이의 종가 배열
+        price_type: 만들 해상도 (예: '5m', '4h')
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (캔들 시작 시간[datetime64[us]], 종가[float64])
+    """
+    buckets = floor_times(timestamps, price_type)
+    if len(buckets) == 0:
+        return buckets, np.asarray(closes, dtype=np.float64)
+    last = np.append(buckets[1:] != buckets[:-1], True)
+    return buckets[last], np.asarray(closes, dtype=np.float64)[last]
+
+
+def rollup_base(price_type: str, native_types) -> str:
+    """price_type 캔들을 만들 수 있는 원본 해상도를 고릅니다.
+
+    native_types 중 price_type의 캔들 길이를 나누어떨어지게 하는 가장 긴 해상도를 사용해 읽는 행 수를 줄입니다.
+
+    Raises:
+        ValueError: 만들 수 있는 원본 해상도가 없는 경우
+    """
+    step = step_of(price_type)
+    candidates = [name for name in native_types if step % step_of(name) == timedelta(0)]
+    if not candidates:
+        raise ValueError(f"No native resolution can build {price_type} bars (native: {list(native_types)})")
+    return max(candidates, key=step_of)
@@ -0,0 +1,336 @@
+from datetime import datetime
+from typing import Callable, Iterable, Optional, Union
+import math
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+from backtest_class import Backtest
+from vectorized_backtest import max_drawdown
+from util.db_engine import get_engine
+from util.table_backtest_run import BacktestRun
+
+# 요약 테이블의 열 (id 제외)
+RUN_FIELDS = ('backtest_id', 'group_id', 'strategy', 'params', 'start_date', 'end_date', 'initial_balance',
+              'final_value', 'return_rate', 'max_drawdown', 'volatility', 'sharpe', 'trades_count',
+              'wall_time', 'error', 'created_at')
+# query_runs/top_runs가 정렬할 수 있는 지표
+RANK_FIELDS = ('return_rate', 'final_value', 'max_drawdown', 'volatility', 'sharpe', 'trades_count',
+               'wall_time', 'created_at')
+# 한 번에 삭제할 backtest_id 수 (db 파라미터 개수 제한)
+_DELETE_CHUNK = 500
+
+
+def _clean(value):
+    """numpy 값은 파이썬 값으로, NaN은 None으로 바꿉니다."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _strategy_name(strategy: Union[str, Callable, None]) -> Optional[str]:
+    if strategy is None or isinstance(strategy, str):
+        return strategy
+    return getattr(strategy, '__qualname__', getattr(strategy, '__name__', repr(strategy)))
+
+
+def record_runs(runs: Iterable[dict]) -> int:
+    """실행 요약 여러 개를 한 트랜잭션으로 저장합니다.
+
+    같은 backtest_id가 이미 있으면 새 요약으로 바꾸므로 같은 실행을 다시 기록해도 한 행만 남습니다.
+
+    Args:
+        runs: RUN_FIELDS 키를 가진 dict 목록 (backtest_id 필수, 나머지는 생략 가능)
+
+    Returns:
+        int: 저장한 행 수 (저장에 실패하면 0)
+    """
+    now = datetime.now()
+    rows = []
+    for run in runs:
+        row = {field: _clean(run.get(field)) for field in RUN_FIELDS}
+        if row['params'] is not None:
+            row['params'] = {name: _clean(value) for name, value in row['params'].items()}
+        row['trades_count'] = int(row['trades_count'] or 0)
+        row['created_at'] = row['created_at'] or now
+        rows.append(row)
+    if not rows:
+        return 0
+    ids = [row['backtest_id'] for row in rows]
+    try:
+        with get_engine().begin() as conn:
+            for i in range(0, len(ids), _DELETE_CHUNK):
+                conn.execute(delete(BacktestRun).where(BacktestRun.backtest_id.in_(ids[i:i + _DELETE_CHUNK])))
+            conn.execute(insert(BacktestRun), rows)
+    except Exception as e:
+        print(f"실행 요약 저장 중 오류 발생: {e}")
+        return 0
+    return len(rows)
+
+
+def summarize_backtest(backtest, end_date: Optional[datetime] = None) -> dict:
+    """Backtest의 실행 요약을 만듭니다.
+
+    track_metrics로 만든 Backtest는 추적기의 최종 가치/최대 낙폭/변동성/샤프 비율을, 그 외에는
+    거래 기록의 total_value로 계산한 값을 사용합니다. AsyncBacktest도 평가 대기 중인 기록과 end_date 평가를
+    Backtest의 동기 메서드로 처리하므로 await 없이 요약할 수 있습니다.
+
+    Args:
+        backtest: 요약할 Backtest
+        end_date: 최종 가치를 평가할 시간 (기본값: 마지막 거래 기록의 가치)
+
+    Returns:
+        dict: backtest_id, start_date, end_date, initial_balance, final_value, return_rate, max_drawdown,
+            volatility, sharpe, trades_count
+    """
+    log = backtest.transaction_log
+    if backtest.log_type in ('columnar', 'spill'):
+        values = log.column('total_value')
+    else:
+        values = np.array([row['total_value'] for row in log], dtype=np.float64)
+    last_date = log[len(log) - 1]['date'] if len(log) else backtest.start_date
+    metrics = backtest.metrics
+    if end_date is not None:
+        # AsyncBacktest의 같은 이름 메서드는 코루틴이므로 Backtest의 동기 메서드를 직접 호출
+        if metrics is not None:
+            Backtest.mark_to_market(backtest, end_date)
+            Backtest.finalize_valuation(backtest)
+        final_value = backtest.cash_balance + Backtest.get_asset_value(backtest, end_date, backtest.valuation_type)
+        values = np.append(values, final_value)
+    elif metrics is not None and metrics.value is not None:
+        final_value = metrics.value
+    else:
+        final_value = float(values[-1]) if len(values) else backtest.cash_balance
+    return {
+        'backtest_id': backtest.backtest_id,
+        'start_date': backtest.start_date,
+        'end_date': end_date if end_date is not None else last_date,
+        'initial_balance': backtest.initial_balance,
+        'final_value': final_value,
+        'return_rate': final_value / backtest.initial_balance - 1,
+        'max_drawdown': metrics.max_drawdown if metrics is not None else max_drawdown(values),
+        'volatility': metrics.volatility if metrics is not None else None,
+        'sharpe': metrics.sharpe if metrics is not None else None,
+        'trades_count': backtest.trades_count,
+    }
+
+
+def record_backtest(backtest, params: Optional[dict] = None, group_id: Optional[str] = None,
+                    strategy: Union[str, Callable, None] = None, wall_time: Optional[float] = None,
+                    end_date: Optional[datetime] = None) -> dict:
+    """Backtest 실행이 끝난 뒤 요약을 결과 카탈로그에 저장합니다.
+
+    Args:
+        backtest: 끝난 Backtest
+        params: 전략 파라미터
+        group_id: 실행 묶음 이름 (예: 스윕 이름)
+        strategy: 전략 이름 또는 전략 함수
+        wall_time: 실행 시간 (초)
+        end_date: 최종 가치를 평가할 시간 (기본값: 마지막 거래 기록의 가치)
+
+    Returns:
+        dict: 저장한 요약
+
+    Example:
+        >>> started = time.perf_counter()
+        >>> run_strategy(backtest, on_bar, markets, start, end, '1hour')
+        >>> record_backtest(backtest, {'fast': 12}, group_id='ma_2024', strategy=on_bar,
+        ...                 wall_time=time.perf_counter() - started, end_date=end)
+    """
+    summary = summarize_backtest(backtest, end_date)
+    summary.update(params=params, group_id=group_id, strategy=_strategy_name(strategy), wall_time=wall_time)
+    record_runs([summary])
+    return summary
+
+
+def record_sweep(results: pd.DataFrame, group_id: str, strategy: Union[str, Callable, None] = None,
+                 start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                 initial_balance: Optional[float] = None) -> int:
+    """run_sweep 결과를 결과 카탈로그에 저장합니다. 조합마다 backtest_id는 '{group_id}-{run}'입니다.
+
+    Args:
+        results: run_sweep이 반환한 DataFrame
+        group_id: 스윕 이름
+        strategy: 전략 이름 또는 전략 함수
+        start_date: 가격 구간 시작 시간
+        end_date: 가격 구간 끝 시간
+        initial_balance: 초기 투자 금액
+
+    Returns:
+        int: 저장한 행 수
+    """
+    summary_columns = {'run', 'final_value', 'return_rate', 'trades_count', 'max_drawdown', 'error', 'wall_time'}
+    param_names = [column for column in results.columns if column not in summary_columns]
+    name = _strategy_name(strategy)
+    runs = []
+    for row in results.to_dict('records'):
+        runs.append({
+            'backtest_id': f"{group_id}-{row['run']}",
+            'group_id': group_id,
+            'strategy': name,
+            'params': {param: row[param] for param in param_names},
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_balance': initial_balance,
+            'final_value': row['final_value'],
+            'return_rate': row['return_rate'],
+            'max_drawdown': row['max_drawdown'],
+            'trades_count': row['trades_count'],
+            'wall_time': row.get('wall_time'),
+            'error': row['error'],
+        })
+    return record_runs(runs)
+
+
+def _param_filter(name: str, value):
+    element = BacktestRun.params[name]
+    if isinstance(value, bool):
+        return element.as_boolean() == value
+    if isinstance(value, int):
+        return element.as_integer() == value
+    if isinstance(value, float):
+        return element.as_float() == value
+    return element.as_string() == str(value)
+
+
+def query_runs(group_id: Optional[str] = None, order_by: str = 'return_rate', descending: bool = True,
+               limit: Optional[int] = None, offset: int = 0, strategy: Optional[str] = None,
+               min_return: Optional[float] = None, worst_drawdown: Optional[float] = None,
+               min_sharpe: Optional[float] = None, min_trades: Optional[int] = None,
+               params: Optional[dict] = None, since: Optional[datetime] = None,
+               include_failed: bool = False, expand_params: bool = False) -> pd.DataFrame:
+    """실행 요약을 조건으로 거르고 지표 순으로 정렬해 조회합니다.
+
+    거래 기록(transactions_id_log)은 읽지 않고 요약 테이블만 읽습니다. group_id와 return_rate/max_drawdown/sharpe
+    정렬은 (group_id, 지표) 인덱스를 따라 상위 limit개만 읽습니다. 정렬 지표가 없는 실행(실패한 실행 등)은 빠집니다.
+
+    Args:
+        group_id: 실행 묶음 이름 (기본값: 전체)
+        order_by: 정렬 지표 (RANK_FIELDS 중 하나, 기본값: 'return_rate')
+        descending: 큰 값부터 정렬할지 여부 (기본값: True)
+        limit: 최대 행 수 (기본값: 전체)
+        offset: 건너뛸 행 수
+        strategy: 전략 이름
+        min_return: 최소 수익률
+        worst_drawdown: 허용하는 최대 낙폭 (예: -0.2면 20%보다 크게 하락한 실행 제외)
+        min_sharpe: 최소 샤프 비율
+        min_trades: 최소 거래 횟수
+        params: 값이 같아야 하는 파라미터 {이름: 값}
+        since: 이 시간 이후에 기록한 실행만
+        include_failed: 오류가 있는 실행도 포함할지 여부
+        expand_params: 파라미터를 열로 펼칠지 여부 (기본값: params 열에 dict로 반환)
+
+    Returns:
+        pd.DataFrame: RUN_FIELDS 열 (expand_params면 params 대신 파라미터 열)
+
+    Raises:
+        ValueError: 정렬 지표를 알 수 없는 경우
+    """
+    if order_by not in RANK_FIELDS:
+        raise ValueError(f"Unknown order_by: {order_by}")
+    column = getattr(BacktestRun, order_by)
+    query = select(*(getattr(BacktestRun, field) for field in RUN_FIELDS)).where(column.is_not(None))
+    if group_id is not None:
+        query = query.where(BacktestRun.group_id == group_id)
+    if strategy is not None:
+        query = query.where(BacktestRun.strategy == strategy)
+    if min_return is not None:
+        query = query.where(BacktestRun.return_rate >= min_return)
+    if worst_drawdown is not None:
+        query = query.where(BacktestRun.max_drawdown >= worst_drawdown)
+    if min_sharpe is not None:
+        query = query.where(BacktestRun.sharpe >= min_sharpe)
+    if min_trades is not None:
+        query = query.where(BacktestRun.trades_count >= min_trades)
+    if since is not None:
+        query = query.where(BacktestRun.created_at >= since)
+    if not include_failed:
+        query = query.where(BacktestRun.error.is_(None))
+    for name, value in (params or {}).items():
+        query = query.where(_param_filter(name, value))
+    query = query.order_by(column.desc() if descending else column.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    if offset:
+        query = query.offset(offset)
+
+    with get_engine().connect() as conn:
+        frame = pd.DataFrame(conn.execute(query).all(), columns=list(RUN_FIELDS))
+    if expand_params:
+        expanded = pd.DataFrame([params or {} for params in frame['params']], index=frame.index)
+        frame = pd.concat([frame.drop(columns='params'), expanded], axis=1)
+    return frame
+
+
+def top_runs(group_id: Optional[str] = None, by: str = 'return_rate', n: int = 10, **filters) -> pd.DataFrame:
+    """지표가 가장 좋은 실행 n개를 조회합니다.
+
+    volatility와 wall_time은 작은 순, 그 외 지표는 큰 순으로 정렬합니다 (max_drawdown은 0 이하이므로 낙폭이 작은 순).
+
+    Args:
+        group_id: 실행 묶음 이름 (기본값: 전체)
+        by: 정렬 지표 (기본값: 'return_rate')
+        n: 행 수
+        **filters: query_runs의 추가 조건
+
+    Returns:
+        pd.DataFrame: query_runs와 같은 형식
+    """
+    return query_runs(group_id, order_by=by, descending=by not in ('volatility', 'wall_time'), limit=n, **filters)
+
+
+def compare_groups(group_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """실행 묶음별 실행 수, 실패 수, 수익률 평균/최대/최소, 최악 낙폭, 평균 샤프 비율, 총 실행 시간을 집계합니다.
+
+    Args:
+        group_ids: 비교할 실행 묶음 이름 목록 (기본값: 전체)
+
+    Returns:
+        pd.DataFrame: group_id를 인덱스로 하는 집계
+    """
+    ok = BacktestRun.error.is_(None)
+    query = select(
+        BacktestRun.group_id,
+        func.count().label('runs'),
+        (func.count() - func.count(BacktestRun.error)).label('completed'),
+        func.avg(BacktestRun.return_rate).filter(ok).label('mean_return'),
+        func.max(BacktestRun.return_rate).filter(ok).label('best_return'),
+        func.min(BacktestRun.return_rate).filter(ok).label('worst_return'),
+        func.min(BacktestRun.max_drawdown).filter(ok).label('worst_drawdown'),
+        func.avg(BacktestRun.sharpe).filter(ok).label('mean_sharpe'),
+        func.sum(BacktestRun.wall_time).label('wall_time'),
+    ).group_by(BacktestRun.group_id).order_by(BacktestRun.group_id)
+    if group_ids is not None:
+        query = query.where(BacktestRun.group_id.in_(list(group_ids)))
+    with get_engine().connect() as conn:
+        rows = conn.execute(query).all()
+    columns = ['group_id', 'runs', 'completed', 'mean_return', 'best_return', 'worst_return',
+               'worst_drawdown', 'mean_sharpe', 'wall_time']
+    return pd.DataFrame(rows, columns=columns).set_index('group_id')
+
+
+def delete_runs(group_id: Optional[str] = None, backtest_ids: Optional[Iterable[str]] = None) -> int:
+    """실행 요약을 삭제합니다. 거래 기록은 삭제하지 않습니다.
+
+    Args:
+        group_id: 삭제할 실행 묶음 이름
+        backtest_ids: 삭제할 backtest_id 목록
+
+    Returns:
+        int: 삭제한 행 수
+
+    Raises:
+        ValueError: group_id와 backtest_ids가 모두 없는 경우
+    """
+    if group_id is None and backtest_ids is None:
+        raise ValueError("group_id or backtest_ids is required")
+    deleted = 0
+    with get_engine().begin() as conn:
+        if group_id is not None:
+            deleted += conn.execute(delete(BacktestRun).where(BacktestRun.group_id == group_id)).rowcount
+        ids = list(backtest_ids or [])
+        for i in range(0, len(ids), _DELETE_CHUNK):
+            deleted += conn.execute(
+                delete(BacktestRun).where(BacktestRun.backtest_id.in_(ids[i:i + _DELETE_CHUNK]))).rowcount
+    return deleted
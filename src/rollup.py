@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+import heapq
+import numpy as np
+from get_price import PriceSource, get_price_source
+from resolution import floor_times, normalize, resample, rollup_base, step_of
+
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class RollupPriceSource(PriceSource):
+    """원본 해상도 캔들을 묶어 더 큰 해상도의 캔들을 돌려주는 가격 소스입니다.
+
+    base가 직접 가지고 있는 해상도는 그대로 위임하고, 그 외 해상도(예: 5m, 15m, 4h)는
+    base의 해상도 중 캔들 길이를 나누어떨어지게 하는 가장 긴 해상도를 읽어 그 자리에서 만듭니다.
+    캔들 시간은 구간 시작 시간, 종가는 구간 안 마지막 종가이므로 as-of 조회 결과는 같은 해상도의 테이블이
+    있을 때와 같습니다. 반복 조회는 PriceCache가 만들어진 캔들을 구간 단위로 캐시합니다.
+
+    Example:
+        >>> source = RollupPriceSource(DatabasePriceSource())
+        >>> source.get_price('KRW-BTC', datetime(2024, 6, 1, 13, 30), '4h')   # 12:00 4시간봉의 종가
+    """
+
+    def __init__(self, base: Optional[PriceSource] = None):
+        """
+        Args:
+            base: 원본 가격 소스 (기본값: 현재 설정된 가격 소스)
+        """
+        self.base = base
+
+    def _source(self) -> PriceSource:
+        return self.base if self.base is not None else get_price_source()
+
+    def native_types(self) -> list[str]:
+        return self._source().native_types()
+
+    def has_type(self, type: str) -> bool:
+        try:
+            self._route(type)
+        except ValueError:
+            return False
+        return True
+
+    def _route(self, type: str) -> tuple[PriceSource, Optional[str]]:
+        """(원본 소스, 원본 해상도)를 반환합니다. 원본 소스가 직접 가진 해상도면 원본 해상도는 None"""
+        source = self._source()
+        if source.has_type(type):
+            return source, None
+        return source, rollup_base(type, source.native_types())
+
+    def get_price(self, crypto_name: str, timestamp: datetime, type: str = 'daily') -> float:
+        source, base_type = self._route(type)
+        if base_type is None:
+            return source.get_price(crypto_name, timestamp, type)
+        # timestamp가 속한 캔들의 종가 = 캔들 끝 직전 시점의 원본 as-of 종가
+        return source.get_price(crypto_name, _bucket_end(timestamp, type), base_type)
+
+    def get_price_series(self, crypto_name: str, start: datetime, end: datetime,
+                         type: str = 'daily') -> tuple[np.ndarray, np.ndarray]:
+        return self.get_price_series_many([crypto_name], start, end, type)[crypto_name]
+
+    def get_price_series_many(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                              type: str = 'daily') -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        source, base_type = self._route(type)
+        if base_type is None:
+            return source.get_price_series_many(crypto_names, start, end, type)
+        # 마지막 캔들이 완성되도록 end가 속한 캔들 끝까지 원본을 읽고, start 이전에 시작하는 캔들은 제외
+        series = source.get_price_series_many(crypto_names, start, _bucket_end(end, type), base_type)
+        bars = {}
+        for name, (timestamps, closes) in series.items():
+            bar_times, bar_closes = resample(timestamps, closes, type)
+            keep = bar_times >= np.datetime64(start, 'us')
+            bars[name] = (bar_times[keep], bar_closes[keep])
+        return bars
+
+    def get_latest_prices(self, crypto_names: Iterable[str], timestamp: datetime,
+                          type: str = 'daily') -> dict[str, tuple[np.datetime64, float]]:
+        source, base_type = self._route(type)
+        if base_type is None:
+            return source.get_latest_prices(crypto_names, timestamp, type)
+        latest = source.get_latest_prices(crypto_names, _bucket_end(timestamp, type), base_type)
+        return {name: (floor_times(np.array([t]), type)[0], close) for name, (t, close) in latest.items()}
+
+    def iter_bars(self, crypto_names: Iterable[str], start: datetime, end: datetime,
+                  type: str = 'daily',
+                  chunk_size: int = 10000) -> Iterator[tuple[datetime, str, float]]:
+        """(timestamp_kst, market, close)를 시간, 암호화폐 이름 순으로 하나씩 돌려줍니다.
+
+        원본 소스의 iter_bars를 chunk_size 행씩 읽어 암호화폐별로 묶은 캔들을 heapq.merge로 합치므로,
+        조회 구간 길이와 관계없이 메모리 사용량이 일정합니다. 원본은 시간순이므로 청크의 마지막 행이 속한 캔들만
+        다음 청크까지 남겨 두고, 그 이전 캔들은 완성된 것으로 봅니다.
+        """
+        source, base_type = self._route(type)
+        if base_type is None:
+            yield from source.iter_bars(crypto_names, start, end, type, chunk_size)
+            return
+        rows = source.iter_bars(crypto_names, start, _bucket_end(end, type), base_type, chunk_size)
+        start = np.datetime64(start, 'us')
+        pending = []
+        while True:
+            fetched = list(islice(rows, chunk_size))
+            chunk = pending + fetched
+            if not chunk:
+                return
+            timestamps = np.array([row[0] for row in chunk], dtype='datetime64[us]')
+            if fetched:
+                # 마지막 캔들은 다음 청크에 이어질 수 있으므로 남김
+                buckets = floor_times(timestamps, type)
+                split = int(np.searchsorted(buckets, buckets[-1], side='left'))
+                chunk, pending, timestamps = chunk[:split], chunk[split:], timestamps[:split]
+            yield from _resample_rows(chunk, timestamps, type, start)
+            if not fetched:
+                return
+
+    def list_markets(self, type: str = 'daily') -> list[str]:
+        source, base_type = self._route(type)
+        return source.list_markets(type if base_type is None else base_type)
+
+
+def build_rollups(store, types: Iterable[str], markets: Optional[Iterable[str]] = None,
+                  source: Optional[PriceSource] = None, base_type: Optional[str] = None) -> dict:
+    """원본 해상도 캔들로 types 해상도 캔들을 만들어 로컬 가격 저장소에 저장합니다.
+
+    이미 저장된 rollup이 있으면 마지막 캔들(원본 데이터가 더 들어와 바뀌었을 수 있음)부터 다시 계산해 이어 붙이므로,
+    원본을 sync한 뒤 다시 실행하면 새로 들어온 구간만 처리합니다. 저장된 해상도는 이후 LocalPriceStore가 직접 조회합니다.
+
+    Args:
+        store: 결과를 저장할 LocalPriceStore
+        types: 만들 해상도 목록 (예: ['5m', '15m', '4h'])
+        markets: 암호화폐 이름 목록 (기본값: 원본 해상도의 전체 암호화폐)
+        source: 원본 가격 소스 (기본값: 현재 설정된 가격 소스)
+        base_type: 원본 해상도 (기본값: 만들 해상도를 나누어떨어지게 하는 가장 긴 해상도)
+
+    Returns:
+        dict: {(해상도, 암호화폐): 추가된 캔들 수 (다시 계산한 마지막 캔들 포함)}
+
+    Raises:
+        ValueError: 만들 수 있는 원본 해상도가 없거나 원본 해상도가 만들 해상도를 나누지 못하는 경우
+    """
+    source = source if source is not None else get_price_source()
+    appended = {}
+    for type in types:
+        type = normalize(type)
+        # 이전에 만든 rollup 자신은 원본 후보에서 제외
+        base = normalize(base_type) if base_type is not None else rollup_base(
+            type, [name for name in source.native_types() if name != type])
+        if step_of(type) % step_of(base) != timedelta(0) or base == type:
+            raise ValueError(f"Cannot build {type} bars from {base} bars")
+        for market in (markets if markets is not None else source.list_markets(base)):
+            stored, _ = store.read(market, type)
+            start = datetime.min
+            if len(stored):
+                start = stored[-1].astype(datetime)
+                store.truncate(market, len(stored) - 1, type)
+            timestamps, closes = source.get_price_series(market, start, datetime.max, base)
+            bar_times, bar_closes = resample(timestamps, closes, type)
+            appended[(type, market)] = store.append(market, bar_times, bar_closes, type)
+    return appended
+
+
+def _resample_rows(rows: list, timestamps: np.ndarray, type: str,
+                   start: np.datetime64) -> Iterator[tuple[datetime, str, float]]:
+    """(timestamp_kst, market, close) 행을 암호화폐별로 type 캔들로 묶어 시간, 암호화폐 이름 순으로 돌려줍니다."""
+    if not rows:
+        return iter(())
+    markets = np.array([row[1] for row in rows])
+    closes = np.array([row[2] for row in rows], dtype=np.float64)
+    streams = []
+    for name in np.unique(markets).tolist():
+        mask = markets == name
+        bar_times, bar_closes = resample(timestamps[mask], closes[mask], type)
+        keep = bar_times >= start
+        streams.append([(timestamp, name, close)
+                        for timestamp, close in zip(bar_times[keep].tolist(), bar_closes[keep].tolist())])
+    return heapq.merge(*streams)
+
+
+def _bucket_end(timestamp: datetime, type: str) -> datetime:
+    """timestamp가 속한 캔들의 마지막 시점 (다음 캔들 시작 1마이크로초 전)"""
+    start = floor_times(np.array([timestamp], dtype='datetime64[us]'), type)[0].astype(datetime)
+    try:
+        return start + step_of(type) - _MICROSECOND
+    except OverflowError:
+        return datetime.max
@@ -0,0 +1,291 @@
+from datetime import datetime
+from functools import partial
+from itertools import product
+from multiprocessing import Pool, shared_memory
+from typing import Any, Callable, Iterable, Literal, Optional, Union
+import os
+import time
+import numpy as np
+import pandas as pd
+from get_price import get_price_series
+from fill_model import FillModel
+from vectorized_backtest import max_drawdown, run_vectorized
+
+# 전략 함수: (가격 DataFrame, 파라미터) -> 목표 보유 수량 (가격과 같은 모양)
+Strategy = Callable[[pd.DataFrame, dict], Union[np.ndarray, pd.DataFrame]]
+ProgressCallback = Callable[[int, int, float, float], None]
+# 작업 함수: (가격 DataFrame, 전략, 실행 옵션, 작업) -> 결과 dict
+TaskFunction = Callable[[pd.DataFrame, Strategy, dict, Any], dict]
+
+
+def load_price_matrix(markets: Iterable[str], start: datetime, end: datetime,
+                      type: str = '1hour') -> pd.DataFrame:
+    """여러 암호화폐의 종가를 시간 기준으로 정렬된 하나의 행렬로 조회합니다.
+
+    Args:
+        markets: 암호화폐 이름 목록
+        start: 조회 시작 시간
+        end: 조회 종료 시간
+        type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+
+    Returns:
+        pd.DataFrame: index가 timestamp_kst, columns가 암호화폐인 종가 (해당 시점 데이터가 없으면 NaN)
+    """
+    columns = {}
+    for market in markets:
+        timestamps, closes = get_price_series(market, start, end, type)
+        columns[market] = pd.Series(closes, index=pd.DatetimeIndex(timestamps))
+    return pd.DataFrame(columns).sort_index()
+
+
+class SharedPriceMatrix:
+    """가격 행렬을 공유 메모리에 올려 여러 프로세스가 복사 없이 읽도록 합니다.
+
+    공유 메모리 블록에는 시간(int64, 마이크로초)과 가격(float64, 시점 x 암호화폐)이 연속으로 저장되며,
+    spec만 자식 프로세스로 전달하면 attach()로 같은 메모리를 그대로 참조할 수 있습니다.
+
+    Attributes:
+        spec (dict): 다른 프로세스에서 attach할 때 필요한 정보 (name, shape, markets)
+        timestamps (np.ndarray): 시간 배열 (datetime64[us])
+        prices (np.ndarray): (시점, 암호화폐) 모양의 가격 배열
+        markets (list[str]): 암호화폐 이름 목록
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, spec: dict):
+        self._shm = shm
+        self.spec = spec
+        rows, cols = spec['shape']
+        buffer = np.ndarray((rows * (cols + 1),), dtype=np.float64, buffer=shm.buf)
+        self.timestamps = buffer[:rows].view('datetime64[us]')
+        self.prices = buffer[rows:].reshape(rows, cols)
+        self.markets = list(spec['markets'])
+
+    @classmethod
+    def create(cls, frame: pd.DataFrame) -> 'SharedPriceMatrix':
+        """가격 DataFrame을 새 공유 메모리 블록에 복사합니다."""
+        rows, cols = frame.shape
+        shm = shared_memory.SharedMemory(create=True, size=max(8 * rows * (cols + 1), 1))
+        matrix = cls(shm, {'name': shm.name, 'shape': (rows, cols), 'markets': list(frame.columns)})
+        matrix.timestamps[:] = frame.index.to_numpy(dtype='datetime64[us]')
+        matrix.prices[:] = frame.to_numpy(dtype=np.float64)
+        return matrix
+
+    @classmethod
+    def attach(cls, spec: dict) -> 'SharedPriceMatrix':
+        """다른 프로세스가 만든 공유 메모리 블록에 연결합니다."""
+        return cls(shared_memory.SharedMemory(name=spec['name']), spec)
+
+    def to_frame(self) -> pd.DataFrame:
+        """공유 메모리를 복사 없이 참조하는 DataFrame을 반환합니다."""
+        return pd.DataFrame(self.prices, index=pd.DatetimeIndex(self.timestamps),
+                            columns=self.markets, copy=False)
+
+    def close(self):
+        """현재 프로세스의 연결을 닫습니다."""
+        self.timestamps = None
+        self.prices = None
+        self._shm.close()
+
+    def unlink(self):
+        """공유 메모리 블록을 삭제합니다. 생성한 프로세스에서 한 번만 호출합니다."""
+        self._shm.unlink()
+
+
+def expand_grid(param_grid: Union[dict, Iterable[dict]]) -> list[dict]:
+    """파라미터 그리드를 파라미터 조합 목록으로 펼칩니다.
+
+    Args:
+        param_grid: {이름: 값 목록} 형태의 dict (모든 조합 생성) 또는 파라미터 dict 목록
+
+    Returns:
+        list[dict]: 파라미터 조합 목록
+    """
+    if isinstance(param_grid, dict):
+        names = list(param_grid)
+        return [dict(zip(names, values)) for values in product(*(param_grid[name] for name in names))]
+    return [dict(params) for params in param_grid]
+
+
+def summarize_result(result: dict) -> dict:
+    """run_vectorized 결과를 스윕 요약 정보로 줄입니다."""
+    return {
+        'final_value': result['final_value'],
+        'return_rate': result['return_rate'],
+        'trades_count': result['trades_count'],
+        'max_drawdown': max_drawdown(result['equity']['total_value']),
+    }
+
+
+# 작업 프로세스 전역 상태 (_init_worker에서 설정)
+_worker_prices = None
+_worker_matrix = None
+_worker_strategy = None
+_worker_options = None
+
+
+def _init_worker(spec: dict, strategy: Strategy, options: dict):
+    global _worker_prices, _worker_matrix, _worker_strategy, _worker_options
+    _worker_matrix = SharedPriceMatrix.attach(spec)
+    _worker_prices = _worker_matrix.to_frame()
+    _worker_strategy = strategy
+    _worker_options = options
+
+
+def _close_worker():
+    global _worker_prices, _worker_matrix
+    # DataFrame이 공유 메모리를 참조하고 있으면 닫을 수 없으므로 먼저 해제
+    _worker_prices = None
+    if _worker_matrix is not None:
+        _worker_matrix.close()
+        _worker_matrix = None
+
+
+def _run_task(item: tuple[TaskFunction, Any]) -> dict:
+    function, task = item
+    return function(_worker_prices, _worker_strategy, _worker_options, task)
+
+
+def _run_one(prices: pd.DataFrame, strategy: Strategy, options: dict, task: tuple[int, dict]) -> dict:
+    index, params = task
+    summary = {'run': index, **params}
+    started = time.perf_counter()
+    try:
+        positions = strategy(prices, params)
+        result = run_vectorized(prices, positions, **options)
+        summary.update(summarize_result(result))
+        summary['error'] = None
+    except ValueError as e:
+        summary.update(final_value=np.nan, return_rate=np.nan, trades_count=0, max_drawdown=np.nan, error=str(e))
+    summary['wall_time'] = time.perf_counter() - started
+    return summary
+
+
+def _print_progress(done: int, total: int, elapsed: float, eta: float, label: str = '스윕'):
+    print(f"\r{label} 진행: {done}/{total} ({done / total:.1%}) 경과 {elapsed:,.0f}초 남은 시간 {eta:,.0f}초",
+          end='\n' if done == total else '', flush=True)
+
+
+def run_parallel(function: TaskFunction, tasks: list, prices: pd.DataFrame, strategy: Strategy, options: dict,
+                 n_workers: Optional[int] = None, chunksize: int = 1,
+                 progress: Union[bool, ProgressCallback] = True, progress_interval: float = 1.0,
+                 label: str = '스윕') -> list[dict]:
+    """가격 행렬을 공유 메모리에 한 번 올리고 작업들을 프로세스 풀에서 병렬로 실행합니다.
+
+    각 작업은 function(가격 DataFrame, strategy, options, 작업)으로 실행되며, 가격 DataFrame은 작업 프로세스가
+    공유 메모리를 복사 없이 참조합니다. function과 strategy는 모듈 최상위에 정의된 함수여야 합니다.
+
+    Args:
+        function: 작업 하나를 실행해 결과 dict를 반환하는 함수
+        tasks: 작업 목록
+        prices: 공유할 가격 DataFrame
+        strategy: 작업 함수에 넘길 전략 함수
+        options: 작업 함수에 넘길 실행 옵션
+        n_workers: 작업 프로세스 수 (기본값: CPU 수, 1 이하면 현재 프로세스에서 순차 실행)
+        chunksize: 작업 프로세스에 한 번에 넘기는 작업 수
+        progress: 진행 상황 출력 여부 또는 (완료 수, 전체 수, 경과 초, 남은 예상 초)를 받는 콜백
+        progress_interval: 진행 상황 보고 최소 간격 (초)
+        label: 진행 상황 출력에 사용할 이름
+
+    Returns:
+        list[dict]: 완료된 순서대로의 작업 결과
+    """
+    total = len(tasks)
+    n_workers = os.cpu_count() if n_workers is None else n_workers
+    report = partial(_print_progress, label=label) if progress is True else (progress or None)
+
+    matrix = SharedPriceMatrix.create(prices)
+    pool = None
+    results = []
+    started = time.perf_counter()
+    last_report = started
+    items = [(function, task) for task in tasks]
+    try:
+        if n_workers <= 1:
+            _init_worker(matrix.spec, strategy, options)
+            outputs = map(_run_task, items)
+        else:
+            pool = Pool(n_workers, initializer=_init_worker, initargs=(matrix.spec, strategy, options))
+            outputs = pool.imap_unordered(_run_task, items, chunksize=chunksize)
+        for output in outputs:
+            results.append(output)
+            now = time.perf_counter()
+            done = len(results)
+            if report is not None and (now - last_report >= progress_interval or done == total):
+                elapsed = now - started
+                report(done, total, elapsed, elapsed / done * (total - done))
+                last_report = now
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if pool is not None:
+            pool.terminate()
+        else:
+            _close_worker()
+        matrix.close()
+        matrix.unlink()
+    return results
+
+
+def run_sweep(strategy: Strategy, param_grid: Union[dict, Iterable[dict]],
+              markets: Optional[Iterable[str]] = None, start: Optional[datetime] = None,
+              end: Optional[datetime] = None, price_type: str = '1hour',
+              prices: Optional[pd.DataFrame] = None, initial_balance: float = 10000000.0,
+              fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+              n_workers: Optional[int] = None, chunksize: int = 1,
+              progress: Union[bool, ProgressCallback] = True, progress_interval: float = 1.0,
+              catalog_group: Optional[str] = None, fill_model: Optional[FillModel] = None) -> pd.DataFrame:
+    """전략 파라미터 조합 전체를 프로세스 풀에서 병렬로 백테스트합니다.
+
+    가격은 한 번만 조회해 공유 메모리에 올리고, 각 작업 프로세스는 복사 없이 같은 메모리를 읽습니다.
+    각 조합은 strategy가 만든 목표 보유 수량으로 run_vectorized를 실행해 요약 정보만 돌려받습니다.
+    strategy는 다른 프로세스로 전달되므로 모듈 최상위에 정의된 함수여야 합니다.
+
+    Args:
+        strategy: (가격 DataFrame, 파라미터 dict)를 받아 목표 보유 수량을 반환하는 함수
+        param_grid: {이름: 값 목록} 형태의 dict 또는 파라미터 dict 목록
+        markets: 암호화폐 이름 목록 (prices를 지정하지 않은 경우 필수)
+        start: 조회 시작 시간 (prices를 지정하지 않은 경우 필수)
+        end: 조회 종료 시간 (prices를 지정하지 않은 경우 필수)
+        price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        prices: 이미 조회한 가격 DataFrame (지정하면 db를 조회하지 않음)
+        initial_balance: 초기 투자 금액
+        fee_type: 수수료 유형 ('percent' 또는 'fixed')
+        fee_amount: 수수료 금액
+        n_workers: 작업 프로세스 수 (기본값: CPU 수, 1 이하면 현재 프로세스에서 순차 실행)
+        chunksize: 작업 프로세스에 한 번에 넘기는 조합 수
+        progress: 진행 상황 출력 여부 또는 (완료 수, 전체 수, 경과 초, 남은 예상 초)를 받는 콜백
+        progress_interval: 진행 상황 보고 최소 간격 (초)
+        catalog_group: 지정하면 결과를 이 이름의 실행 묶음으로 결과 카탈로그에 저장 (results_catalog 참고)
+        fill_model: run_vectorized에 넘길 체결 모델 (가격에는 거래량이 없으므로 거래량을 쓰지 않는 모델)
+
+    Returns:
+        pd.DataFrame: 조합별 run, 파라미터, final_value, return_rate, trades_count, max_drawdown, error, wall_time
+
+    Example:
+        >>> def ma_cross(prices, params):
+        ...     fast = prices.rolling(params['fast']).mean()
+        ...     slow = prices.rolling(params['slow']).mean()
+        ...     return (fast > slow).astype(float) * 0.01
+        >>> results = run_sweep(ma_cross, {'fast': [6, 12, 24], 'slow': [48, 96]},
+        ...                     markets=['KRW-BTC'], start=datetime(2024, 1, 1), end=datetime(2024, 12, 31))
+    """
+    if prices is None:
+        if markets is None or start is None or end is None:
+            raise ValueError("markets, start and end are required when prices is not given")
+        prices = load_price_matrix(markets, start, end, price_type)
+    tasks = list(enumerate(expand_grid(param_grid)))
+    options = {'initial_balance': initial_balance, 'fee_type': fee_type, 'fee_amount': fee_amount,
+               'fill_model': fill_model}
+    results = run_parallel(_run_one, tasks, prices, strategy, options, n_workers, chunksize,
+                           progress, progress_interval)
+
+    param_names = list(dict.fromkeys(name for _, params in tasks for name in params))
+    columns = ['run', *param_names, 'final_value', 'return_rate',
+               'trades_count', 'max_drawdown', 'error', 'wall_time']
+    frame = pd.DataFrame(results, columns=columns).sort_values('run').reset_index(drop=True)
+    if catalog_group is not None:
+        from results_catalog import record_sweep
+        record_sweep(frame, catalog_group, strategy, prices.index[0].to_pydatetime(),
+                     prices.index[-1].to_pydatetime(), initial_balance)
+    return frame
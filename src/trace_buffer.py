@@ -0,0 +1,207 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Union
+import json
+import os
+
+# 추적 수준 (logging 모듈과 같은 값)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+_LEVEL_NAMES = {value: name.upper() for name, value in LEVELS.items()}
+
+_TRANSACTION_LABELS = {'Buy': '매수', 'Sell': '매도', 'Deposit': '입금', 'Withdraw': '출금'}
+
+
+class TraceEvent(NamedTuple):
+    """추적 이벤트 한 건
+
+    Attributes:
+        seq (int): 버퍼에 기록된 순번 (0부터, 덮어써진 이벤트도 세므로 빠진 번호로 유실을 알 수 있음)
+        level (int): 추적 수준 (DEBUG, INFO, WARNING, ERROR)
+        kind (str): 이벤트 종류 ('transaction', 'valuation', 'mark', 'rejected')
+        backtest_id (str): 이벤트를 기록한 백테스트 ID
+        date (datetime): 백테스트 시간 (거래 시점 등)
+        crypto_name (str): 관련 암호화폐 이름 (없으면 None)
+        data (dict): 이벤트 내용 (transaction은 거래 기록 항목 그대로)
+        message (str): 추가 설명 (없으면 None)
+    """
+    seq: int
+    level: int
+    kind: str
+    backtest_id: str
+    date: datetime
+    crypto_name: Optional[str]
+    data: Optional[dict]
+    message: Optional[str]
+
+
+class TraceBuffer:
+    """고정 크기 링 버퍼에 구조화된 추적 이벤트를 기록하는 디버그 추적기입니다.
+
+    이벤트는 미리 할당한 슬롯에 튜플 하나로 기록되며, 문자열 변환이나 출력은 render/dump를 호출할 때만 합니다.
+    버퍼가 가득 차면 가장 오래된 이벤트부터 덮어쓰므로 메모리 사용량이 일정하고, 실행 속도에 거의 영향이 없어
+    긴 실행에서도 추적을 켜 둘 수 있습니다. transaction 이벤트는 거래 기록 dict를 복사하지 않고 참조하므로
+    지연 평가된 asset_value 등은 평가가 끝난 뒤의 값으로 출력됩니다.
+
+    Attributes:
+        capacity (int): 보관할 최대 이벤트 수
+        level (int): 기록할 최소 추적 수준
+        recorded (int): 지금까지 기록된 이벤트 수 (덮어써진 이벤트 포함)
+
+    Example:
+        >>> trace = TraceBuffer(capacity=100_000, level='debug')
+        >>> backtest = Backtest('test', datetime(2024, 1, 1), trace=trace)
+        >>> ...
+        >>> print(trace.render(crypto_name='KRW-BTC', start=datetime(2024, 3, 1)))
+        >>> trace.dump('trace.jsonl', level='warning')
+    """
+
+    def __init__(self, capacity: int = 65536, level: Union[str, int] = 'info'):
+        """
+        Args:
+            capacity: 보관할 최대 이벤트 수 (기본값: 65536)
+            level: 기록할 최소 추적 수준 ('debug', 'info', 'warning', 'error' 또는 정수, 기본값: 'info')
+
+        Raises:
+            ValueError: capacity가 1보다 작거나 알 수 없는 level인 경우
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.level = _level(level)
+        self.recorded = 0
+        self._events = [None] * capacity
+
+    def __len__(self) -> int:
+        return min(self.recorded, self.capacity)
+
+    @property
+    def dropped(self) -> int:
+        """버퍼가 가득 차 덮어써진 이벤트 수"""
+        return max(self.recorded - self.capacity, 0)
+
+    def enabled(self, level: int) -> bool:
+        """level 이벤트를 기록하는지 여부 (이벤트 내용을 만드는 비용이 클 때 먼저 확인)"""
+        return level >= self.level
+
+    def emit(self, level: int, kind: str, backtest_id: str, date: datetime, crypto_name: Optional[str] = None,
+             data: Optional[dict] = None, message: Optional[str] = None):
+        """이벤트 한 건을 기록합니다. level이 기록 수준보다 낮으면 아무것도 하지 않습니다."""
+        if level < self.level:
+            return
+        seq = self.recorded
+        self._events[seq % self.capacity] = (seq, level, kind, backtest_id, date, crypto_name, data, message)
+        self.recorded = seq + 1
+
+    def clear(self):
+        """버퍼를 비웁니다."""
+        self._events = [None] * self.capacity
+        self.recorded = 0
+
+    def events(self, level: Union[str, int, None] = None, kind: Union[str, Iterable[str], None] = None,
+               crypto_name: Optional[str] = None, backtest_id: Optional[str] = None,
+               start: Optional[datetime] = None, end: Optional[datetime] = None) -> list[TraceEvent]:
+        """버퍼에 남아 있는 이벤트를 기록 순서대로 조건에 맞게 골라 반환합니다.
+
+        Args:
+            level: 이 수준 이상의 이벤트만 (기본값: 전체)
+            kind: 이벤트 종류 또는 목록 (기본값: 전체)
+            crypto_name: 암호화폐 이름 (기본값: 전체)
+            backtest_id: 백테스트 ID (기본값: 전체, 여러 Backtest가 버퍼를 공유할 때)
+            start: 이 시간 이후의 이벤트만 (포함)
+            end: 이 시간 이전의 이벤트만 (포함)
+
+        Returns:
+            list[TraceEvent]: 이벤트 목록
+        """
+        minimum = _level(level) if level is not None else None
+        kinds = {kind} if isinstance(kind, str) else set(kind) if kind is not None else None
+        first = self.recorded % self.capacity if self.recorded > self.capacity else 0
+        slots = self._events[first:] + self._events[:first] if first else self._events[:len(self)]
+        selected = []
+        for slot in slots:
+            if slot is None:
+                continue
+            event = TraceEvent(*slot)
+            if minimum is not None and event.level < minimum:
+                continue
+            if kinds is not None and event.kind not in kinds:
+                continue
+            if crypto_name is not None and event.crypto_name != crypto_name:
+                continue
+            if backtest_id is not None and event.backtest_id != backtest_id:
+                continue
+            if start is not None and event.date < start:
+                continue
+            if end is not None and event.date > end:
+                continue
+            selected.append(event)
+        return selected
+
+    def render(self, **filters) -> str:
+        """조건에 맞는 이벤트를 한 줄씩 사람이 읽을 수 있는 텍스트로 만듭니다. 조건은 events()와 같습니다."""
+        return '\n'.join(format_event(event) for event in self.events(**filters))
+
+    def dump(self, path: Union[str, os.PathLike], format: str = 'text', **filters) -> int:
+        """조건에 맞는 이벤트를 파일로 저장합니다. 조건은 events()와 같습니다.
+
+        Args:
+            path: 저장할 파일 경로
+            format: 'text'(render와 같은 줄) 또는 'jsonl'(이벤트마다 JSON 한 줄)
+
+        Returns:
+            int: 저장한 이벤트 수
+
+        Raises:
+            ValueError: 알 수 없는 format인 경우
+        """
+        if format not in ('text', 'jsonl'):
+            raise ValueError(f"Unknown trace dump format: {format}")
+        events = self.events(**filters)
+        with open(Path(path), 'w', encoding='utf-8') as f:
+            for event in events:
+                if format == 'text':
+                    f.write(format_event(event) + '\n')
+                else:
+                    record = event._asdict()
+                    record['level'] = _LEVEL_NAMES.get(event.level, str(event.level))
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        return len(events)
+
+
+def format_event(event: TraceEvent) -> str:
+    """이벤트 한 건을 텍스트 한 줄로 만듭니다."""
+    head = f"#{event.seq} {event.date} {_LEVEL_NAMES.get(event.level, event.level):<7} {event.backtest_id}"
+    data = event.data or {}
+    if event.kind == 'transaction':
+        transaction_type = data['transaction_type']
+        label = _TRANSACTION_LABELS.get(transaction_type, transaction_type)
+        if transaction_type in ('Buy', 'Sell'):
+            body = (f"{label} {data['crypto_name']} 가격 {data['price']:,.0f} KRW 수량 {data['quantity']:.8f} "
+                    f"금액 {data['total_amount']:,.0f} KRW 수수료 {data['fee_type']} {data['fee_amount']}")
+        else:
+            body = f"{label} {data['total_amount']:,.0f} KRW"
+        body += f" | 현금 {data['cash_balance']:,.0f} KRW"
+        if data['asset_value'] is None:
+            body += " 자산 지연 평가"
+        else:
+            body += (f" 자산 {data['asset_value']:,.0f} KRW 총 {data['total_value']:,.0f} KRW "
+                     f"수익률 {data['return_rate']:.2%}")
+    elif event.kind in ('valuation', 'mark'):
+        body = f"{event.kind} 자산 {data['asset_value']:,.0f} KRW 총 {data['total_value']:,.0f} KRW"
+    else:
+        body = event.kind + (f" {event.crypto_name}" if event.crypto_name is not None else '')
+    if event.message is not None:
+        body += f" ({event.message})"
+    return f"{head} {body}"
+
+
+def _level(level: Union[str, int]) -> int:
+    if isinstance(level, int):
+        return level
+    if level.lower() not in LEVELS:
+        raise ValueError(f"Unknown trace level: {level}")
+    return LEVELS[level.lower()]
@@ -0,0 +1,499 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, Union
+import json
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+
+# Backtest.transaction_log 항목과 같은 순서의 필드
+FIELDS = (
+    'date', 'crypto_name', 'price', 'quantity', 'total_amount', 'fee_type', 'fee_amount',
+    'transaction_type', 'cash_balance', 'asset_value', 'total_value', 'return_rate',
+)
+CATEGORY_FIELDS = ('crypto_name', 'fee_type', 'transaction_type')
+FLOAT_FIELDS = tuple(field for field in FIELDS if field not in CATEGORY_FIELDS and field != 'date')
+# SpillLog 세그먼트 파일의 행 형식 (FIELDS 순서, 정렬 여백 없는 고정 길이 레코드)
+RECORD_DTYPE = np.dtype([
+    (field, '<i8' if field == 'date' else '<i4' if field in CATEGORY_FIELDS else '<f8') for field in FIELDS
+])
+
+
+class TransactionLog:
+    """필드별 배열에 거래 기록을 저장하는 열 기반 거래 기록입니다.
+
+    거래 한 건마다 dict를 보관하는 대신 필드별로 늘어나는 배열에 값을 저장합니다.
+    date는 int64(마이크로초), crypto_name/fee_type/transaction_type은 범주 코드(int32),
+    나머지는 float64로 저장하며 값이 없는 항목(None)은 코드 -1 또는 NaN으로 표시합니다.
+    기존 list와 같이 append/len/인덱싱/반복을 지원하며, 항목은 dict로 돌려줍니다.
+
+    Example:
+        >>> log = TransactionLog()
+        >>> log.append({'date': datetime(2024, 1, 1), 'crypto_name': 'KRW-BTC', ...})
+        >>> df = log.to_pandas()
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: 처음 확보할 행 수 (가득 차면 두 배로 늘어남)
+        """
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        self._dates = np.empty(self._capacity, dtype=np.int64)
+        self._floats = {field: np.empty(self._capacity, dtype=np.float64) for field in FLOAT_FIELDS}
+        self._codes = {field: np.empty(self._capacity, dtype=np.int32) for field in CATEGORY_FIELDS}
+        self._categories = {field: [] for field in CATEGORY_FIELDS}
+        self._category_index = {field: {} for field in CATEGORY_FIELDS}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(self._size):
+            yield self._record(i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[dict, list]:
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("transaction log index out of range")
+        return self._record(index)
+
+    @property
+    def nbytes(self) -> int:
+        """기록 저장에 사용 중인 배열 메모리 (바이트)"""
+        return (self._dates.nbytes + sum(a.nbytes for a in self._floats.values())
+                + sum(a.nbytes for a in self._codes.values()))
+
+    def append(self, record: dict) -> int:
+        """거래 기록 한 건을 추가합니다.
+
+        Args:
+            record: Backtest.transaction_log 항목과 같은 키를 가진 dict
+
+        Returns:
+            int: 추가된 기록의 인덱스
+        """
+        if self._size == self._capacity:
+            self._grow()
+        i = self._size
+        self._dates[i] = _to_micros(record['date'])
+        for field in CATEGORY_FIELDS:
+            self._codes[field][i] = self._encode(field, record.get(field))
+        for field in FLOAT_FIELDS:
+            value = record.get(field)
+            self._floats[field][i] = np.nan if value is None else value
+        self._size += 1
+        return i
+
+    def update(self, index: int, values: dict):
+        """이미 추가된 기록의 float 필드 값을 바꿉니다 (예: 지연 평가된 asset_value).
+
+        Args:
+            index: 기록 인덱스
+            values: {필드 이름: 값}
+        """
+        for field, value in values.items():
+            self._floats[field][index] = np.nan if value is None else value
+
+    def column(self, field: str) -> np.ndarray:
+        """필드의 배열을 복사 없이 반환합니다.
+
+        date는 datetime64[us], 범주 필드는 범주 코드(int32, 없음은 -1), 나머지는 float64 배열입니다.
+        """
+        if field == 'date':
+            return self._dates[:self._size].view('datetime64[us]')
+        if field in CATEGORY_FIELDS:
+            return self._codes[field][:self._size]
+        return self._floats[field][:self._size]
+
+    def categories(self, field: str) -> list:
+        """범주 필드의 코드 순서대로 정렬된 값 목록"""
+        return list(self._categories[field])
+
+    def to_pandas(self) -> pd.DataFrame:
+        """행별 파이썬 객체를 만들지 않고 배열에서 바로 DataFrame을 만듭니다.
+
+        범주 필드는 pd.Categorical로, date는 datetime64[us]로 변환됩니다.
+        숫자/시간 열은 기록 배열을 공유하므로, 독립된 사본이 필요하면 .copy()를 사용합니다.
+        """
+        data = {}
+        for field in FIELDS:
+            if field in CATEGORY_FIELDS:
+                data[field] = pd.Categorical.from_codes(self.column(field), categories=self._categories[field])
+            else:
+                data[field] = self.column(field)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """배열에서 바로 pyarrow.Table을 만듭니다. 범주 필드는 dictionary 타입으로 변환됩니다.
+
+        Raises:
+            ImportError: pyarrow가 설치되어 있지 않은 경우
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("to_arrow requires pyarrow (pip install pyarrow)")
+        arrays = {}
+        for field in FIELDS:
+            if field == 'date':
+                arrays[field] = pa.array(self.column(field), type=pa.timestamp('us'))
+            elif field in CATEGORY_FIELDS:
+                codes = self.column(field)
+                arrays[field] = pa.DictionaryArray.from_arrays(
+                    pa.array(codes, mask=codes < 0), pa.array(self._categories[field], type=pa.string()))
+            else:
+                arrays[field] = pa.array(self.column(field))
+        return pa.table(arrays)
+
+    def _encode(self, field: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self._category_index[field]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self._categories[field])
+            self._categories[field].append(value)
+        return code
+
+    def _record(self, i: int) -> dict:
+        record = {}
+        for field in FIELDS:
+            if field == 'date':
+                record[field] = self._dates[i].astype('datetime64[us]').item()
+            elif field in CATEGORY_FIELDS:
+                code = self._codes[field][i]
+                record[field] = self._categories[field][code] if code >= 0 else None
+            else:
+                value = self._floats[field][i]
+                record[field] = None if np.isnan(value) else float(value)
+        return record
+
+    def _grow(self):
+        self._capacity *= 2
+        self._dates = np.resize(self._dates, self._capacity)
+        self._floats = {field: np.resize(a, self._capacity) for field, a in self._floats.items()}
+        self._codes = {field: np.resize(a, self._capacity) for field, a in self._codes.items()}
+
+
+class SpillLog:
+    """메모리에는 최근 거래 기록만 두고 오래된 기록은 디스크 세그먼트 파일로 내보내는 거래 기록입니다.
+
+    기록은 RECORD_DTYPE 형식의 고정 길이 레코드로 메모리의 꼬리 버퍼(tail_size행)에 쌓이고,
+    버퍼가 가득 차면 통째로 세그먼트 파일(segment_00000.bin, ...) 끝에 덧붙여집니다. 세그먼트는 segment_rows행마다
+    새 파일로 나뉘며, np.memmap으로 읽으므로 거래 수와 관계없이 메모리 사용량이 일정합니다.
+    범주 코드(crypto_name 등)와 형식 정보는 meta.json에 저장되어 SpillLog.open으로 다시 읽을 수 있습니다.
+
+    TransactionLog와 같이 append/update/len/인덱싱/반복을 지원하며, iter_frames/filter는 세그먼트를
+    chunk_rows행씩 읽으면서 crypto_name/기간 조건을 배열 연산으로 걸러 필요한 행만 돌려줍니다.
+
+    Example:
+        >>> log = SpillLog('runs/long_run', tail_size=100_000)
+        >>> backtest = Backtest('long_run', datetime(2020, 1, 1), log_type='spill', spill_log=log)
+        >>> for frame in log.iter_frames(crypto_name='KRW-BTC', start=datetime(2023, 1, 1)):
+        ...     print(frame['quantity'].sum())
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike, None] = None, tail_size: int = 100_000,
+                 segment_rows: int = 10_000_000):
+        """
+        Args:
+            directory: 세그먼트 파일을 저장할 디렉터리 (기본값: 임시 디렉터리, 기록 객체가 사라질 때 삭제)
+            tail_size: 메모리에 둘 최근 기록 수 (가득 차면 디스크로 내보냄)
+            segment_rows: 세그먼트 파일 하나의 최대 행 수
+
+        Raises:
+            ValueError: tail_size나 segment_rows가 1보다 작거나, directory에 이미 세그먼트가 있는 경우
+        """
+        if tail_size < 1 or segment_rows < 1:
+            raise ValueError("tail_size and segment_rows must be at least 1")
+        if directory is None:
+            self.directory = Path(tempfile.mkdtemp(prefix='spill_log_'))
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, True)
+        else:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if any(self.directory.glob('segment_*.bin')):
+                raise ValueError(f"{self.directory} already has a spill log; read it with SpillLog.open()")
+            self._cleanup = None
+        self._init_state(tail_size, segment_rows, {field: [] for field in CATEGORY_FIELDS}, 0)
+
+    @classmethod
+    def open(cls, directory: Union[str, os.PathLike], tail_size: int = 100_000) -> 'SpillLog':
+        """close()로 닫은 SpillLog 디렉터리를 다시 엽니다. 이어서 append할 수도 있습니다.
+
+        Raises:
+            ValueError: meta.json이 없거나 형식이 다른 경우
+        """
+        directory = Path(directory)
+        meta_path = directory / 'meta.json'
+        if not meta_path.exists():
+            raise ValueError(f"No spill log in {directory}")
+        meta = json.loads(meta_path.read_text())
+        if meta['fields'] != list(FIELDS):
+            raise ValueError(f"Unsupported spill log format in {directory}")
+        spilled = sum(os.path.getsize(path) for path in directory.glob('segment_*.bin')) // RECORD_DTYPE.itemsize
+        log = cls.__new__(cls)
+        log.directory = directory
+        log._cleanup = None
+        log._init_state(tail_size, meta['segment_rows'], meta['categories'], spilled)
+        return log
+
+    def _init_state(self, tail_size: int, segment_rows: int, categories: dict, spilled: int):
+        self.tail_size = tail_size
+        self.segment_rows = segment_rows
+        self._tail = np.empty(tail_size, dtype=RECORD_DTYPE)
+        self._tail_rows = 0
+        # 디스크로 내보낸 행 수 (꼬리 버퍼 첫 행의 인덱스)
+        self._spilled = spilled
+        self._file = None
+        self._file_segment = None
+        self._writable = None
+        self._categories = {field: list(categories[field]) for field in CATEGORY_FIELDS}
+        self._category_index = {field: {value: code for code, value in enumerate(values)}
+                                for field, values in self._categories.items()}
+
+    def __len__(self) -> int:
+        return self._spilled + self._tail_rows
+
+    def __iter__(self) -> Iterator[dict]:
+        for chunk in self._chunks():
+            for row in chunk:
+                yield self._record(row)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[dict, list]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return [self._record(row) for chunk in self._chunks(start, stop) for row in chunk]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction log index out of range")
+        if index >= self._spilled:
+            return self._record(self._tail[index - self._spilled])
+        segment, offset = divmod(index, self.segment_rows)
+        return self._record(self._segment(segment)[offset])
+
+    @property
+    def nbytes(self) -> int:
+        """메모리에 둔 꼬리 버퍼 크기 (바이트, 거래 수와 관계없이 일정)"""
+        return self._tail.nbytes
+
+    @property
+    def spilled(self) -> int:
+        """디스크로 내보낸 기록 수"""
+        return self._spilled
+
+    def append(self, record: dict) -> int:
+        """거래 기록 한 건을 추가합니다. 꼬리 버퍼가 가득 차면 먼저 디스크로 내보냅니다.
+
+        Returns:
+            int: 추가된 기록의 인덱스
+        """
+        if self._tail_rows == self.tail_size:
+            self._spill()
+        row = self._tail[self._tail_rows]
+        row['date'] = _to_micros(record['date'])
+        for field in CATEGORY_FIELDS:
+            row[field] = self._encode(field, record.get(field))
+        for field in FLOAT_FIELDS:
+            value = record.get(field)
+            row[field] = np.nan if value is None else value
+        self._tail_rows += 1
+        return len(self) - 1
+
+    def update(self, index: int, values: dict):
+        """기록의 float 필드 값을 바꿉니다. 이미 내보낸 기록은 세그먼트 파일의 해당 행을 직접 고칩니다.
+
+        Args:
+            index: 기록 인덱스
+            values: {필드 이름: 값}
+        """
+        if index >= self._spilled:
+            row = self._tail[index - self._spilled]
+        else:
+            segment, offset = divmod(index, self.segment_rows)
+            row = self._writable_segment(segment)[offset]
+        for field, value in values.items():
+            row[field] = np.nan if value is None else value
+
+    def column(self, field: str) -> np.ndarray:
+        """필드 전체를 한 배열로 읽습니다 (TransactionLog.column과 같은 형식의 사본, 행 수만큼 메모리 사용)."""
+        data = np.concatenate([chunk[field] for chunk in self._chunks()]) if len(self) else np.empty(
+            0, dtype=RECORD_DTYPE[field])
+        if field == 'date':
+            return data.view('datetime64[us]')
+        return data
+
+    def categories(self, field: str) -> list:
+        """범주 필드의 코드 순서대로 정렬된 값 목록"""
+        return list(self._categories[field])
+
+    def iter_frames(self, crypto_name: Union[str, list, None] = None, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+        """기록을 chunk_rows행씩 읽어 조건에 맞는 행만 DataFrame으로 돌려줍니다.
+
+        Args:
+            crypto_name: 암호화폐 이름 또는 목록 (기본값: 전체)
+            start: 이 시간 이후의 기록만 (포함, 기본값: 처음부터)
+            end: 이 시간 이전의 기록만 (포함, 기본값: 끝까지)
+            chunk_rows: 한 번에 읽을 행 수 (메모리 사용량 상한)
+
+        Yields:
+            pd.DataFrame: TransactionLog.to_pandas와 같은 열의 DataFrame (조건에 맞는 행이 없는 chunk는 건너뜀)
+        """
+        for rows in self._filtered(crypto_name, start, end, chunk_rows):
+            yield self._frame(rows)
+
+    def filter(self, crypto_name: Union[str, list, None] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, chunk_rows: int = 1_000_000) -> Iterator[dict]:
+        """iter_frames와 같은 조건으로 걸러낸 기록을 dict로 하나씩 돌려줍니다."""
+        for rows in self._filtered(crypto_name, start, end, chunk_rows):
+            for row in rows:
+                yield self._record(row)
+
+    def to_pandas(self, crypto_name: Union[str, list, None] = None, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> pd.DataFrame:
+        """조건에 맞는 기록을 한 DataFrame으로 모읍니다 (맞는 행만 메모리에 올림)."""
+        frames = list(self.iter_frames(crypto_name, start, end))
+        if not frames:
+            return self._frame(np.empty(0, dtype=RECORD_DTYPE))
+        return pd.concat(frames, ignore_index=True)
+
+    def flush(self):
+        """꼬리 버퍼의 기록을 모두 디스크로 내보내고 meta.json을 갱신합니다."""
+        if self._tail_rows:
+            self._spill()
+        else:
+            self._write_meta()
+
+    def close(self):
+        """꼬리 버퍼를 내보내고 세그먼트 파일을 닫습니다. 닫은 뒤에도 읽기와 append가 가능합니다."""
+        self.flush()
+        self._writable = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _spill(self):
+        rows = self._tail[:self._tail_rows]
+        written = 0
+        while written < len(rows):
+            segment, offset = divmod(self._spilled, self.segment_rows)
+            if self._file is None or self._file_segment != segment:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self._segment_path(segment), 'ab')
+                self._file_segment = segment
+            count = min(len(rows) - written, self.segment_rows - offset)
+            self._file.write(rows[written:written + count].tobytes())
+            written += count
+            self._spilled += count
+        self._file.flush()
+        self._tail_rows = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {'fields': list(FIELDS), 'segment_rows': self.segment_rows, 'categories': self._categories}
+        path = self.directory / 'meta.json'
+        temp = path.with_suffix('.tmp')
+        temp.write_text(json.dumps(meta, ensure_ascii=False))
+        os.replace(temp, path)
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"segment_{segment:05d}.bin"
+
+    def _segment(self, segment: int) -> np.ndarray:
+        rows = min(self.segment_rows, self._spilled - segment * self.segment_rows)
+        return np.memmap(self._segment_path(segment), dtype=RECORD_DTYPE, mode='r', shape=(rows,))
+
+    def _writable_segment(self, segment: int) -> np.ndarray:
+        # 지연 평가는 연속된 기록을 고치므로 마지막으로 연 세그먼트를 재사용
+        rows = min(self.segment_rows, self._spilled - segment * self.segment_rows)
+        if self._writable is None or self._writable[0] != segment or len(self._writable[1]) < rows:
+            self._writable = (segment, np.memmap(self._segment_path(segment), dtype=RECORD_DTYPE,
+                                                 mode='r+', shape=(rows,)))
+        return self._writable[1]
+
+    def _chunks(self, start: int = 0, stop: Optional[int] = None,
+                chunk_rows: int = 1_000_000) -> Iterator[np.ndarray]:
+        # [start, stop) 구간을 세그먼트 memmap과 꼬리 버퍼에서 chunk_rows행 이하의 배열로 나눠 읽음
+        stop = len(self) if stop is None else stop
+        position = start
+        while position < min(stop, self._spilled):
+            segment, offset = divmod(position, self.segment_rows)
+            rows = self._segment(segment)
+            count = min(chunk_rows, len(rows) - offset, stop - position)
+            yield rows[offset:offset + count]
+            position += count
+        if position < stop:
+            yield self._tail[position - self._spilled:stop - self._spilled]
+
+    def _filtered(self, crypto_name: Union[str, list, None], start: Optional[datetime], end: Optional[datetime],
+                  chunk_rows: int) -> Iterator[np.ndarray]:
+        # chunk마다 조건을 배열 연산으로 걸러 맞는 행이 있는 배열만 돌려줌
+        codes = None
+        if crypto_name is not None:
+            names = [crypto_name] if isinstance(crypto_name, str) else crypto_name
+            index = self._category_index['crypto_name']
+            codes = np.array([index[name] for name in names if name in index], dtype=np.int32)
+            if not len(codes):
+                return
+        start_us = _to_micros(start) if start is not None else None
+        end_us = _to_micros(end) if end is not None else None
+        for chunk in self._chunks(chunk_rows=chunk_rows):
+            mask = np.ones(len(chunk), dtype=bool)
+            if codes is not None:
+                mask &= np.isin(chunk['crypto_name'], codes)
+            if start_us is not None:
+                mask &= chunk['date'] >= start_us
+            if end_us is not None:
+                mask &= chunk['date'] <= end_us
+            if mask.any():
+                yield chunk[mask]
+
+    def _frame(self, rows: np.ndarray) -> pd.DataFrame:
+        data = {}
+        for field in FIELDS:
+            if field == 'date':
+                data[field] = rows['date'].view('datetime64[us]')
+            elif field in CATEGORY_FIELDS:
+                data[field] = pd.Categorical.from_codes(rows[field], categories=self._categories[field])
+            else:
+                data[field] = rows[field]
+        return pd.DataFrame(data)
+
+    def _encode(self, field: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self._category_index[field]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self._categories[field])
+            self._categories[field].append(value)
+        return code
+
+    def _record(self, row) -> dict:
+        record = {}
+        for field in FIELDS:
+            value = row[field]
+            if field == 'date':
+                record[field] = value.astype('datetime64[us]').item()
+            elif field in CATEGORY_FIELDS:
+                record[field] = self._categories[field][value] if value >= 0 else None
+            else:
+                record[field] = None if np.isnan(value) else float(value)
+        return record
+
+
+def _to_micros(value: datetime) -> int:
+    return int(np.datetime64(value, 'us').astype(np.int64))
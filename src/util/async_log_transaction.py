@@ -0,0 +1,125 @@
+from typing import Optional
+import asyncio
+from sqlalchemy import insert
+from .log_transaction import transaction_row
+from .table_transaction_id_log import Transaction
+from profiler import profile_count, profile_phase
+
+
+class AsyncTransactionWriter:
+    """거래 기록을 버퍼에 모았다가 백그라운드 태스크에서 비동기 엔진으로 일괄 저장하는 기록기입니다.
+
+    add()는 버퍼에 행을 추가만 하므로 이벤트 루프를 막지 않습니다. 백그라운드 태스크는
+    버퍼가 batch_size에 도달하거나 flush_interval(초)이 지나면 다중 행 INSERT로 저장합니다.
+    저장에 실패하거나 저장 중 취소된 행은 버퍼에 남겨 두었다가 다음 저장 때 다시 시도합니다.
+    인터프리터 종료 시 자동 저장은 하지 않으므로 close() 또는 async with 블록을 사용해야 합니다.
+
+    Attributes:
+        batch_size (int): 저장이 일어나는 버퍼 행 수
+        flush_interval (float): 백그라운드 태스크가 저장하는 최대 대기 시간 (초)
+        written (int): 지금까지 db에 저장된 행 수
+
+    Example:
+        >>> async with AsyncTransactionWriter(batch_size=500) as writer:
+        ...     writer.add(backtest_id='test', transaction_time=datetime.now(), crypto_name='KRW-BTC', ...)
+    """
+
+    def __init__(self, batch_size: int = 1000, flush_interval: float = 5.0):
+        """
+        Args:
+            batch_size: 저장이 일어나는 버퍼 행 수 (기본값: 1000)
+            flush_interval: 백그라운드 태스크가 저장하는 최대 대기 시간 (초, 기본값: 5.0)
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._rows = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._closing = False
+
+    @property
+    def pending(self) -> int:
+        """아직 db에 저장되지 않은 행 수"""
+        return len(self._rows)
+
+    def add(self, **transaction):
+        """거래 기록 한 건을 버퍼에 추가합니다. 인자는 log_transaction과 같습니다.
+
+        이벤트 루프 안에서 처음 호출할 때 백그라운드 저장 태스크를 시작합니다.
+        """
+        self._rows.append(transaction_row(**transaction))
+        self._ensure_task()
+        if len(self._rows) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """버퍼의 행을 한 번의 트랜잭션으로 저장합니다.
+
+        Returns:
+            int: 저장된 행 수 (실패한 경우 0)
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._rows:
+                return 0
+            from .db_engine import get_async_engine
+            rows, self._rows = self._rows, []
+            profile_count('db_writes')
+            try:
+                with profile_phase('db_write', f"{len(rows)} rows"):
+                    async with get_async_engine().begin() as conn:
+                        await conn.execute(insert(Transaction), rows)
+            except Exception as e:
+                print(f"거래 기록 저장 중 오류 발생: {e}")
+                # 다음 저장 때 다시 시도
+                self._rows = rows + self._rows
+                return 0
+            except BaseException:
+                # 저장 중 취소(CancelledError)되어도 행을 잃지 않도록 버퍼에 되돌림
+                self._rows = rows + self._rows
+                raise
+            self.written += len(rows)
+            profile_count('db_write_rows', len(rows))
+            return len(rows)
+
+    async def close(self):
+        """백그라운드 태스크를 멈추고 남은 행을 저장합니다.
+
+        태스크를 취소하지 않고 멈추라고 알린 뒤 진행 중인 저장이 끝나기를 기다립니다.
+        """
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            try:
+                await self._task
+            finally:
+                self._task = None
+                self._closing = False
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._closing:
+                # 남은 행은 close()가 저장
+                return
+            self._wakeup.clear()
+            await self.flush()
@@ -1,24 +1,168 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from typing import Optional
 import os
-# 개발 환경에서는 dotenv 사용
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-    #print("개발 환경: .env 파일을 로드했습니다.")
-except ImportError:
-    print("Docker 환경: 환경변수를 직접 사용합니다.")
-
-# 환경변수 가져오기 (개발환경의 .env 파일 또는 Docker의 환경변수)
-try:
-    # os.environ.get() 대신 직접 접근
-    DB_USER = os.environ['POSTGRES_USER']
-    DB_PASSWORD = os.environ['POSTGRES_PASSWORD']
-    DB_NAME = os.environ['POSTGRES_DB']
-    DB_HOST = os.environ['DB_HOST']
-    DB_PORT = os.environ['DB_PORT']
-except KeyError as e:
-    print(f"환경변수 오류: {e}")
-    raise ValueError(f"필수 환경변수가 설정되지 않았습니다: {e}")
-
-# 데이터베이스 엔진 생성
-engine = create_engine(f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
\ No newline at end of file
+import threading
+
+# 동기 드라이버 이름 -> 비동기 드라이버 이름
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+_lock = threading.Lock()
+_env_loaded = False
+_database_url: Optional[str] = None
+_engine_options: dict = {}
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+_async_engine = None
+
+
+def _load_env():
+    """개발 환경에서는 .env 파일을 한 번만 로드합니다."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+        #print("개발 환경: .env 파일을 로드했습니다.")
+    except ImportError:
+        print("Docker 환경: 환경변수를 직접 사용합니다.")
+
+
+def get_database_url() -> str:
+    """접속할 데이터베이스 주소를 반환합니다.
+
+    configure_engine()으로 지정한 주소, 환경변수 DATABASE_URL(예: sqlite:///bench.sqlite),
+    POSTGRES_USER/POSTGRES_PASSWORD/POSTGRES_DB/DB_HOST/DB_PORT 순으로 사용합니다.
+
+    Raises:
+        ValueError: 필수 환경변수가 설정되지 않은 경우
+    """
+    if _database_url is not None:
+        return _database_url
+    _load_env()
+    if 'DATABASE_URL' in os.environ:
+        return os.environ['DATABASE_URL']
+    # 환경변수 가져오기 (개발환경의 .env 파일 또는 Docker의 환경변수)
+    try:
+        # os.environ.get() 대신 직접 접근
+        DB_USER = os.environ['POSTGRES_USER']
+        DB_PASSWORD = os.environ['POSTGRES_PASSWORD']
+        DB_NAME = os.environ['POSTGRES_DB']
+        DB_HOST = os.environ['DB_HOST']
+        DB_PORT = os.environ['DB_PORT']
+    except KeyError as e:
+        print(f"환경변수 오류: {e}")
+        raise ValueError(f"필수 환경변수가 설정되지 않았습니다: {e}")
+    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def pool_options(url: str) -> dict:
+    """연결 풀 설정을 반환합니다. 환경변수로 바꿀 수 있습니다.
+
+    - DB_POOL_SIZE: 유지할 연결 수 (기본값: 5)
+    - DB_MAX_OVERFLOW: 풀이 가득 찼을 때 추가로 열 수 있는 연결 수 (기본값: 10)
+    - DB_POOL_TIMEOUT: 연결을 기다리는 최대 시간 (초, 기본값: 30)
+    - DB_POOL_RECYCLE: 연결을 다시 만드는 주기 (초, 기본값: 1800)
+    - DB_POOL_PRE_PING: 연결을 꺼낼 때 살아 있는지 확인할지 여부 (기본값: 1)
+
+    sqlite는 파일 잠금으로 동시성을 처리하므로 pre_ping만 적용합니다.
+    """
+    options = {'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no')}
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            pool_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        )
+    return options
+
+
+def configure_engine(url: Optional[str] = None, **engine_options):
+    """엔진 설정을 바꿉니다. 기존 엔진은 닫고 다음 get_engine() 호출 때 새 설정으로 생성합니다.
+
+    Args:
+        url: 데이터베이스 주소 (None이면 환경변수 사용, 예: 'sqlite:///local.sqlite')
+        **engine_options: create_engine에 넘길 추가 인자 (pool_options()보다 우선)
+    """
+    global _database_url, _engine_options
+    with _lock:
+        _database_url = url
+        _engine_options = dict(engine_options)
+    dispose_engine()
+
+
+def get_engine() -> Engine:
+    """데이터베이스 엔진을 반환합니다. 처음 호출할 때 연결 풀 설정과 함께 생성합니다.
+
+    엔진은 스레드 간에 공유하며, fork된 자식 프로세스에서는 부모의 연결을 쓰지 않도록 새로 만듭니다.
+
+    Raises:
+        ValueError: 필수 환경변수가 설정되지 않은 경우
+    """
+    global _engine, _engine_pid
+    engine = _engine
+    if engine is not None and _engine_pid == os.getpid():
+        return engine
+    with _lock:
+        if _engine is None or _engine_pid != os.getpid():
+            url = get_database_url()
+            # 데이터베이스 엔진 생성
+            _engine = create_engine(url, **{**pool_options(url), **_engine_options})
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def get_async_engine():
+    """비동기 데이터베이스 엔진을 반환합니다. 처음 호출할 때 get_database_url()의 드라이버를 비동기 드라이버로 바꿔 생성합니다.
+
+    ASYNC_DATABASE_URL 환경변수가 있으면 그 주소를 그대로 사용합니다.
+    postgresql은 asyncpg, sqlite는 aiosqlite 패키지가 필요합니다.
+    """
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url = make_url(os.environ.get('ASYNC_DATABASE_URL') or get_database_url())
+        url = url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+        _async_engine = create_async_engine(url, **{**pool_options(url.render_as_string(False)), **_engine_options})
+    return _async_engine
+
+
+def dispose_engine():
+    """엔진의 연결 풀을 닫고 다음 호출 때 새로 생성하도록 합니다."""
+    global _engine, _async_engine
+    with _lock:
+        if _engine is not None and _engine_pid == os.getpid():
+            _engine.dispose()
+        _engine = None
+        # 비동기 엔진은 이벤트 루프 안에서만 닫을 수 있으므로 참조만 버림
+        _async_engine = None
+
+
+def _after_fork_in_child():
+    # 부모 프로세스의 연결을 닫지 않고 버림 (close=False), 자식은 필요할 때 새 연결을 만듦
+    global _engine, _async_engine, _lock
+    _lock = threading.Lock()
+    if _engine is not None:
+        _engine.dispose(close=False)
+    _engine = None
+    _async_engine = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def __getattr__(name: str):
+    # 기존 코드 호환: `from util.db_engine import engine`은 이 시점에 엔진을 생성
+    if name == 'engine':
+        return get_engine()
+    if name == 'DATABASE_URL':
+        return get_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
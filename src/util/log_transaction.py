@@ -1,8 +1,12 @@
-from typing import Literal, Optional
+from typing import Iterable, Literal, Optional
 from datetime import datetime
+import atexit
+import time
+import weakref
+from sqlalchemy import delete, func, insert, select
 from sqlalchemy.orm import Session
 from .table_transaction_id_log import Transaction
-from .db_engine import engine
+from profiler import profile_count, profile_phase
 
 def log_transaction(
     backtest_id: str,
@@ -22,8 +26,11 @@ def log_transaction(
     ):
     """백테스팅 거래 기록을 데이터베이스에 저장합니다."""
 
+    from .db_engine import get_engine
+    profile_count('db_writes')
+    profile_count('db_write_rows')
     try:
-        with Session(engine) as session:
+        with profile_phase('db_write', (backtest_id, transaction_time)), Session(get_engine()) as session:
             transaction = Transaction(
                 backtest_id=backtest_id,
                 transaction_time=transaction_time,
@@ -49,6 +56,232 @@ def log_transaction(
 
     except Exception as e:
         print(f"거래 기록 저장 중 오류 발생: {e}")
+
+
+def transaction_row(
+    backtest_id: str,
+    transaction_time: datetime,
+    crypto_name: str,
+    transaction_type: Literal['Buy', 'Sell', 'Deposit', 'Withdraw'],
+    price: float,
+    quantity: float,
+    total_amount: float,
+    cash_balance: float,
+    asset_value: float,
+    total_value: float,
+    return_rate: float,
+    market_name: Optional[str] = None,
+    fee_type: Optional[Literal['percent', 'fixed']] = None,
+    fee_amount: Optional[float] = None,
+    ) -> dict:
+    """log_transaction과 같은 인자로 일괄 INSERT에 사용할 행 dict를 만듭니다."""
+    return {
+        'backtest_id': backtest_id,
+        'transaction_time': transaction_time,
+        'crypto_name': crypto_name,
+        'market_name': market_name,
+        'fee_type': fee_type,
+        'fee_amount': fee_amount,
+        'transaction_type': transaction_type,
+        'price': price,
+        'quantity': quantity,
+        'total_amount': total_amount,
+        'cash_balance': cash_balance,
+        'asset_value': asset_value,
+        'total_value': total_value,
+        'return_rate': return_rate,
+        'created_at': datetime.now(),
+    }
+
+
+def count_transactions(backtest_id: str) -> int:
+    """db에 저장된 backtest_id의 거래 기록 수"""
+    from .db_engine import get_engine
+    with Session(get_engine()) as session:
+        return session.execute(
+            select(func.count()).select_from(Transaction).where(Transaction.backtest_id == backtest_id)
+        ).scalar_one()
+
+
+def trim_transactions(backtest_id: str, keep: int) -> int:
+    """backtest_id의 거래 기록을 저장 순서(id)대로 keep건만 남기고 이후 기록을 삭제합니다.
+
+    체크포인트 이후에 저장된 기록을 지워 이어서 실행할 때 같은 거래가 두 번 저장되지 않도록 합니다.
+
+    Returns:
+        int: 삭제된 행 수
+    """
+    from .db_engine import get_engine
+    with Session(get_engine()) as session:
+        ids = session.execute(
+            select(Transaction.id).where(Transaction.backtest_id == backtest_id)
+            .order_by(Transaction.id).offset(keep)
+        ).scalars().all()
+        if ids:
+            session.execute(delete(Transaction).where(Transaction.id.in_(ids)))
+            session.commit()
+    return len(ids)
+
+
+# 닫히지 않은 기록기 (인터프리터 종료 시 남은 행 저장). 약한 참조이므로 기록기의 수명을 늘리지 않음
+_open_writers = weakref.WeakSet()
+
+
+def _flush_open_writers():
+    for writer in list(_open_writers):
+        writer.flush()
+
+
+atexit.register(_flush_open_writers)
+
+
+class TransactionWriter:
+    """거래 기록을 버퍼에 모았다가 한 번에 db에 저장하는 write-behind 기록기입니다.
+
+    거래마다 세션을 열고 커밋하는 대신 행을 메모리에 모아 두고 다중 행 INSERT로 일괄 저장합니다.
+    버퍼가 batch_size에 도달하거나 마지막 저장 후 flush_interval(초)이 지나면 자동으로 저장하며,
+    flush()/close() 호출, with 블록 종료, 인터프리터 종료, 기록기가 가비지 컬렉션될 때에도 남은 행을 저장합니다.
+    저장에 실패한 행은 버퍼에 남겨 두었다가 다시 시도합니다. 연속으로 실패하면 자동 저장은
+    retry_backoff초부터 두 배씩(최대 max_backoff초) 늘어나는 간격을 두고 시도합니다.
+
+    Attributes:
+        batch_size (int): 자동 저장이 일어나는 버퍼 행 수
+        flush_interval (float): 자동 저장이 일어나는 최대 대기 시간 (초, None이면 사용 안 함)
+        written (int): 지금까지 db에 저장된 행 수
+        failures (int): 연속으로 실패한 저장 횟수 (저장에 성공하면 0)
+
+    Example:
+        >>> with TransactionWriter(batch_size=500) as writer:
+        ...     writer.add(backtest_id='test', transaction_time=datetime.now(), crypto_name='KRW-BTC',
+        ...                transaction_type='Buy', price=10000, quantity=1, total_amount=10005,
+        ...                cash_balance=0, asset_value=10000, total_value=10000, return_rate=0,
+        ...                market_name='upbit', fee_type='percent', fee_amount=0.0005)
+    """
+
+    def __init__(self, batch_size: int = 1000, flush_interval: Optional[float] = 5.0,
+                 retry_backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Args:
+            batch_size: 자동 저장이 일어나는 버퍼 행 수 (기본값: 1000)
+            flush_interval: 자동 저장이 일어나는 최대 대기 시간 (초, 기본값: 5.0)
+            retry_backoff: 저장 실패 후 자동 저장을 다시 시도하기까지의 첫 대기 시간 (초, 기본값: 1.0)
+            max_backoff: 자동 저장 재시도 대기 시간의 최댓값 (초, 기본값: 60.0)
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.written = 0
+        self.failures = 0
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self._retry_at = 0.0
+        _open_writers.add(self)
+
+    @property
+    def pending(self) -> int:
+        """아직 db에 저장되지 않은 행 수"""
+        return len(self._rows)
+
+    def add(
+        self,
+        backtest_id: str,
+        transaction_time: datetime,
+        crypto_name: str,
+        transaction_type: Literal['Buy', 'Sell', 'Deposit', 'Withdraw'],
+        price: float,
+        quantity: float,
+        total_amount: float,
+        cash_balance: float,
+        asset_value: float,
+        total_value: float,
+        return_rate: float,
+        market_name: Optional[str] = None,
+        fee_type: Optional[Literal['percent', 'fixed']] = None,
+        fee_amount: Optional[float] = None,
+        ):
+        """거래 기록 한 건을 버퍼에 추가합니다. 인자는 log_transaction과 같습니다."""
+        self._rows.append(transaction_row(
+            backtest_id, transaction_time, crypto_name, transaction_type, price, quantity, total_amount,
+            cash_balance, asset_value, total_value, return_rate, market_name, fee_type, fee_amount,
+        ))
+        if self._flush_due():
+            self.flush()
+
+    def add_many(self, rows: Iterable[dict]):
+        """여러 거래 기록을 버퍼에 추가합니다. 자동 저장 조건은 모두 추가한 뒤 한 번만 확인하므로
+        함께 추가한 행은 같은 INSERT로 저장됩니다.
+
+        Args:
+            rows: add의 인자 dict 목록
+        """
+        for row in rows:
+            self._rows.append(transaction_row(**row))
+        if self._flush_due():
+            self.flush()
+
+    def _flush_due(self) -> bool:
+        """자동 저장 조건 (저장 실패 후 재시도 대기 중이면 False)"""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        return len(self._rows) >= self.batch_size or (
+            self.flush_interval is not None and now - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self) -> int:
+        """버퍼의 행을 한 번의 트랜잭션으로 저장합니다. 재시도 대기 중이어도 바로 시도합니다.
+
+        Returns:
+            int: 저장된 행 수 (실패한 경우 0)
+        """
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return 0
+        from .db_engine import get_engine
+        rows, self._rows = self._rows, []
+        profile_count('db_writes')
+        try:
+            with profile_phase('db_write', f"{len(rows)} rows"), Session(get_engine()) as session:
+                session.execute(insert(Transaction), rows)
+                session.commit()
+        except Exception as e:
+            print(f"거래 기록 저장 중 오류 발생: {e}")
+            # 다음 저장 때 다시 시도 (자동 저장은 실패 횟수에 따라 간격을 둠)
+            self._rows = rows + self._rows
+            self.failures += 1
+            self._retry_at = self._last_flush + min(self.retry_backoff * 2 ** (self.failures - 1), self.max_backoff)
+            return 0
+        self.failures = 0
+        self._retry_at = 0.0
+        self.written += len(rows)
+        profile_count('db_write_rows', len(rows))
+        return len(rows)
+
+    def close(self):
+        """남은 행을 저장하고 종료 시 자동 저장 대상에서 뺍니다.
+
+        Raises:
+            ValueError: 저장에 실패해 버퍼에 행이 남은 경우 (기록기는 종료 시 자동 저장 대상으로 남음)
+        """
+        self.flush()
+        if self._rows:
+            raise ValueError(f"{len(self._rows)} transaction rows could not be written")
+        _open_writers.discard(self)
+
+    def __del__(self):
+        # close()하지 않고 버려진 기록기의 남은 행 저장
+        if getattr(self, '_rows', None):
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
 if __name__ == "__main__":
     log_transaction(
         backtest_id="test",
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, String, DateTime, Float, Integer, Index, JSON, Text
+from sqlalchemy.ext.declarative import declarative_base
+
+# Base 클래스 생성
+Base = declarative_base()
+
+# 백테스트 실행 요약 테이블 (실행마다 한 행)
+class BacktestRun(Base):
+    __tablename__ = 'backtest_runs'
+
+    id = Column(Integer, primary_key=True)
+    backtest_id = Column(String(64), nullable=False, unique=True)  # 백테스팅 실행 ID
+    group_id = Column(String(64), nullable=True)  # 실행 묶음 (스윕, 워크포워드 등)
+    strategy = Column(String(100), nullable=True)  # 전략 이름
+    params = Column(JSON, nullable=True)  # 전략 파라미터
+    start_date = Column(DateTime, nullable=True)  # 백테스트 시작 시간
+    end_date = Column(DateTime, nullable=True)  # 백테스트 종료 시간
+    initial_balance = Column(Float, nullable=True)  # 초기 투자 금액
+    final_value = Column(Float, nullable=True)  # 최종 포트폴리오 가치
+    return_rate = Column(Float, nullable=True)  # 수익률
+    max_drawdown = Column(Float, nullable=True)  # 최대 낙폭
+    volatility = Column(Float, nullable=True)  # 연율화 변동성
+    sharpe = Column(Float, nullable=True)  # 연율화 샤프 비율
+    trades_count = Column(Integer, nullable=False, default=0)  # 거래 횟수
+    wall_time = Column(Float, nullable=True)  # 실행 시간 (초)
+    error = Column(Text, nullable=True)  # 실패한 실행의 오류 메시지
+    created_at = Column(DateTime(timezone=True), nullable=False)  # 생성 시간
+
+    __table_args__ = (
+        # 묶음 안 순위 조회 (ORDER BY ... LIMIT n이 인덱스만 읽도록 정렬 열을 두 번째에 둠)
+        Index('idx_backtest_runs_group_return', 'group_id', 'return_rate'),
+        Index('idx_backtest_runs_group_drawdown', 'group_id', 'max_drawdown'),
+        Index('idx_backtest_runs_group_sharpe', 'group_id', 'sharpe'),
+        Index('idx_backtest_runs_return', 'return_rate'),
+        Index('idx_backtest_runs_created', 'created_at'),
+    )
+def create_tables():
+    from .db_engine import get_engine
+    try:
+        # 테이블 생성
+        Base.metadata.create_all(get_engine())
+        print("테이블이 성공적으로 생성되었습니다.")
+
+    except Exception as e:
+        print(f"테이블 생성 중 오류 발생: {e}")
+
+if __name__ == "__main__":
+    create_tables()
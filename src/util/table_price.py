@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import Column, DateTime, Float, Index, MetaData, PrimaryKeyConstraint, String, Table, text
+from resolution import storage_name
+
+# 가격 테이블을 만드는 기본 해상도
+PRICE_TYPES = ('daily', '1hour')
+
+
+def price_table_name(type: str) -> str:
+    """가격 타입의 테이블 이름 ('1hour' -> 'upbit_1hour_price', '1m' -> 'upbit_1min_price')"""
+    return f"upbit_{storage_name(type)}_price"
+
+
+def _not_sqlite(ddl, target, bind, **kw) -> bool:
+    return kw['dialect'].name != 'sqlite'
+
+
+def price_table(type: str, metadata: Optional[MetaData] = None, partitioned: bool = False) -> Table:
+    """upbit_{type}_price 테이블 정의를 반환합니다.
+
+    get_price의 as-of 조회(WHERE market = ? AND timestamp_kst <= ? ORDER BY timestamp_kst DESC LIMIT 1)가
+    테이블을 읽지 않고 인덱스만 읽도록 (market, timestamp_kst) 키에 close까지 담습니다.
+        - postgresql: (market, timestamp_kst) 고유 인덱스 INCLUDE (close)
+        - sqlite: (market, timestamp_kst) 기본 키의 WITHOUT ROWID 테이블 (테이블이 곧 기본 키 인덱스)
+    같은 키가 upsert(ON CONFLICT)의 충돌 대상입니다.
+
+    Args:
+        type: 가격 타입 (예: 'daily', '1hour', '1m')
+        metadata: 테이블을 등록할 MetaData (기본값: 새 MetaData)
+        partitioned: timestamp_kst 범위로 파티션을 나눌지 여부 (postgresql 전용, 월별 파티션은 create_partitions로 생성)
+
+    Returns:
+        Table: 가격 테이블
+    """
+    name = price_table_name(type)
+    options = {'sqlite_with_rowid': False}
+    if partitioned:
+        options['postgresql_partition_by'] = 'RANGE (timestamp_kst)'
+    return Table(
+        name, metadata if metadata is not None else MetaData(),
+        Column('market', String(30), nullable=False),  # 암호화폐 이름
+        Column('timestamp_kst', DateTime, nullable=False),  # 캔들 시작 시간 (KST)
+        Column('close', Float, nullable=False),  # 종가
+        PrimaryKeyConstraint('market', 'timestamp_kst', name=f"pk_{name}").ddl_if(dialect='sqlite'),
+        Index(f"idx_{name}", 'market', 'timestamp_kst', unique=True,
+              postgresql_include=['close']).ddl_if(callable_=_not_sqlite),
+        **options,
+    )
+
+
+def month_starts(start: datetime, end: datetime) -> list[datetime]:
+    """start가 속한 달부터 end가 속한 달까지 각 달의 1일 0시 목록"""
+    months = []
+    month = datetime(start.year, start.month, 1)
+    while month <= end:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def create_partitions(conn, type: str, start: datetime, end: datetime) -> list[str]:
+    """파티션 테이블에 [start, end] 구간의 월별 파티션을 만듭니다. 이미 있는 파티션은 건너뜁니다.
+
+    Args:
+        conn: postgresql 연결 (트랜잭션 안에서 호출)
+        type: 가격 타입
+        start: 구간 시작 시간
+        end: 구간 끝 시간
+
+    Returns:
+        list[str]: 파티션 테이블 이름 목록 (예: upbit_1hour_price_202401)
+    """
+    name = price_table_name(type)
+    partitions = []
+    for month in month_starts(start, end):
+        partition = f"{name}_{month:%Y%m}"
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {name} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+        ))
+        partitions.append(partition)
+    return partitions
+
+
+def is_partitioned(conn, type: str) -> bool:
+    """가격 테이블이 파티션 테이블인지 여부 (postgresql이 아니면 항상 False)"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return bool(conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+             "WHERE c.relname = :name)"),
+        {"name": price_table_name(type)}
+    ).scalar())
+
+
+def create_tables(types: Iterable[str] = PRICE_TYPES, partition_by_month: bool = False):
+    """가격 테이블과 인덱스를 만듭니다. 이미 있는 테이블은 그대로 둡니다.
+
+    Args:
+        types: 만들 가격 타입 목록 (기본값: daily, 1hour)
+        partition_by_month: 월별 파티션 테이블로 만들지 여부 (postgresql 전용, 파티션은 적재할 때 자동 생성)
+    """
+    from .db_engine import get_engine
+    try:
+        engine = get_engine()
+        if partition_by_month and engine.dialect.name != 'postgresql':
+            raise ValueError("Monthly partitioning requires postgresql")
+        metadata = MetaData()
+        for type in types:
+            price_table(type, metadata, partitioned=partition_by_month)
+        # 테이블 생성
+        metadata.create_all(engine)
+        print("가격 테이블이 성공적으로 생성되었습니다.")
+
+    except Exception as e:
+        print(f"가격 테이블 생성 중 오류 발생: {e}")
@@ -1,18 +1,7 @@
 from sqlalchemy import Column, String, DateTime, Numeric, Integer, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import UniqueConstraint
-import os
-from dotenv import load_dotenv
-from .db_engine import engine
-# .env 파일 로드
-load_dotenv()
-
-# 환경변수 가져오기
-DB_USER = os.getenv('POSTGRES_USER')
-DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
-DB_NAME = os.getenv('POSTGRES_DB')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
+from .db_engine import get_engine
 
 # Base 클래스 생성
 Base = declarative_base()
@@ -40,7 +29,7 @@ class Transaction(Base):
 def create_tables():
     try:
         # 테이블 생성
-        Base.metadata.create_all(engine)
+        Base.metadata.create_all(get_engine())
         print("테이블이 성공적으로 생성되었습니다.")
         
     except Exception as e:
@@ -0,0 +1,324 @@
+from datetime import datetime
+from typing import Literal, Optional, Union
+import numpy as np
+import pandas as pd
+from fill_model import FillModel, trade_amounts
+
+ArrayLike = Union[np.ndarray, pd.DataFrame]
+
+
+def run_vectorized(prices: ArrayLike, target_positions: Optional[ArrayLike] = None,
+                   signals: Optional[ArrayLike] = None, quantity: Union[float, np.ndarray] = 1.0,
+                   initial_balance: float = 10000000.0,
+                   fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+                   timestamps: Optional[np.ndarray] = None, markets: Optional[list[str]] = None,
+                   fill_model: Optional[FillModel] = None, volumes: Optional[ArrayLike] = None) -> dict:
+    """정렬된 가격 배열 전체에 대해 백테스트를 배열 연산으로 한 번에 실행합니다.
+
+    각 시점의 목표 보유 수량과 직전 보유 수량의 차이만큼 그 시점 가격으로 거래합니다.
+    한 시점 안에서는 매도를 먼저(암호화폐 순서대로) 실행한 뒤 매수를 실행하며,
+    수수료와 잔고/보유 수량 검사는 Backtest.buy/sell과 같은 방식으로 계산합니다.
+    자산 가치는 각 시점의 가격(결측은 직전 가격)으로 평가합니다.
+
+    fill_model이 있으면 모든 거래의 체결 가격을 한 번의 배열 연산으로 계산합니다. 부분 체결이 생길 수 있는 모델
+    (fill_model.partial)은 다음 시점에 목표와 실제 보유 수량의 차이를 다시 주문하므로 시점 단위로 체결 수량을
+    계산합니다 (시점 안의 암호화폐는 배열 연산).
+
+    Args:
+        prices: (시점, 암호화폐) 모양의 가격 배열 또는 DataFrame (index: 시간, columns: 암호화폐)
+        target_positions: prices와 같은 모양의 목표 보유 수량
+        signals: target_positions 대신 사용할 보유 신호 (1: 보유, 0: 미보유)
+        quantity: signals 사용 시 보유 신호 1에 해당하는 수량 (스칼라 또는 암호화폐별 배열)
+        initial_balance: 초기 투자 금액 (기본값: 10,000,000.0)
+        fee_type: 수수료 유형 ('percent' 또는 'fixed')
+        fee_amount: 수수료 금액 (percent인 경우 비율, fixed인 경우 고정 금액)
+        timestamps: prices가 배열인 경우 각 시점의 시간 (기본값: 0부터 시작하는 정수)
+        markets: prices가 배열인 경우 암호화폐 이름 목록 (기본값: 0부터 시작하는 정수)
+        fill_model: 체결 가격/수량을 계산할 체결 모델 (기본값: 가격과 목표 수량 그대로 체결)
+        volumes: prices와 같은 모양의 바별 거래량 (거래량을 쓰는 fill_model에만 필요)
+
+    Returns:
+        dict: 실행 결과
+            - equity (DataFrame): 시점별 cash_balance, asset_value, total_value, return_rate
+            - positions (DataFrame): 시점별 보유 수량
+            - trades (DataFrame): Backtest.transaction_log와 같은 열을 가진 거래 목록
+            - final_value (float): 최종 포트폴리오 가치
+            - return_rate (float): 최종 수익률
+            - trades_count (int): 총 거래 횟수
+
+    Raises:
+        ValueError: 입력 모양이 맞지 않거나, 잔고/보유 수량이 부족하거나, 거래 시점 가격이 없는 경우
+    """
+    if isinstance(prices, pd.DataFrame):
+        timestamps = prices.index.to_numpy() if timestamps is None else timestamps
+        markets = list(prices.columns) if markets is None else markets
+    P = np.asarray(prices, dtype=np.float64)
+    if P.ndim != 2:
+        raise ValueError("prices must be a 2-dimensional (time, market) array")
+    T, M = P.shape
+    timestamps = np.arange(T) if timestamps is None else np.asarray(timestamps)
+    markets = list(range(M)) if markets is None else list(markets)
+
+    if target_positions is None:
+        if signals is None:
+            raise ValueError("target_positions or signals is required")
+        target_positions = np.asarray(signals, dtype=np.float64) * np.asarray(quantity, dtype=np.float64)
+    Q = np.asarray(target_positions, dtype=np.float64)
+    if Q.shape != P.shape:
+        raise ValueError(f"target_positions shape {Q.shape} does not match prices shape {P.shape}")
+
+    W = None
+    if volumes is not None:
+        W = np.asarray(volumes, dtype=np.float64)
+        if W.shape != P.shape:
+            raise ValueError(f"volumes shape {W.shape} does not match prices shape {P.shape}")
+
+    # 보유 수량은 Backtest와 같이 거래 수량을 순서대로 누적해 계산
+    if fill_model is not None and fill_model.partial:
+        D = _partial_deltas(Q, P, W, fill_model)
+    else:
+        D = _target_deltas(Q)
+    positions = np.cumsum(D, axis=0)
+    prev_positions = np.vstack([np.zeros((1, M)), positions[:-1]])
+    V = _ffill(P)
+
+    # 거래 순서: 시점 -> (매도, 매수) -> 암호화폐
+    t_idx, j_idx = np.nonzero(D)
+    is_buy = D[t_idx, j_idx] > 0
+    order = np.argsort(t_idx * (2 * M) + is_buy * M + j_idx, kind='stable')
+    t_idx, j_idx, is_buy = t_idx[order], j_idx[order], is_buy[order]
+
+    trade_price = P[t_idx, j_idx]
+    if np.isnan(trade_price).any():
+        k = int(np.argmax(np.isnan(trade_price)))
+        raise ValueError(f"No price for {markets[j_idx[k]]} at {timestamps[t_idx[k]]}")
+    trade_qty = np.abs(D[t_idx, j_idx])
+    if fill_model is not None:
+        trade_price = fill_model.fill_price(is_buy, trade_price, trade_qty, None if W is None else W[t_idx, j_idx])
+    total_amount = trade_amounts(is_buy, trade_price, trade_qty, fee_type, fee_amount)
+
+    # 매도 수량 검사 (Backtest.sell과 같은 비교)
+    short = ~is_buy & (prev_positions[t_idx, j_idx] < trade_qty)
+    if short.any():
+        k = int(np.argmax(short))
+        raise ValueError(f"Not enough {markets[j_idx[k]]} in portfolio at {timestamps[t_idx[k]]}")
+
+    # 현금 잔고는 거래 순서대로 누적 (순차 실행과 같은 부동소수점 결과)
+    flows = np.where(is_buy, -total_amount, total_amount)
+    cash_path = np.cumsum(np.concatenate([[initial_balance], flows]))
+    cash_after = cash_path[1:]
+    cash_before = cash_path[:-1]
+    broke = is_buy & (cash_before < total_amount)
+    if broke.any():
+        k = int(np.argmax(broke))
+        raise ValueError(f"Not enough cash balance to buy {markets[j_idx[k]]} at {timestamps[t_idx[k]]}")
+
+    # 시점별 평가
+    held = positions != 0
+    asset_value = np.where(held, positions * V, 0.0).sum(axis=1)
+    last_trade = np.searchsorted(t_idx, np.arange(T), side='right')
+    cash = cash_path[last_trade]
+    total_value = cash + asset_value
+
+    # 거래별 평가: 시점 시작 보유분 가치 + 시점 내 누적 거래분 가치
+    bar_start_value = np.where(prev_positions != 0, prev_positions * V, 0.0).sum(axis=1)
+    delta_value = np.cumsum(D[t_idx, j_idx] * V[t_idx, j_idx])
+    first_in_bar = np.searchsorted(t_idx, t_idx, side='left')
+    delta_before_bar = np.concatenate([[0.0], delta_value])[first_in_bar]
+    trade_asset_value = bar_start_value[t_idx] + delta_value - delta_before_bar
+    trade_total_value = trade_asset_value + cash_after
+
+    trades = pd.DataFrame({
+        'date': timestamps[t_idx],
+        'crypto_name': np.asarray(markets, dtype=object)[j_idx],
+        'price': trade_price,
+        'quantity': trade_qty,
+        'total_amount': total_amount,
+        'fee_type': fee_type,
+        'fee_amount': fee_amount,
+        'transaction_type': np.where(is_buy, 'Buy', 'Sell'),
+        'cash_balance': cash_after,
+        'asset_value': trade_asset_value,
+        'total_value': trade_total_value,
+        'return_rate': trade_total_value / initial_balance - 1,
+    })
+    equity = pd.DataFrame({
+        'cash_balance': cash,
+        'asset_value': asset_value,
+        'total_value': total_value,
+        'return_rate': total_value / initial_balance - 1,
+    }, index=timestamps)
+    final_value = float(total_value[-1]) if T else float(initial_balance)
+    return {
+        'equity': equity,
+        'positions': pd.DataFrame(positions, index=timestamps, columns=markets),
+        'trades': trades,
+        'final_value': final_value,
+        'return_rate': final_value / initial_balance - 1,
+        'trades_count': len(trades),
+    }
+
+
+def _target_deltas(Q: np.ndarray) -> np.ndarray:
+    """시점별 거래 수량 (목표 보유 수량 - 직전까지 누적한 보유 수량)을 계산합니다.
+
+    np.diff(Q)를 누적하면 소수 목표 수량에서 반올림 오차로 실제 보유 수량보다 작아질 수 있으므로,
+    Backtest처럼 누적한 보유 수량과의 차이를 주문합니다. 목표가 바뀐 시점과, 누적 보유 수량이 아직 목표와
+    다른 바로 다음 시점만 계산합니다.
+    """
+    T, M = Q.shape
+    D = np.zeros((T, M))
+    changed = np.any(np.diff(Q, axis=0, prepend=np.zeros((1, M))) != 0, axis=1)
+    candidates = np.flatnonzero(changed)
+    held = np.zeros(M)
+    k = 0
+    t = int(candidates[0]) if len(candidates) else T
+    while t < T:
+        want = Q[t] - held
+        D[t] = want
+        held = held + want
+        if t + 1 < T and (held != Q[t]).any():
+            t += 1
+        else:
+            k = int(np.searchsorted(candidates, t, side='right'))
+            t = int(candidates[k]) if k < len(candidates) else T
+    return D
+
+
+def _partial_deltas(Q: np.ndarray, P: np.ndarray, W: Optional[np.ndarray], fill_model: FillModel) -> np.ndarray:
+    """부분 체결 모델로 시점별 실제 거래 수량을 계산합니다. 매 시점 목표와 실제 보유 수량의 차이를 주문합니다."""
+    T, M = Q.shape
+    D = np.zeros((T, M))
+    held = np.zeros(M)
+    for t in range(T):
+        want = Q[t] - held
+        j = np.nonzero(want)[0]
+        if not len(j):
+            continue
+        is_buy = want[j] > 0
+        filled = fill_model.fill_quantity(is_buy, P[t, j], np.abs(want[j]), None if W is None else W[t, j])
+        D[t, j] = np.where(is_buy, filled, -filled)
+        held = held + D[t]
+    return D
+
+
+def max_drawdown(total_value: ArrayLike) -> float:
+    """포트폴리오 가치 곡선의 최대 낙폭을 계산합니다.
+
+    Args:
+        total_value: 시간순 포트폴리오 가치
+
+    Returns:
+        float: 최대 낙폭 (0 이하의 비율, 예: -0.25는 고점 대비 25% 하락)
+    """
+    values = np.asarray(total_value, dtype=np.float64)
+    if len(values) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    return float((values / peak - 1).min())
+
+
+def check_parity(prices: pd.DataFrame, target_positions: ArrayLike, initial_balance: float = 10000000.0,
+                 fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+                 fill_model: Optional[FillModel] = None, volumes: Optional[ArrayLike] = None) -> dict:
+    """같은 입력으로 Backtest 클래스를 순차 실행해 run_vectorized 결과와 비교합니다.
+
+    Backtest는 run_vectorized의 거래 목록이 아니라 같은 목표 보유 수량에서 직접 주문을 만듭니다. 바마다 목표와
+    현재 보유 수량의 차이를 매도 먼저, 암호화폐 순서대로 buy/sell로 실행하므로 거래 생성까지 따로 검증됩니다.
+    fill_model이 있으면 Backtest도 같은 체결 모델과 거래량으로 체결합니다.
+    Backtest의 자산 평가는 prices를 미리 등록한 전용 PriceCache로 처리하므로 db 조회가 없습니다.
+
+    Args:
+        prices: 가격 DataFrame (index: 시간, columns: 암호화폐)
+        target_positions: prices와 같은 모양의 목표 보유 수량
+        initial_balance: 초기 투자 금액
+        fee_type: 수수료 유형 ('percent' 또는 'fixed')
+        fee_amount: 수수료 금액
+        fill_model: run_vectorized에 넘길 체결 모델
+        volumes: run_vectorized에 넘길 바별 거래량
+
+    Returns:
+        dict: 항목별 최대 절대 오차와 거래 수/최종 잔고/보유 수량 일치 여부
+    """
+    from backtest_class import Backtest
+    from price_cache import PriceCache
+
+    result = run_vectorized(prices, target_positions, initial_balance=initial_balance,
+                            fee_type=fee_type, fee_amount=fee_amount, fill_model=fill_model, volumes=volumes)
+    timestamps = prices.index.to_numpy()
+    cache = PriceCache(max_bytes=2 ** 62)
+    for market in prices.columns:
+        column = prices[market].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(column)
+        cache.put(market, timestamps[valid], column[valid], '1hour', timestamps[0], timestamps[-1])
+
+    backtest = Backtest(backtest_id='parity', start_date=pd.Timestamp(timestamps[0]).to_pydatetime(),
+                        initial_balance=initial_balance, price_cache=cache, fill_model=fill_model)
+    markets = list(prices.columns)
+    P = prices.to_numpy(dtype=np.float64)
+    Q = np.asarray(target_positions, dtype=np.float64)
+    W = None if volumes is None else np.asarray(volumes, dtype=np.float64)
+    for t, timestamp in enumerate(timestamps):
+        date = pd.Timestamp(timestamp).to_pydatetime()
+        deltas = [(j, Q[t, j] - backtest.get_quantity(market)) for j, market in enumerate(markets)]
+        for j, delta in [d for d in deltas if d[1] < 0] + [d for d in deltas if d[1] > 0]:
+            method = backtest.buy if delta > 0 else backtest.sell
+            method(date, markets[j], P[t, j], abs(delta), fee_type=fee_type, fee_amount=fee_amount,
+                   volume=None if W is None else W[t, j])
+
+    expected = pd.DataFrame(backtest.transaction_log, columns=result['trades'].columns)
+    actual = result['trades']
+    final_positions = result['positions'].iloc[-1]
+    report = {
+        'trades_count_equal': backtest.trades_count == result['trades_count'],
+        'cash_equal': bool(backtest.cash_balance == (actual['cash_balance'].iloc[-1] if len(actual) else initial_balance)),
+        'positions_equal': all(backtest.get_quantity(m) == q for m, q in final_positions.items()),
+    }
+    for column in ['price', 'quantity', 'total_amount', 'cash_balance', 'asset_value', 'total_value', 'return_rate']:
+        diff = np.abs(expected[column].to_numpy(dtype=np.float64) - actual[column].to_numpy(dtype=np.float64))
+        report[f'{column}_max_diff'] = float(diff.max()) if len(diff) else 0.0
+    return report
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """열마다 NaN을 직전 값으로 채웁니다."""
+    T = values.shape[0]
+    idx = np.where(np.isnan(values), 0, np.arange(T)[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = values[idx, np.arange(values.shape[1])]
+    return filled
+
+
+if __name__ == '__main__':
+    import time
+
+    # 1년치 1시간봉 합성 데이터로 순차 실행 결과와 비교
+    rng = np.random.default_rng(42)
+    hours = 24 * 365
+    index = pd.date_range(datetime(2024, 1, 1), periods=hours, freq='h')
+    markets = ['KRW-BTC', 'KRW-ETH', 'KRW-XRP']
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.01, (hours, len(markets))), axis=0)),
+        index=index, columns=markets,
+    )
+    fast = prices.rolling(12).mean()
+    slow = prices.rolling(48).mean()
+    positions = (fast > slow).astype(float) * np.array([100.0, 200.0, 500.0])
+
+    started = time.perf_counter()
+    result = run_vectorized(prices, positions, initial_balance=1e6)
+    elapsed = time.perf_counter() - started
+    print(f"vectorized: {elapsed * 1000:.1f} ms, trades: {result['trades_count']}, "
+          f"return: {result['return_rate']:.2%}, mdd: {max_drawdown(result['equity']['total_value']):.2%}")
+    print(check_parity(prices, positions, initial_balance=1e6))
+    print(check_parity(prices, positions, initial_balance=1e6, fee_type='fixed', fee_amount=50))
+
+    # 스프레드/충격 + 거래량 10% 제한 체결 모델
+    from fill_model import SpreadImpact, VolumeParticipation
+    volumes = pd.DataFrame(rng.uniform(500, 5000, prices.shape), index=index, columns=markets)
+    model = VolumeParticipation(0.1, price_model=SpreadImpact(spread_bps=4, impact=0.05))
+    started = time.perf_counter()
+    result = run_vectorized(prices, positions, initial_balance=1e6, fill_model=model, volumes=volumes)
+    elapsed = time.perf_counter() - started
+    print(f"fill model: {elapsed * 1000:.1f} ms, trades: {result['trades_count']}, return: {result['return_rate']:.2%}")
+    print(check_parity(prices, positions, initial_balance=1e6, fill_model=model, volumes=volumes))
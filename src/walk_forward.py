@@ -0,0 +1,196 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, Literal, Optional, Union
+import numpy as np
+import pandas as pd
+from fill_model import FillModel
+from sweep import ProgressCallback, Strategy, expand_grid, load_price_matrix, run_parallel, summarize_result
+from vectorized_backtest import run_vectorized
+
+SUMMARY_FIELDS = ('final_value', 'return_rate', 'trades_count', 'max_drawdown')
+
+
+def make_windows(start: datetime, end: datetime, train: timedelta, test: timedelta,
+                 step: Optional[timedelta] = None, anchored: bool = False) -> list[dict]:
+    """워크포워드 검증 구간 목록을 만듭니다.
+
+    각 구간은 학습 구간 [train_start, train_end)와 바로 뒤의 검증 구간 [test_start, test_end)로 이루어지며,
+    다음 구간은 step만큼 뒤로 이동합니다. 검증 구간이 end를 넘는 구간은 만들지 않습니다.
+
+    Args:
+        start: 첫 학습 구간 시작 시간
+        end: 마지막 검증 구간이 끝나는 한계 시간
+        train: 학습 구간 길이 (anchored면 첫 학습 구간 길이)
+        test: 검증 구간 길이
+        step: 구간 이동 간격 (기본값: test, 검증 구간이 겹치지 않음)
+        anchored: True면 학습 구간 시작을 start에 고정하고 끝만 늘림 (확장 구간)
+
+    Returns:
+        list[dict]: 구간별 window(번호), train_start, train_end, test_start, test_end
+
+    Raises:
+        ValueError: 구간 길이나 간격이 0 이하인 경우
+    """
+    step = test if step is None else step
+    if train <= timedelta(0) or test <= timedelta(0) or step <= timedelta(0):
+        raise ValueError("train, test and step must be positive")
+    windows = []
+    train_end = start + train
+    while train_end + test <= end:
+        windows.append({
+            'window': len(windows),
+            'train_start': start if anchored else train_end - train,
+            'train_end': train_end,
+            'test_start': train_end,
+            'test_end': train_end + test,
+        })
+        train_end += step
+    return windows
+
+
+def _run_window(prices: pd.DataFrame, strategy: Strategy, options: dict, task: tuple) -> dict:
+    window, grid, objective = task
+    summary = dict(window)
+    index = prices.index
+    train_lo, train_hi, test_hi = index.searchsorted(
+        [window['train_start'], window['train_end'], window['test_end']], side='left')
+    try:
+        # 공유 메모리를 참조하는 슬라이스 (복사 없음)
+        train = prices.iloc[train_lo:train_hi]
+        if len(grid) > 1:
+            scores = []
+            for params in grid:
+                try:
+                    result = run_vectorized(train, strategy(train, params), **options)
+                    scores.append(summarize_result(result)[objective])
+                except ValueError:
+                    scores.append(np.nan)
+            scores = np.asarray(scores, dtype=np.float64)
+            if np.isnan(scores).all():
+                raise ValueError("Every parameter set failed in the train window")
+            best = int(np.nanargmax(scores))
+            summary['train_score'] = float(scores[best])
+        else:
+            best = 0
+            summary['train_score'] = np.nan
+        params = grid[best]
+        summary['params'] = params
+
+        # 학습 구간부터 이어서 계산해 지표의 초기 구간을 채운 뒤 검증 구간만 실행
+        span = prices.iloc[train_lo:test_hi]
+        if test_hi == train_hi:
+            raise ValueError("No prices in the test window")
+        positions = np.asarray(strategy(span, params), dtype=np.float64)[train_hi - train_lo:]
+        result = run_vectorized(prices.iloc[train_hi:test_hi], positions, **options)
+        summary.update(summarize_result(result))
+        summary['error'] = None
+    except ValueError as e:
+        summary.setdefault('train_score', np.nan)
+        summary.setdefault('params', None)
+        summary.update(final_value=np.nan, return_rate=np.nan, trades_count=0, max_drawdown=np.nan, error=str(e))
+    return summary
+
+
+def run_walk_forward(strategy: Strategy, param_grid: Union[dict, Iterable[dict]],
+                     windows: Optional[list[dict]] = None, train: Optional[timedelta] = None,
+                     test: Optional[timedelta] = None, step: Optional[timedelta] = None, anchored: bool = False,
+                     markets: Optional[Iterable[str]] = None, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, price_type: str = '1hour',
+                     prices: Optional[pd.DataFrame] = None, objective: str = 'return_rate',
+                     initial_balance: float = 10000000.0,
+                     fee_type: Literal['percent', 'fixed'] = 'percent', fee_amount: float = 0.0005,
+                     n_workers: Optional[int] = None, chunksize: int = 1,
+                     progress: Union[bool, ProgressCallback] = True, progress_interval: float = 1.0,
+                     fill_model: Optional[FillModel] = None) -> dict:
+    """워크포워드 검증을 실행합니다.
+
+    모든 구간에 필요한 가격(첫 학습 시작 ~ 마지막 검증 끝)을 한 번만 조회해 공유 메모리에 올리고,
+    각 구간은 작업 프로세스에서 복사 없는 슬라이스로 실행합니다. 구간마다 학습 구간에서 param_grid의 조합 중
+    objective가 가장 큰 조합을 고른 뒤(조합이 하나면 그대로 사용), 그 조합으로 검증 구간을 run_vectorized로 실행합니다.
+    전략은 학습 구간부터 이어진 가격으로 계산하므로 이동 평균 같은 지표가 검증 구간 시작부터 채워져 있습니다.
+
+    Args:
+        strategy: (가격 DataFrame, 파라미터 dict)를 받아 목표 보유 수량을 반환하는 함수 (모듈 최상위 함수)
+        param_grid: {이름: 값 목록} 형태의 dict 또는 파라미터 dict 목록
+        windows: make_windows로 만든 구간 목록 (지정하지 않으면 train/test/step/anchored와 start/end로 생성)
+        train: 학습 구간 길이
+        test: 검증 구간 길이
+        step: 구간 이동 간격 (기본값: test)
+        anchored: 학습 구간 시작을 고정할지 여부
+        markets: 암호화폐 이름 목록 (prices를 지정하지 않은 경우 필수)
+        start: 첫 학습 구간 시작 시간
+        end: 마지막 검증 구간이 끝나는 한계 시간
+        price_type: 가격 데이터 타입 (예: 'daily', '1hour', '1m', '4h')
+        prices: 이미 조회한 가격 DataFrame (지정하면 db를 조회하지 않음)
+        objective: 학습 구간에서 조합을 고르는 기준 ('return_rate', 'final_value', 'max_drawdown')
+        initial_balance: 구간별 초기 투자 금액
+        fee_type: 수수료 유형 ('percent' 또는 'fixed')
+        fee_amount: 수수료 금액
+        n_workers: 작업 프로세스 수 (기본값: CPU 수, 1 이하면 현재 프로세스에서 순차 실행)
+        chunksize: 작업 프로세스에 한 번에 넘기는 구간 수
+        progress: 진행 상황 출력 여부 또는 콜백
+        progress_interval: 진행 상황 보고 최소 간격 (초)
+        fill_model: run_vectorized에 넘길 체결 모델 (가격에는 거래량이 없으므로 거래량을 쓰지 않는 모델)
+
+    Returns:
+        dict: 실행 결과
+            - windows (DataFrame): 구간별 기간, 선택된 params, train_score, 검증 구간 final_value/return_rate/
+              trades_count/max_drawdown, error
+            - summary (dict): 검증 구간 수/성공 수, 평균/중앙값 수익률, 수익 구간 비율, 검증 구간 수익률을 이은
+              누적 수익률, 최악 낙폭, 가장 많이 선택된 조합
+
+    Raises:
+        ValueError: 구간이나 가격 조회 정보가 부족한 경우, objective를 알 수 없는 경우
+
+    Example:
+        >>> report = run_walk_forward(ma_cross, {'fast': [6, 12], 'slow': [48, 96]},
+        ...                           train=timedelta(days=90), test=timedelta(days=30),
+        ...                           markets=['KRW-BTC'], start=datetime(2022, 1, 1), end=datetime(2024, 12, 31))
+        >>> report['summary']['compounded_return']
+    """
+    if objective not in SUMMARY_FIELDS:
+        raise ValueError(f"Unknown objective: {objective}")
+    if windows is None:
+        if train is None or test is None or start is None or end is None:
+            raise ValueError("windows or train, test, start and end are required")
+        windows = make_windows(start, end, train, test, step, anchored)
+    if not windows:
+        raise ValueError("No walk-forward windows")
+    if prices is None:
+        if markets is None:
+            raise ValueError("markets is required when prices is not given")
+        # 검증 구간 끝은 포함하지 않으므로 1마이크로초 전까지 조회
+        prices = load_price_matrix(markets, min(w['train_start'] for w in windows),
+                                   max(w['test_end'] for w in windows) - timedelta(microseconds=1), price_type)
+    grid = expand_grid(param_grid)
+    options = {'initial_balance': initial_balance, 'fee_type': fee_type, 'fee_amount': fee_amount,
+               'fill_model': fill_model}
+    tasks = [(window, grid, objective) for window in windows]
+    results = run_parallel(_run_window, tasks, prices, strategy, options, n_workers, chunksize,
+                           progress, progress_interval, label='워크포워드')
+
+    columns = ['window', 'train_start', 'train_end', 'test_start', 'test_end', 'params', 'train_score',
+               *SUMMARY_FIELDS, 'error']
+    frame = pd.DataFrame(results, columns=columns).sort_values('window').reset_index(drop=True)
+    return {'windows': frame, 'summary': summarize_windows(frame)}
+
+
+def summarize_windows(frame: pd.DataFrame) -> dict:
+    """구간별 결과를 하나의 요약으로 모읍니다.
+
+    compounded_return은 검증 구간 수익률을 순서대로 이어 붙인 값으로, 검증 구간이 겹치지 않을 때 의미가 있습니다.
+    """
+    ok = frame[frame['error'].isna()]
+    returns = ok['return_rate'].to_numpy(dtype=np.float64)
+    chosen = Counter(tuple(sorted(params.items())) for params in ok['params'] if params)
+    return {
+        'windows': len(frame),
+        'completed': len(ok),
+        'mean_return': float(returns.mean()) if len(returns) else np.nan,
+        'median_return': float(np.median(returns)) if len(returns) else np.nan,
+        'positive_ratio': float((returns > 0).mean()) if len(returns) else np.nan,
+        'compounded_return': float(np.prod(1 + returns) - 1) if len(returns) else np.nan,
+        'worst_drawdown': float(ok['max_drawdown'].min()) if len(ok) else np.nan,
+        'total_trades': int(ok['trades_count'].sum()),
+        'most_chosen_params': dict(chosen.most_common(1)[0][0]) if chosen else None,
+    }
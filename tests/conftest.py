@@ -0,0 +1,28 @@
+from pathlib import Path
+import pandas as pd
+import pytest
+from benchmark import market_names, seed_database
+from util.db_engine import configure_engine, get_engine
+from util.table_price import price_table_name
+
+
+@pytest.fixture
+def price_db(tmp_path: Path, monkeypatch):
+    """합성 가격 데이터(3개 암호화폐, 10일치 1시간봉)를 넣은 임시 sqlite db를 설정합니다.
+
+    Returns:
+        list[str]: 암호화폐 이름 목록
+    """
+    url = f"sqlite:///{tmp_path / 'prices.sqlite'}"
+    monkeypatch.setenv('DATABASE_URL', url)
+    configure_engine(url)
+    seed_database(get_engine(), markets=3, days=10, seed=7)
+    yield market_names(3)
+    configure_engine(None)
+
+
+def load_prices(markets: list[str], type: str = '1hour') -> pd.DataFrame:
+    """가격 테이블을 그대로 (시간, 암호화폐) 종가 표로 읽습니다. 캔들이 없는 시점은 NaN입니다."""
+    frame = pd.read_sql(f"SELECT market, timestamp_kst, close FROM {price_table_name(type)}", get_engine(),
+                        parse_dates=['timestamp_kst'])
+    return frame.pivot(index='timestamp_kst', columns='market', values='close')[markets]
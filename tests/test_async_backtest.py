@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+import asyncio
+import pytest
+from async_backtest import AsyncBacktest
+from backtest_class import Backtest
+from price_cache import PriceCache
+
+START = datetime(2024, 1, 2)
+
+
+async def _trade(backtest, market: str):
+    for hour in range(0, 48, 6):
+        timestamp = START + timedelta(hours=hour)
+        if hour % 12 == 0:
+            await backtest.buy(timestamp, market, 100.0, 10.0)
+        else:
+            await backtest.sell(timestamp, market, 100.0, 10.0)
+        await backtest.mark_to_market(timestamp + timedelta(hours=3))
+
+
+def _sync_metrics(market: str) -> dict:
+    backtest = Backtest('metrics', START, price_cache=PriceCache(), valuation='lazy', track_metrics=True)
+    for hour in range(0, 48, 6):
+        timestamp = START + timedelta(hours=hour)
+        if hour % 12 == 0:
+            backtest.buy(timestamp, market, 100.0, 10.0)
+        else:
+            backtest.sell(timestamp, market, 100.0, 10.0)
+        backtest.mark_to_market(timestamp + timedelta(hours=3))
+    return backtest.metrics_report()
+
+
+@pytest.mark.filterwarnings('error::RuntimeWarning')
+def test_lazy_metrics_report(price_db):
+    market = price_db[0]
+
+    async def main():
+        backtest = AsyncBacktest('metrics', START, price_cache=PriceCache(), valuation='lazy', track_metrics=True)
+        await _trade(backtest, market)
+        report = await backtest.metrics_report()
+        assert not backtest._pending_valuation
+        # 동기 호출도 평가를 마친 지표를 반환
+        assert Backtest.metrics_report(backtest) == report
+        await backtest.close()
+        return report
+
+    report = asyncio.run(main())
+    assert report == _sync_metrics(market)
+    assert report['observations'] > 1
+
+
+@pytest.mark.filterwarnings('error::RuntimeWarning')
+@pytest.mark.parametrize('track_metrics', [False, True])
+def test_summarize_async_backtest(price_db, track_metrics):
+    from results_catalog import summarize_backtest
+    market = price_db[0]
+    end = START + timedelta(days=3)
+
+    async def main():
+        backtest = AsyncBacktest('summary', START, price_cache=PriceCache(), valuation='lazy',
+                                 track_metrics=track_metrics)
+        await backtest.buy(START, market, 100.0, 10.0)
+        return summarize_backtest(backtest, end)
+
+    summary = asyncio.run(main())
+    backtest = Backtest('summary', START, price_cache=PriceCache(), valuation='lazy', track_metrics=track_metrics)
+    backtest.buy(START, market, 100.0, 10.0)
+    expected = summarize_backtest(backtest, end)
+    assert isinstance(summary['final_value'], float)
+    assert summary == expected
@@ -0,0 +1,76 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import pytest
+import util.db_engine
+from util.async_log_transaction import AsyncTransactionWriter
+
+
+class SlowEngine:
+    """INSERT마다 delay초 걸리는 비동기 엔진 대역"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.started = asyncio.Event()
+        self.inserted = []
+
+    @asynccontextmanager
+    async def begin(self):
+        yield self
+
+    async def execute(self, statement, rows):
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        self.inserted.extend(rows)
+
+
+def _transaction(i: int) -> dict:
+    return {
+        'backtest_id': 'test', 'transaction_time': datetime(2024, 1, 1, i), 'crypto_name': 'KRW-BTC',
+        'transaction_type': 'Buy', 'price': 100.0, 'quantity': 1.0, 'total_amount': 100.05,
+        'cash_balance': 1e7, 'asset_value': 100.0, 'total_value': 1e7, 'return_rate': 0.0,
+        'market_name': 'upbit', 'fee_type': 'percent', 'fee_amount': 0.0005,
+    }
+
+
+@pytest.fixture
+def slow_engine(monkeypatch):
+    engine = SlowEngine(0.05)
+    monkeypatch.setattr(util.db_engine, 'get_async_engine', lambda: engine)
+    return engine
+
+
+def test_close_during_flush_keeps_rows(slow_engine):
+    async def main():
+        writer = AsyncTransactionWriter(batch_size=2, flush_interval=60)
+        writer.add(**_transaction(0))
+        writer.add(**_transaction(1))
+        # 백그라운드 태스크가 INSERT를 시작한 뒤 close
+        await slow_engine.started.wait()
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(main())
+    assert writer.written == 2
+    assert writer.pending == 0
+    assert len(slow_engine.inserted) == 2
+
+
+def test_cancelled_flush_restores_rows(slow_engine):
+    async def main():
+        writer = AsyncTransactionWriter(batch_size=100, flush_interval=60)
+        writer.add(**_transaction(0))
+        writer.add(**_transaction(1))
+        flush = asyncio.create_task(writer.flush())
+        await slow_engine.started.wait()
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        pending = writer.pending
+        await writer.close()
+        return writer, pending
+
+    writer, pending = asyncio.run(main())
+    assert pending == 2
+    assert writer.written == 2
+    assert len(slow_engine.inserted) == 2
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from async_backtest import AsyncBacktest
+from backtest_class import Backtest
+from checkpoint import Checkpointer, resume_backtest
+from price_cache import PriceCache
+from util.db_engine import get_engine
+from util.log_transaction import count_transactions, trim_transactions
+
+START = datetime(2024, 1, 2)
+
+
+def test_async_backtest_rejected(tmp_path):
+    backtest = AsyncBacktest('async', START)
+    with pytest.raises(TypeError, match='AsyncBacktest'):
+        Checkpointer(backtest, tmp_path / 'async.ckpt')
+    assert not (tmp_path / 'async.ckpt').exists()
+
+
+def _trade(backtest: Backtest, market: str, hours: range):
+    for hour in hours:
+        timestamp = START + timedelta(hours=hour)
+        if hour % 2 == 0:
+            backtest.buy(timestamp, market, 100.0, 10.0)
+        else:
+            backtest.sell(timestamp, market, 101.0, 5.0)
+
+
+def _db_rows(backtest_id: str) -> list[tuple]:
+    with get_engine().connect() as conn:
+        return [tuple(row) for row in conn.execute(text(
+            "SELECT transaction_time, transaction_type, crypto_name, quantity, cash_balance, total_value "
+            "FROM transactions_id_log WHERE backtest_id = :id ORDER BY transaction_time, id"), {'id': backtest_id})]
+
+
+@pytest.mark.parametrize('db_rows', ['ahead', 'behind'])
+def test_resume_matches_db_to_snapshot(price_db, tmp_path, db_rows):
+    market = price_db[0]
+    expected = Backtest('full', START, initial_balance=1e6, save_db=True, price_cache=PriceCache())
+    _trade(expected, market, range(20))
+    expected.close()
+
+    path = tmp_path / 'run.ckpt'
+    backtest = Backtest('run', START, initial_balance=1e6, save_db=True, price_cache=PriceCache())
+    checkpoint = Checkpointer(backtest, path, fsync=False)
+    _trade(backtest, market, range(10))
+    checkpoint.save(START + timedelta(hours=9))
+    snapshot_rows = count_transactions('run')
+    if db_rows == 'ahead':
+        # 스냅샷 이후의 거래가 db에 저장된 뒤 중단
+        _trade(backtest, market, range(10, 14))
+        backtest.flush()
+        assert count_transactions('run') == snapshot_rows + 4
+    else:
+        # 스냅샷의 마지막 거래가 db에 들어가지 못한 채 중단
+        trim_transactions('run', snapshot_rows - 3)
+    backtest.transaction_writer = None
+
+    resumed, last, _ = resume_backtest(path, price_cache=PriceCache())
+    assert last == START + timedelta(hours=9)
+    assert count_transactions('run') == snapshot_rows == len(resumed.transaction_log)
+    _trade(resumed, market, range(10, 20))
+    resumed.close()
+    assert _db_rows('run') == _db_rows('full')
+    assert resumed.transaction_log == expected.transaction_log
@@ -0,0 +1,85 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from backtest_class import Backtest
+from fill_model import FillModel, FixedSlippage, SpreadImpact, VolumeParticipation
+from price_cache import PriceCache
+
+MODELS = {
+    'none': FillModel(),
+    'fixed': FixedSlippage(5),
+    'spread': SpreadImpact(spread_bps=4),
+    'impact': SpreadImpact(spread_bps=4, impact=0.05, exponent=0.6),
+    'participation': VolumeParticipation(0.1),
+    'participation_impact': VolumeParticipation(0.2, price_model=SpreadImpact(spread_bps=4, impact=0.05),
+                                                min_quantity=0.5),
+}
+
+
+def _orders(n: int = 200, seed: int = 3) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(seed)
+    is_buy = rng.random(n) < 0.5
+    price = rng.uniform(10, 1e6, n)
+    quantity = rng.uniform(0.01, 20, n)
+    volume = rng.uniform(0, 100, n)
+    volume[::17] = 0.0
+    return is_buy, price, quantity, volume
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_fill_one_matches_batch(name):
+    model = MODELS[name]
+    is_buy, price, quantity, volume = _orders()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fill_price, filled = model.fill(is_buy, price, quantity, volume)
+        single = [model.fill_one(bool(b), float(p), float(q), float(v))
+                  for b, p, q, v in zip(is_buy, price, quantity, volume)]
+    assert [p for p, _ in single] == fill_price.tolist()
+    assert [q for _, q in single] == filled.tolist()
+
+
+@pytest.mark.parametrize('name', ['impact', 'participation'])
+def test_volume_required(name):
+    model = MODELS[name]
+    with pytest.raises(ValueError, match='volume'):
+        model.fill_one(True, 100.0, 1.0)
+    with pytest.raises(ValueError, match='volume'):
+        model.fill([True, False], [100.0, 100.0], [1.0, 1.0], [10.0, np.nan])
+
+
+def test_fill_examples():
+    fill_price, _ = FixedSlippage(10).fill([True, False], [100.0, 100.0], [1.0, 1.0])
+    assert fill_price.tolist() == pytest.approx([100.1, 99.9])
+    _, filled = VolumeParticipation(0.1, min_quantity=0.5).fill(
+        [True, True, False], [100.0] * 3, [2.0, 2.0, 2.0], [12.5, 4.0, 100.0])
+    assert filled.tolist() == [1.25, 0.0, 2.0]
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_submit_orders_matches_buy_sell(price_db, name):
+    model = MODELS[name]
+    date = datetime(2024, 1, 3, 5)
+    orders = [
+        {'crypto_name': price_db[0], 'side': 'sell', 'price': 101.0, 'quantity': 30.0, 'volume': 200.0},
+        {'crypto_name': price_db[1], 'side': 'buy', 'price': 55.0, 'quantity': 40.0, 'volume': 150.0},
+        {'crypto_name': price_db[2], 'side': 'buy', 'price': 80.0, 'quantity': 4.0, 'volume': 30.0},
+        {'crypto_name': price_db[1], 'side': 'sell', 'price': 56.0, 'quantity': 10.0, 'volume': 3.0},
+    ]
+
+    def setup() -> Backtest:
+        backtest = Backtest('fill', datetime(2024, 1, 2), initial_balance=1e6, price_cache=PriceCache(),
+                            fill_model=model)
+        for crypto_name in price_db[:2]:
+            backtest.buy(datetime(2024, 1, 2, 3), crypto_name, 100.0, 50.0, volume=1e6)
+        return backtest
+
+    batched = setup()
+    batched.submit_orders(date, orders)
+    sequential = setup()
+    # submit_orders는 매도를 먼저 주어진 순서대로 실행한 뒤 매수를 실행
+    for order in sorted(orders, key=lambda order: order['side'] != 'sell'):
+        trade = sequential.sell if order['side'] == 'sell' else sequential.buy
+        trade(date, order['crypto_name'], order['price'], order['quantity'], volume=order['volume'])
+    assert batched.transaction_log == sequential.transaction_log
+    assert batched.cash_balance == sequential.cash_balance
+    assert batched.portfolio == sequential.portfolio
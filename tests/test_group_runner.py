@@ -0,0 +1,70 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from backtest_class import Backtest
+from bar_feed import run_strategy
+from group_runner import BacktestGroup
+from price_cache import PriceCache
+from util.db_engine import get_engine
+
+START, END = datetime(2024, 1, 2), datetime(2024, 1, 8)
+VARIANTS = [
+    {'every': 5, 'size': 1000.0, 'fee_amount': 0.0005},
+    {'every': 7, 'size': 3000.0, 'fee_amount': 0.001, 'initial_balance': 2e5},
+    {'every': 3, 'size': 500.0, 'fee_amount': 0.0, 'valuation': 'lazy'},
+]
+
+
+def on_bar(bt: Backtest, timestamp: datetime, bar: dict, params: dict):
+    # every 바마다 암호화폐를 번갈아 가며 매수하고, 보유 중인 다른 암호화폐는 절반 매도
+    step = timestamp.toordinal() * 24 + timestamp.hour
+    if step % params['every']:
+        return
+    markets = sorted(bar)
+    target = markets[step // params['every'] % len(markets)]
+    for market in markets:
+        if market != target and bt.get_quantity(market) > 0:
+            bt.sell(timestamp, market, bar[market], bt.get_quantity(market) / 2, fee_amount=params['fee_amount'])
+    if bt.cash_balance > params['size']:
+        bt.buy(timestamp, target, bar[target], params['size'] / bar[target], fee_amount=params['fee_amount'])
+
+
+def _standalone(markets: list[str], i: int, variant: dict, stop_when=None, **options) -> Backtest:
+    arguments = {key: value for key, value in variant.items() if key in ('initial_balance', 'valuation')}
+    backtest = Backtest(f"solo-{i}", START, price_cache=PriceCache(), **arguments, **options)
+    run_strategy(backtest, lambda bt, ts, bar: on_bar(bt, ts, bar, variant), markets, START, END,
+                 stop_when=stop_when)
+    backtest.close()
+    return backtest
+
+
+def _db_rows(backtest_id: str) -> list[tuple]:
+    with get_engine().connect() as conn:
+        return [tuple(row) for row in conn.execute(text(
+            "SELECT transaction_time, transaction_type, crypto_name, price, quantity, cash_balance, asset_value "
+            "FROM transactions_id_log WHERE backtest_id = :id ORDER BY transaction_time, id"), {'id': backtest_id})]
+
+
+def test_group_matches_standalone_runs(price_db):
+    group = BacktestGroup.from_variants('group', START, VARIANTS, save_db=True)
+    backtests = group.run(on_bar, price_db, START, END)
+    for i, (backtest, variant) in enumerate(zip(backtests, VARIANTS)):
+        expected = _standalone(price_db, i, variant, save_db=True)
+        assert backtest.trades_count == expected.trades_count > 5
+        assert backtest.transaction_log == expected.transaction_log
+        assert backtest.cash_balance == expected.cash_balance
+        assert backtest.portfolio == expected.portfolio
+        assert _db_rows(f"group-{i}") == _db_rows(f"solo-{i}")
+    summary = group.summary(END)
+    assert summary['every'].tolist() == [variant['every'] for variant in VARIANTS]
+    assert summary['stopped'].isna().all()
+
+
+def test_stop_when_stops_one_variant(price_db):
+    stop_when = lambda bt, ts: bt.trades_count >= 6
+    group = BacktestGroup.from_variants('group', START, VARIANTS)
+    backtests = group.run(on_bar, price_db, START, END, stop_when=stop_when)
+    for i, (backtest, variant) in enumerate(zip(backtests, VARIANTS)):
+        expected = _standalone(price_db, i, variant, stop_when=stop_when)
+        assert backtest.transaction_log == expected.transaction_log
+        assert group.stopped[i] == backtest.transaction_log[-1]['date']
@@ -0,0 +1,74 @@
+from datetime import datetime
+import gc
+import weakref
+import pytest
+import util.db_engine
+from util import log_transaction
+from util.log_transaction import TransactionWriter, count_transactions
+
+
+def _transaction(i: int) -> dict:
+    return {
+        'backtest_id': 'writer', 'transaction_time': datetime(2024, 1, 1, i % 24), 'crypto_name': 'KRW-BTC',
+        'transaction_type': 'Buy', 'price': 100.0, 'quantity': 1.0, 'total_amount': 100.05,
+        'cash_balance': 1e7, 'asset_value': 100.0, 'total_value': 1e7, 'return_rate': 0.0,
+        'market_name': 'upbit', 'fee_type': 'percent', 'fee_amount': 0.0005,
+    }
+
+
+@pytest.fixture
+def broken_engine(monkeypatch):
+    """get_engine 호출 횟수를 세고 항상 실패하게 만듭니다."""
+    calls = []
+
+    def get_engine():
+        calls.append(1)
+        raise ConnectionError('db is down')
+
+    monkeypatch.setattr(util.db_engine, 'get_engine', get_engine)
+    return calls
+
+
+def test_failed_flush_backs_off(price_db, broken_engine):
+    writer = TransactionWriter(batch_size=2, flush_interval=None, retry_backoff=60)
+    for i in range(2):
+        writer.add(**_transaction(i))
+    assert len(broken_engine) == 1
+    assert writer.failures == 1
+    # 재시도 대기 중에는 add가 INSERT를 다시 시도하지 않음
+    for i in range(2, 10):
+        writer.add(**_transaction(i))
+    assert len(broken_engine) == 1
+    assert writer.pending == 10
+    # flush()는 대기와 관계없이 바로 시도
+    writer.flush()
+    assert len(broken_engine) == 2
+    assert writer.failures == 2
+
+
+def test_close_with_unwritten_rows(price_db, broken_engine, monkeypatch):
+    writer = TransactionWriter(batch_size=100, flush_interval=None)
+    writer.add(**_transaction(0))
+    with pytest.raises(ValueError, match='could not be written'):
+        writer.close()
+    assert writer.pending == 1
+    # 종료 시 자동 저장 대상으로 남아 db가 돌아오면 저장됨
+    assert writer in log_transaction._open_writers
+    monkeypatch.undo()
+    log_transaction._flush_open_writers()
+    assert writer.written == 1
+    assert writer.failures == 0
+    writer.close()
+    assert writer not in log_transaction._open_writers
+    assert count_transactions('writer') == 1
+
+
+def test_unclosed_writer_is_not_kept_alive(price_db):
+    writer = TransactionWriter(batch_size=100, flush_interval=None)
+    writer.add(**_transaction(0))
+    ref = weakref.ref(writer)
+    del writer
+    gc.collect()
+    assert ref() is None
+    # 버려질 때 남은 행을 저장
+    assert count_transactions('writer') == 1
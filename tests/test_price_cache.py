@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from price_cache import PriceCache
+from util.db_engine import get_engine
+from util.table_price import price_table
+
+
+def _insert(market: str, timestamp: datetime, close: float):
+    with get_engine().begin() as conn:
+        conn.execute(price_table('1hour').insert(), [{'market': market, 'timestamp_kst': timestamp, 'close': close}])
+
+
+def test_future_window_is_requeried(price_db):
+    market = 'KRW-NEW'
+    hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+    _insert(market, hour - timedelta(hours=2), 100.0)
+    _insert(market, hour - timedelta(hours=1), 101.0)
+    cache = PriceCache()
+    assert cache.get_price(market, hour - timedelta(minutes=30), '1hour') == 101.0
+
+    # 캐시가 적재한 뒤 새 캔들이 들어온 경우
+    _insert(market, hour + timedelta(hours=1), 102.0)
+    assert cache.get_price(market, hour + timedelta(hours=2), '1hour') == 102.0
+
+
+def test_past_gaps_stay_cached(price_db):
+    # 과거 구간은 캔들이 없어도 적재된 구간으로 보고 다시 조회하지 않음
+    market = price_db[0]
+    cache = PriceCache()
+    first = cache.get_price(market, datetime(2024, 1, 5), '1hour')
+    loads = cache.loads
+    assert cache.get_price(market, datetime(2024, 1, 20), '1hour') == cache.get_price(market, datetime(2024, 1, 11), '1hour')
+    assert first > 0
+    assert cache.loads == loads
@@ -0,0 +1,17 @@
+from datetime import datetime
+import pytest
+from backtest_class import Backtest
+from price_cache import PriceCache
+
+
+@pytest.mark.parametrize('primed_type, valuation_type', [('1h', '1hour'), ('1hour', '60m'), ('daily', '1d')])
+def test_primed_prices_match_resolution_aliases(price_db, primed_type, valuation_type):
+    market = price_db[0]
+    cache = PriceCache()
+    backtest = Backtest('prime', datetime(2024, 1, 2), initial_balance=1e6, price_cache=cache,
+                        valuation_type=valuation_type)
+    timestamp = datetime(2024, 1, 3, 5)
+    backtest.prime_prices(timestamp, {market: 123.0}, primed_type)
+    trade = backtest.buy(timestamp, market, 120.0, 2.0)
+    assert trade['asset_value'] == 246.0
+    assert cache.loads == 0 and cache.misses == 0
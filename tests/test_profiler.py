@@ -0,0 +1,27 @@
+from profiler import Profiler, active_profiler, profile_count
+
+
+def test_stop_out_of_order():
+    a, b = Profiler(), Profiler()
+    a.start()
+    b.start()
+    a.stop()
+    assert active_profiler() is b
+    b.stop()
+    assert active_profiler() is None
+    profile_count('rows')
+    assert a.counters == {} and b.counters == {}
+
+
+def test_stop_middle_of_chain():
+    a, b, c = Profiler(), Profiler(), Profiler()
+    for profiler in (a, b, c):
+        profiler.start()
+    b.stop()
+    c.stop()
+    assert active_profiler() is a
+    profile_count('rows')
+    assert a.counters == {'rows': 1}
+    assert b.counters == {} and c.counters == {}
+    a.stop()
+    assert active_profiler() is None
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from backtest_class import Backtest
+from price_cache import PriceCache
+from replay import load_run, replay
+from util.db_engine import get_engine
+
+START = datetime(2024, 1, 2)
+
+
+def _saved_run(markets: list[str], backtest_id: str = 'replay') -> Backtest:
+    backtest = Backtest(backtest_id, START, initial_balance=1e6, save_db=True, price_cache=PriceCache())
+    for hour in range(0, 120, 4):
+        timestamp = START + timedelta(hours=hour)
+        market = markets[hour % len(markets)]
+        price = backtest.price_cache.get_price(market, timestamp, '1hour')
+        if hour % 8 == 0:
+            backtest.buy(timestamp, market, price, 1000.0 / price)
+        elif market in backtest.portfolio:
+            backtest.sell(timestamp, market, price, backtest.portfolio[market] / 2)
+    backtest.close()
+    return backtest
+
+
+def test_round_trip(price_db):
+    backtest = _saved_run(price_db)
+    result = replay('replay', revalue=True)
+    assert result['ok'], result['drift']
+    assert result['rows'] == len(backtest.transaction_log)
+    assert all(count == 0 for count in result['checks'].values())
+    assert result['first_drift'] is None
+    assert result['final_cash'] == pytest.approx(backtest.cash_balance, abs=0.01)
+    assert result['holdings'].keys() == backtest.portfolio.keys()
+    for market, amount in backtest.portfolio.items():
+        assert result['holdings'][market] == pytest.approx(amount)
+    assert result['equity_curve']['total_value'].iloc[-1] == pytest.approx(
+        backtest.transaction_log[-1]['total_value'], abs=0.01)
+
+
+def test_corrupted_row_is_flagged(price_db):
+    _saved_run(price_db)
+    frame = load_run('replay')
+    corrupted = 6
+    with get_engine().begin() as conn:
+        row_id = conn.execute(text(
+            "SELECT id FROM transactions_id_log WHERE backtest_id = 'replay' ORDER BY transaction_time, id "
+            "LIMIT 1 OFFSET :offset"), {'offset': corrupted}).scalar_one()
+        conn.execute(text("UPDATE transactions_id_log SET cash_balance = cash_balance + 50 WHERE id = :id"),
+                     {'id': row_id})
+
+    result = replay('replay')
+    assert not result['ok']
+    assert result['checks']['cash_balance'] >= 1
+    assert result['first_drift'] == frame['transaction_time'].iloc[corrupted].to_pydatetime()
+    drift = result['drift']
+    first = drift.iloc[0]
+    assert first['drift_cash_balance']
+    assert first['cash_balance'] - first['expected_cash_balance'] == pytest.approx(50, abs=0.01)
+    # 다른 실행은 영향을 받지 않음
+    _saved_run(price_db, 'other')
+    assert replay('other')['ok']
@@ -0,0 +1,42 @@
+from datetime import datetime
+import pytest
+from bar_feed import BarFeed
+from get_price import DatabasePriceSource, PriceSource
+from rollup import RollupPriceSource
+
+
+class CountingSource(DatabasePriceSource):
+    """iter_bars로 읽은 원본 행 수를 세고, 구간 전체를 한 번에 읽으면 실패합니다."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = 0
+
+    def iter_bars(self, *args, **kwargs):
+        for row in super().iter_bars(*args, **kwargs):
+            self.rows += 1
+            yield row
+
+    def get_price_series_many(self, *args, **kwargs):
+        raise AssertionError("iter_bars should not load the whole range")
+
+
+@pytest.mark.parametrize('type', ['4h', '3h', '1d', '1hour'])
+@pytest.mark.parametrize('chunk_size', [1, 7, 10000])
+def test_iter_bars_matches_eager(price_db, type, chunk_size):
+    source = RollupPriceSource(DatabasePriceSource())
+    # 캔들 중간에서 시작/끝나는 구간
+    start, end = datetime(2024, 1, 2, 5, 30), datetime(2024, 1, 8, 13)
+    expected = list(PriceSource.iter_bars(source, price_db, start, end, type))
+    assert expected
+    assert list(source.iter_bars(price_db, start, end, type, chunk_size)) == expected
+
+
+def test_bar_feed_streams_rollup(price_db):
+    base = CountingSource()
+    feed = iter(BarFeed(price_db, datetime(2024, 1, 1), datetime(2024, 1, 10), '4h', chunk_size=12,
+                        source=RollupPriceSource(base)))
+    timestamp, bar = next(feed)
+    assert timestamp == datetime(2024, 1, 1) and sorted(bar) == price_db
+    # 첫 캔들이 끝났는지 알기 위해 두 번째 캔들까지 묶는 청크만 읽음 (구간 전체 651행을 읽지 않음)
+    assert base.rows <= 3 * 12
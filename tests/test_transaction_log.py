@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+import pytest
+from backtest_class import Backtest
+from price_cache import PriceCache
+from transaction_log import FIELDS, RECORD_DTYPE, SpillLog
+
+START = datetime(2024, 1, 2)
+
+
+def _record(i: int) -> dict:
+    """i번째 합성 거래 기록 (입금 기록은 crypto_name/price 등이 None)"""
+    if i % 5 == 0:
+        return dict.fromkeys(FIELDS) | {'date': START + timedelta(hours=i), 'total_amount': 1000.0 + i,
+                                       'transaction_type': 'Deposit', 'cash_balance': 1000.0 + i}
+    return {
+        'date': START + timedelta(hours=i, microseconds=i), 'crypto_name': f"KRW-C{i % 3}",
+        'price': 100.0 + i, 'quantity': 0.5 * i, 'total_amount': (100.0 + i) * 0.5 * i, 'fee_type': 'percent',
+        'fee_amount': 0.0005, 'transaction_type': 'Buy' if i % 2 else 'Sell', 'cash_balance': 1e6 - i,
+        'asset_value': None, 'total_value': None, 'return_rate': None,
+    }
+
+
+def test_segment_rollover(tmp_path):
+    # tail_size가 segment_rows를 나누지 않으므로 내보낼 때마다 세그먼트 경계를 넘나듦
+    log = SpillLog(tmp_path, tail_size=3, segment_rows=5)
+    records = [_record(i) for i in range(23)]
+    for i, record in enumerate(records):
+        assert log.append(record) == i
+    assert len(log) == 23 and log.spilled == 21
+    assert sorted(path.name for path in tmp_path.glob('segment_*.bin')) == [
+        f"segment_{i:05d}.bin" for i in range(5)]
+    assert [log[i] for i in range(23)] == records
+    assert list(log) == records
+    assert log[4:17] == records[4:17]
+    assert log[-1] == records[-1]
+    log.close()
+    assert [path.stat().st_size // RECORD_DTYPE.itemsize for path in sorted(tmp_path.glob('segment_*.bin'))] == [5, 5, 5, 5, 3]
+
+
+def test_update_spilled_rows(tmp_path):
+    log = SpillLog(tmp_path, tail_size=3, segment_rows=5)
+    for i in range(23):
+        log.append(_record(i))
+    # 세그먼트 파일의 행(1, 7, 19), 꼬리 버퍼의 행(22)
+    for index in (1, 7, 19, 22):
+        log.update(index, {'asset_value': 10.0 * index, 'total_value': None, 'return_rate': 0.5})
+    for index in (1, 7, 19, 22):
+        assert log[index]['asset_value'] == 10.0 * index
+        assert log[index]['total_value'] is None
+        assert log[index]['return_rate'] == 0.5
+        assert log[index]['price'] == _record(index)['price']
+    assert log[2]['asset_value'] is None
+    log.close()
+    reopened = SpillLog.open(tmp_path)
+    assert [reopened[index]['asset_value'] for index in (1, 7, 19, 22)] == [10.0, 70.0, 190.0, 220.0]
+
+
+def test_append_after_open(tmp_path):
+    records = [_record(i) for i in range(23)]
+    log = SpillLog(tmp_path, tail_size=3, segment_rows=5)
+    for record in records[:13]:
+        log.append(record)
+    log.close()
+    with pytest.raises(ValueError):
+        SpillLog(tmp_path)
+
+    log = SpillLog.open(tmp_path, tail_size=4)
+    assert len(log) == 13 and list(log) == records[:13]
+    for i, record in enumerate(records[13:], start=13):
+        assert log.append(record) == i
+    log.update(12, {'asset_value': 1.0})
+    log.close()
+    records[12] = records[12] | {'asset_value': 1.0}
+
+    reopened = SpillLog.open(tmp_path)
+    assert len(reopened) == 23 and list(reopened) == records
+    assert reopened.categories('crypto_name') == ['KRW-C1', 'KRW-C2', 'KRW-C0']
+    assert len(list(tmp_path.glob('segment_*.bin'))) == 5
+    frame = reopened.to_pandas(crypto_name='KRW-C1', start=START + timedelta(hours=5))
+    assert frame['price'].tolist() == [r['price'] for r in records[5:] if r['crypto_name'] == 'KRW-C1']
+
+
+def _run(market: str, **options) -> Backtest:
+    backtest = Backtest('spill', START, initial_balance=1e6, price_cache=PriceCache(), **options)
+    for hour in range(0, 96, 3):
+        timestamp = START + timedelta(hours=hour)
+        if hour % 6 == 0:
+            backtest.buy(timestamp, market, 100.0, 10.0)
+        else:
+            backtest.sell(timestamp, market, 101.0, 5.0)
+    backtest.finalize_valuation()
+    return backtest
+
+
+@pytest.mark.parametrize('valuation', ['eager', 'lazy'])
+def test_spill_log_matches_list_log(price_db, tmp_path, valuation):
+    market = price_db[0]
+    expected = _run(market, valuation=valuation).transaction_log
+    # lazy는 이미 디스크로 내보낸 기록을 나중에 평가해 세그먼트 파일을 고침
+    spill_log = SpillLog(tmp_path, tail_size=4, segment_rows=7)
+    backtest = _run(market, valuation=valuation, log_type='spill', spill_log=spill_log)
+    assert spill_log.spilled > 7
+    assert list(backtest.transaction_log) == expected
+    assert all(row['asset_value'] is not None for row in expected)
@@ -0,0 +1,178 @@
+from typing import Optional
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from backtest_class import Backtest
+from conftest import load_prices
+from fill_model import FillModel, SpreadImpact, VolumeParticipation
+from price_cache import PriceCache
+from util.db_engine import get_engine
+from vectorized_backtest import check_parity, run_vectorized
+
+INITIAL_BALANCE = 1e6
+
+
+def run_sequential(prices: pd.DataFrame, targets: pd.DataFrame, fee_type: str = 'percent',
+                   fee_amount: float = 0.0005, fill_model: Optional[FillModel] = None,
+                   volumes: Optional[pd.DataFrame] = None) -> Backtest:
+    """목표 보유 수량을 Backtest.buy/sell로 한 건씩 따라갑니다 (run_vectorized와 독립적인 기준 실행).
+
+    바마다 목표와 현재 보유 수량의 차이를 매도 먼저, 암호화폐 순서대로 주문합니다.
+    """
+    backtest = Backtest('parity', prices.index[0].to_pydatetime(), initial_balance=INITIAL_BALANCE,
+                        price_cache=PriceCache(), fill_model=fill_model)
+    for timestamp, target in targets.iterrows():
+        date = timestamp.to_pydatetime()
+        want = {market: target[market] - backtest.get_quantity(market) for market in targets.columns}
+        for side in ('sell', 'buy'):
+            for market, delta in want.items():
+                if delta == 0 or (delta > 0) != (side == 'buy'):
+                    continue
+                method = backtest.buy if side == 'buy' else backtest.sell
+                volume = None if volumes is None else volumes.at[timestamp, market]
+                method(date, market, prices.at[timestamp, market], abs(delta),
+                       fee_type=fee_type, fee_amount=fee_amount, volume=volume)
+    backtest.close()
+    return backtest
+
+
+def crossover_targets(prices: pd.DataFrame, sizes: np.ndarray) -> pd.DataFrame:
+    fast = prices.rolling(6, min_periods=1).mean()
+    slow = prices.rolling(24, min_periods=1).mean()
+    return (fast > slow).astype(float) * sizes
+
+
+def assert_parity(result: dict, backtest: Backtest, prices: pd.DataFrame):
+    final_positions = result['positions'].iloc[-1]
+    assert result['trades_count'] == backtest.trades_count
+    assert result['trades']['cash_balance'].iloc[-1] == pytest.approx(backtest.cash_balance, rel=1e-12)
+    for market, quantity in final_positions.items():
+        assert quantity == pytest.approx(backtest.get_quantity(market), rel=1e-12, abs=1e-12)
+
+    # 거래 기록 (Backtest는 거래마다 db 가격으로 평가)
+    expected = pd.DataFrame(list(backtest.transaction_log))
+    actual = result['trades']
+    assert list(actual['crypto_name']) == list(expected['crypto_name'])
+    assert list(actual['transaction_type']) == list(expected['transaction_type'])
+    for column in ('price', 'quantity', 'total_amount', 'cash_balance', 'asset_value', 'total_value'):
+        np.testing.assert_allclose(actual[column].to_numpy(dtype=np.float64),
+                                   expected[column].to_numpy(dtype=np.float64), rtol=1e-9, atol=1e-6)
+
+    # 시점별 평가 (Backtest.equity_curve는 get_prices로 db에서 as-of 종가를 조회)
+    curve = backtest.equity_curve(list(prices.index.to_pydatetime()))
+    for column in ('cash_balance', 'asset_value', 'total_value', 'return_rate'):
+        np.testing.assert_allclose(result['equity'][column].to_numpy(), curve[column].to_numpy(),
+                                   rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize('fee_type, fee_amount', [('percent', 0.0005), ('fixed', 50.0)])
+def test_parity_with_sequential_backtest(price_db, fee_type, fee_amount):
+    prices = load_prices(price_db)
+    targets = crossover_targets(prices, np.array([1000.0, 2000.0, 3000.0]))
+    result = run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE,
+                            fee_type=fee_type, fee_amount=fee_amount)
+    backtest = run_sequential(prices, targets, fee_type, fee_amount)
+    assert result['trades_count'] > 10
+    assert_parity(result, backtest, prices)
+
+
+def test_fractional_targets_close_position():
+    index = pd.date_range('2024-01-01', periods=6, freq='h')
+    prices = pd.DataFrame({'A': [100.0] * 6}, index=index)
+    targets = pd.DataFrame({'A': [0.2, 0.9, 0.5, 0.3, 0.4, 0.0]}, index=index)
+    result = run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE)
+    assert result['trades_count'] == 6
+    assert result['positions']['A'].iloc[-1] == 0.0
+
+
+def test_parity_with_fractional_targets(price_db):
+    prices = load_prices(price_db)
+    rng = np.random.default_rng(11)
+    # 무작위 시점에 소수 목표 수량으로 바꾸고 마지막에 모두 청산
+    changes = rng.random(prices.shape) < 0.2
+    targets = pd.DataFrame(np.where(changes, rng.uniform(0, 50, prices.shape), np.nan),
+                           index=prices.index, columns=prices.columns).ffill().fillna(0.0)
+    targets.iloc[-1] = 0.0
+    result = run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE)
+    backtest = run_sequential(prices, targets)
+    assert_parity(result, backtest, prices)
+    assert (result['positions'].iloc[-1] == 0).all()
+
+
+def test_parity_when_sells_fund_buys(price_db):
+    # 한 암호화폐에서 다른 암호화폐로 옮겨 타며 매번 현금을 거의 다 쓰는 경우
+    prices = load_prices(price_db)
+    hold_first = (np.arange(len(prices)) // 12) % 2 == 0
+    budget = INITIAL_BALANCE * 0.9
+    targets = pd.DataFrame(0.0, index=prices.index, columns=prices.columns)
+    targets.iloc[:, 0] = np.where(hold_first, budget / prices.iloc[:, 0].max(), 0.0)
+    targets.iloc[:, 1] = np.where(hold_first, 0.0, budget / prices.iloc[:, 1].max())
+    result = run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE)
+    backtest = run_sequential(prices, targets)
+    assert result['equity']['cash_balance'].min() < INITIAL_BALANCE * 0.2
+    assert_parity(result, backtest, prices)
+
+
+def test_unaffordable_buy_rejected_at_same_trade(price_db):
+    prices = load_prices(price_db)
+    targets = pd.DataFrame(0.0, index=prices.index, columns=prices.columns)
+    targets.iloc[5:, 0] = INITIAL_BALANCE * 0.6 / prices.iloc[5, 0]
+    # 두 번째 매수는 남은 현금으로 부족
+    targets.iloc[30:, 1] = INITIAL_BALANCE * 0.6 / prices.iloc[30, 1]
+    with pytest.raises(ValueError, match='Not enough cash') as vectorized:
+        run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE)
+    with pytest.raises(ValueError, match='Not enough cash') as sequential:
+        run_sequential(prices, targets)
+    assert str(prices.columns[1]) in str(vectorized.value)
+    assert str(prices.columns[1]) in str(sequential.value)
+    assert str(prices.index[30].to_datetime64()) in str(vectorized.value)
+
+
+def test_parity_with_partial_fills(price_db):
+    prices = load_prices(price_db)
+    targets = crossover_targets(prices, np.array([1000.0, 2000.0, 3000.0]))
+    volumes = pd.DataFrame(np.random.default_rng(3).uniform(500, 5000, prices.shape),
+                           index=prices.index, columns=prices.columns)
+    model = VolumeParticipation(0.1, price_model=SpreadImpact(spread_bps=4, impact=0.05))
+    result = run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE, fill_model=model, volumes=volumes)
+    backtest = run_sequential(prices, targets, fill_model=model, volumes=volumes)
+    # 부분 체결로 목표에 못 미친 바가 있어야 함
+    assert (result['positions'] != targets).any().any()
+    assert_parity(result, backtest, prices)
+
+
+def test_parity_with_missing_candles(price_db):
+    # 보유 중인 암호화폐의 캔들이 빠진 구간은 직전 종가로 평가
+    markets = price_db
+    prices = load_prices(markets)
+    targets = pd.DataFrame(0.0, index=prices.index, columns=prices.columns)
+    targets.iloc[10:, 0] = 1000.0
+    targets.iloc[50:, 0] = 500.0
+    gap = prices.index[20:30]
+    with get_engine().begin() as conn:
+        conn.execute(text("DELETE FROM upbit_1hour_price WHERE market = :market "
+                          "AND timestamp_kst >= :start AND timestamp_kst < :end"),
+                     {'market': markets[0], 'start': gap[0].to_pydatetime(), 'end': prices.index[30].to_pydatetime()})
+    prices = load_prices(markets)
+    assert prices.loc[gap, markets[0]].isna().all()
+    result = run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE)
+    backtest = run_sequential(prices, targets)
+    assert_parity(result, backtest, prices)
+
+
+def test_trade_at_missing_price_raises(price_db):
+    prices = load_prices(price_db)
+    prices.iloc[10, 0] = np.nan
+    targets = pd.DataFrame(0.0, index=prices.index, columns=prices.columns)
+    targets.iloc[10:, 0] = 1000.0
+    with pytest.raises(ValueError, match='No price'):
+        run_vectorized(prices, targets, initial_balance=INITIAL_BALANCE)
+
+
+def test_check_parity_report(price_db):
+    prices = load_prices(price_db)
+    targets = crossover_targets(prices, np.array([1000.0, 2000.0, 3000.0]))
+    report = check_parity(prices, targets, initial_balance=INITIAL_BALANCE, fee_type='fixed', fee_amount=50.0)
+    assert report['trades_count_equal'] and report['cash_equal'] and report['positions_equal']
+    assert max(value for key, value in report.items() if key.endswith('_max_diff')) < 1e-6